@@ -26,6 +26,7 @@ from config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 HTTP_TIMEOUT = 20.0
+PORT_SNAP_KM = 50.0   # geocoded city → nearest UN/LOCODE seaport within this radius
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -562,6 +563,9 @@ class ExternalAPIAgent(BaseAgent):
         - Extract country context from the L/C document or port name itself
         - Use exact matching first, then starts-with, then contains
         - UNLOCODE search with country filter when possible
+        - Before any network call, try a bounded edit-distance UNLOCODE match
+          so OCR errors ("MISURTA") still resolve locally
+        - A Geoapify hit is snapped to the nearest UNLOCODE seaport locally
         """
         raw_port = request.field_value.strip()
         if len(raw_port) < 2:
@@ -593,9 +597,11 @@ class ExternalAPIAgent(BaseAgent):
 
         # L1: UNLOCODE (local, 116K records) — with COUNTRY FILTER
         all_matches = []
+        fuzzy = False
         try:
-            from utils.unlocode import search_port as unlo_search, get_ports_count
+            from utils.unlocode import search_port as unlo_search, fuzzy_search_port, get_ports_count
 
+            searches = []
             for pname in port_names:
                 # Clean the port name of country words for search
                 search_name = pname
@@ -606,7 +612,9 @@ class ExternalAPIAgent(BaseAgent):
 
                 # Determine country filter
                 cc = port_country_hints.get(pname, "") or doc_country_code
+                searches.append((search_name, cc))
 
+            for search_name, cc in searches:
                 # Search with country filter first (precise)
                 if cc:
                     results = unlo_search(search_name, country_code=cc, ports_only=True, max_results=5)
@@ -624,6 +632,15 @@ class ExternalAPIAgent(BaseAgent):
                 if results:
                     all_matches.extend(results)
 
+            # L1b: approximate UNLOCODE match for OCR-mangled names ("MISURTA", "BENGHAZl")
+            if not all_matches:
+                for search_name, cc in searches:
+                    results = fuzzy_search_port(search_name, country_code=cc, ports_only=True)
+                    if not results and cc:
+                        results = fuzzy_search_port(search_name, country_code=cc, ports_only=False)
+                    all_matches.extend(results)
+                fuzzy = bool(all_matches)
+
             if all_matches:
                 # Deduplicate by locode
                 seen_codes = set()
@@ -635,15 +652,21 @@ class ExternalAPIAgent(BaseAgent):
                         unique_matches.append(m)
 
                 summary = ", ".join(f"{m['name']} ({m['locode']})" for m in unique_matches[:5])
-                return ExternalVerificationResult(verification_type="port_verification", verified=True, confidence=0.95,
-                    message=f"Port(s) FOUND in UN/LOCODE: {summary}",
+                matches = [{"locode": m["locode"], "name": m["name"], "country": m["country_code"],
+                            "functions": m["functions"], "lat": m.get("lat"), "lon": m.get("lon"),
+                            "google_maps": m["google_maps"]} for m in unique_matches[:5]]
+                if fuzzy:
+                    for out, m in zip(matches, unique_matches):
+                        out["match_distance"] = m["match_distance"]
+                return ExternalVerificationResult(verification_type="port_verification", verified=True,
+                    confidence=0.8 if fuzzy else 0.95,
+                    message=(f"Closest UN/LOCODE match for '{raw_port}': {summary}" if fuzzy
+                             else f"Port(s) FOUND in UN/LOCODE: {summary}"),
                     details={"query": raw_port, "parsed_ports": port_names,
                              "country_filter": doc_country_code,
-                             "matches": [{"locode": m["locode"], "name": m["name"], "country": m["country_code"],
-                                          "functions": m["functions"], "lat": m.get("lat"), "lon": m.get("lon"),
-                                          "google_maps": m["google_maps"]} for m in unique_matches[:5]],
+                             "matches": matches,
                              "database_size": get_ports_count()},
-                    source="unlocode_database")
+                    source="unlocode_fuzzy" if fuzzy else "unlocode_database")
         except Exception as e:
             logger.warning(f"UNLOCODE lookup failed: {e}")
 
@@ -661,6 +684,26 @@ class ExternalAPIAgent(BaseAgent):
                                  "google_maps": _gmaps_link(lat, lon)})
                 if locs:
                     best = locs[0]
+                    # Snap the geocoded point to the closest official seaport, same country first
+                    nearby = []
+                    if best["lat"] is not None and best["lon"] is not None:
+                        try:
+                            from utils.unlocode import nearest_ports
+                            nearby = nearest_ports(best["lat"], best["lon"], k=5, max_km=PORT_SNAP_KM)
+                            cc = (best["country_code"] or "").upper()
+                            nearby.sort(key=lambda m: m["country_code"] != cc)
+                        except Exception as e:
+                            logger.warning(f"UNLOCODE nearest-port lookup failed: {e}")
+                    if nearby:
+                        snap = nearby[0]
+                        return ExternalVerificationResult(verification_type="port_verification", verified=True, confidence=0.9,
+                            message=(f"Port '{pname}' located: {best['name']} ({best['country']}) — "
+                                     f"nearest UN/LOCODE seaport {snap['name']} ({snap['locode']}), {snap['distance_km']} km"),
+                            details={"query": raw_port, "parsed_ports": port_names, "locations": locs,
+                                     "nearest_ports": [{"locode": m["locode"], "name": m["name"], "country": m["country_code"],
+                                                        "distance_km": m["distance_km"], "lat": m["lat"], "lon": m["lon"],
+                                                        "google_maps": _gmaps_link(m["lat"], m["lon"])} for m in nearby[:3]],
+                                     "google_maps": best["google_maps"]}, source="geoapify+unlocode")
                     return ExternalVerificationResult(verification_type="port_verification", verified=True, confidence=0.85,
                         message=f"Port '{pname}' located: {best['name']} ({best['country']})",
                         details={"query": raw_port, "parsed_ports": port_names, "locations": locs,
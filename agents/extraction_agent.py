@@ -4,19 +4,20 @@ MCP Tool: extract_lc_document
 """
 
 from __future__ import annotations
-import json
 import logging
 from typing import Any
 
 from agents.base_agent import BaseAgent
 from schemas.models import ExtractionRequest, ExtractionResult, ExtractionMethod
-from schemas.lc_fields import build_extraction_json_keys, build_field_hints
+from schemas.lc_fields import build_extraction_prompt, extraction_json_schema
 from utils.llm_clients import (
     call_gemini, call_openai, call_gemini_vision, call_openai_vision,
     parse_json_response,
 )
-from utils.pdf_utils import extract_text_pypdf2, extract_text_ocr, pdf_to_base64_images, is_scanned_pdf
+from utils.pdf_utils import PdfDocument, PAGE_TEXT, PAGE_IMAGE
+from utils.chunked_extraction import needs_chunking, extract_chunked
 from config.constants import MAX_PDF_TEXT_FOR_LLM, MAX_VISION_PAGES
+from config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -32,54 +33,54 @@ class ExtractionAgent(BaseAgent):
             "Extract all fields from an L/C PDF document into structured JSON",
         )
 
-    def _build_prompt(self, lang: str = "en") -> str:
-        """Build the extraction prompt from the schema."""
-        field_hints = build_field_hints(lang)
-        json_keys = json.dumps(build_extraction_json_keys(), indent=2)
-
-        return f"""You are an expert trade-finance and Letter of Credit (L/C) document analyst.
-You can read documents in English, Arabic (العربية), Spanish (Español), and Italian (Italiano).
-
-TASK: Extract ALL information from the document into the JSON structure below.
-
-FIELD REFERENCE (key → English label / Arabic label):
-{field_hints}
-
-CRITICAL RULES:
-1. Read the ENTIRE document — every line, header, footer, stamp, annotation, in ALL languages.
-2. Extract EVERY value you can find. NEVER return null if the data exists ANYWHERE.
-3. Document numbers may appear as "No.", "رقم", "Ref:", "Nº", "#", or adjacent to a label.
-4. Convert ALL dates to DD/MM/YYYY format.
-5. For checkboxes (required documents, compliance), return "true" if mentioned/required, "false" otherwise.
-6. For select fields, return the closest matching option value.
-7. For amounts, include currency code + number (e.g., "USD 150,000.00").
-8. Look for Arabic labels: "اسم فاتح الإعتماد" = Applicant Name, "المستفيد" = Beneficiary.
-9. If a field truly cannot be found, use null.
+    def _response_schema(self) -> dict | None:
+        """JSON schema for provider structured output, or None when it is turned off."""
+        return extraction_json_schema() if get_settings().extraction_structured_output else None
 
-Return ONLY a raw JSON object — NO markdown fences, NO backticks, NO explanation:
-
-{json_keys}"""
+    def _build_prompt(self, lang: str = "en") -> str:
+        """Static extraction instructions — the same prompt the extract_lc_document tool sends."""
+        return build_extraction_prompt(lang, self._response_schema() is not None)
 
     @BaseAgent.timed
     def extract(self, request: ExtractionRequest) -> ExtractionResult:
         """Main extraction entry point."""
         try:
             method = request.method
-            pdf_bytes = request.pdf_bytes
+            doc = PdfDocument(request.pdf_bytes)
 
             # Auto-detect: if scanned, force Vision
-            if method == ExtractionMethod.TEXT and is_scanned_pdf(pdf_bytes):
+            if method == ExtractionMethod.TEXT and doc.is_scanned:
                 logger.info("Scanned PDF detected, switching to Vision AI")
                 method = ExtractionMethod.VISION
 
             base_prompt = self._build_prompt(request.language)
 
+            chunking = request.chunking or get_settings().extraction_chunking
+            if chunking == "always" or (chunking == "auto" and needs_chunking(doc, method.value, request.llm_provider)):
+                profile = request.image_profile.value if request.image_profile else ""
+                parsed, info = extract_chunked(doc, method.value, base_prompt, request.llm_provider,
+                                               request.model_name, image_profile=profile,
+                                               response_schema=self._response_schema())
+                return ExtractionResult(
+                    success=True,
+                    extracted_data=parsed,
+                    raw_llm_response="\n\n".join(info["raw_responses"]),
+                    fields_found=sum(1 for v in parsed.values() if v is not None),
+                    fields_total=len(parsed),
+                    method_used=method,
+                    chunks=info["chunks"],
+                    field_conflicts=info["conflicts"],
+                    failed_pages=info["failed_pages"],
+                )
+
             if method == ExtractionMethod.VISION:
-                raw = self._extract_vision(pdf_bytes, base_prompt, request)
+                raw = self._extract_vision(doc, base_prompt, request)
+            elif method == ExtractionMethod.HYBRID:
+                raw = self._extract_hybrid(doc, base_prompt, request)
             elif method == ExtractionMethod.OCR:
-                raw = self._extract_ocr(pdf_bytes, base_prompt, request)
+                raw = self._extract_ocr(doc, base_prompt, request)
             else:
-                raw = self._extract_text(pdf_bytes, base_prompt, request)
+                raw = self._extract_text(doc, base_prompt, request)
 
             if not raw:
                 return ExtractionResult(success=False, error="LLM returned empty response")
@@ -100,40 +101,74 @@ Return ONLY a raw JSON object — NO markdown fences, NO backticks, NO explanati
             logger.error(f"Extraction failed: {e}")
             return ExtractionResult(success=False, error=str(e))
 
-    def _extract_vision(self, pdf_bytes: bytes, base_prompt: str, req: ExtractionRequest) -> str | None:
+    def _extract_vision(self, doc: PdfDocument, base_prompt: str, req: ExtractionRequest) -> str | None:
         """Extract using Vision AI (send PDF directly)."""
-        vision_prompt = base_prompt + "\n\nThe document pages are provided as images above. Read every page carefully and extract the JSON. ONLY the JSON object."
+        vision_prompt = "The document pages are provided as images above. Read every page carefully and extract the JSON. ONLY the JSON object."
 
         if req.llm_provider == "gemini":
-            return call_gemini_vision(pdf_bytes, vision_prompt, model_name=req.model_name)
+            return call_gemini_vision(doc.pdf_bytes, vision_prompt, model_name=req.model_name,
+                                      response_schema=self._response_schema(), instructions=base_prompt)
         else:
-            images = pdf_to_base64_images(pdf_bytes, max_pages=MAX_VISION_PAGES)
+            profile = req.image_profile.value if req.image_profile else get_settings().vision_image_profile
+            images, mime_types, _ = doc.vision_images(MAX_VISION_PAGES, profile)
             if not images:
                 raise RuntimeError("Cannot convert PDF to images. Install pdf2image + poppler.")
-            return call_openai_vision(images, vision_prompt, model_name=req.model_name)
-
-    def _extract_text(self, pdf_bytes: bytes, base_prompt: str, req: ExtractionRequest) -> str | None:
+            return call_openai_vision(images, vision_prompt, model_name=req.model_name, mime_types=mime_types,
+                                      response_schema=self._response_schema(), instructions=base_prompt)
+
+    def _extract_hybrid(self, doc: PdfDocument, base_prompt: str, req: ExtractionRequest) -> str | None:
+        """Extract using the text layer where present and Vision AI for image-only pages."""
+        text = doc.text_of_pages(doc.pages_of_kind(PAGE_TEXT))
+        image_pages = doc.pages_of_kind(PAGE_IMAGE)[:MAX_VISION_PAGES]
+
+        schema = self._response_schema()
+        prompt = ""
+        if text:
+            prompt += f"DOCUMENT TEXT (pages with a text layer):\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\n\n"
+        if not image_pages:
+            prompt += "Extract the JSON now. ONLY the JSON object."
+            if req.llm_provider == "gemini":
+                return call_gemini(prompt, model_name=req.model_name, response_schema=schema, instructions=base_prompt)
+            return call_openai(prompt, model_name=req.model_name, response_schema=schema, instructions=base_prompt)
+
+        prompt += (f"Pages {', '.join(map(str, image_pages))} have no text layer and are provided as "
+                   f"images, in that order. Read them carefully and extract the JSON. ONLY the JSON object.")
+        if req.llm_provider == "gemini":
+            return call_gemini_vision(doc.subset_pdf(image_pages), prompt, model_name=req.model_name,
+                                      response_schema=schema, instructions=base_prompt)
+        profile = req.image_profile.value if req.image_profile else get_settings().vision_image_profile
+        images, mime_types, _ = doc.vision_images(MAX_VISION_PAGES, profile, pages=image_pages)
+        if not images:
+            raise RuntimeError("Cannot convert PDF to images. Install pdf2image + poppler.")
+        return call_openai_vision(images, prompt, model_name=req.model_name, mime_types=mime_types,
+                                  response_schema=schema, instructions=base_prompt)
+
+    def _extract_text(self, doc: PdfDocument, base_prompt: str, req: ExtractionRequest) -> str | None:
         """Extract using text-based approach."""
-        text = extract_text_pypdf2(pdf_bytes)
+        text = doc.text
         if len(text) < 50:
             raise RuntimeError("Not enough text extracted from PDF. Try Vision AI instead.")
 
-        prompt = base_prompt + f"\n\nDOCUMENT TEXT:\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\n\nExtract the JSON now. ONLY the JSON object."
+        prompt = f"DOCUMENT TEXT:\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\n\nExtract the JSON now. ONLY the JSON object."
 
         if req.llm_provider == "gemini":
-            return call_gemini(prompt, model_name=req.model_name)
+            return call_gemini(prompt, model_name=req.model_name, response_schema=self._response_schema(),
+                               instructions=base_prompt)
         else:
-            return call_openai(prompt, model_name=req.model_name)
+            return call_openai(prompt, model_name=req.model_name, response_schema=self._response_schema(),
+                               instructions=base_prompt)
 
-    def _extract_ocr(self, pdf_bytes: bytes, base_prompt: str, req: ExtractionRequest) -> str | None:
+    def _extract_ocr(self, doc: PdfDocument, base_prompt: str, req: ExtractionRequest) -> str | None:
         """Extract using OCR then LLM."""
-        text = extract_text_ocr(pdf_bytes)
+        text = doc.ocr_text()
         if not text:
             raise RuntimeError("OCR produced no text.")
 
-        prompt = base_prompt + f"\n\nDOCUMENT TEXT (from OCR):\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\n\nExtract the JSON now. ONLY the JSON object."
+        prompt = f"DOCUMENT TEXT (from OCR):\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\n\nExtract the JSON now. ONLY the JSON object."
 
         if req.llm_provider == "gemini":
-            return call_gemini(prompt, model_name=req.model_name)
+            return call_gemini(prompt, model_name=req.model_name, response_schema=self._response_schema(),
+                               instructions=base_prompt)
         else:
-            return call_openai(prompt, model_name=req.model_name)
+            return call_openai(prompt, model_name=req.model_name, response_schema=self._response_schema(),
+                               instructions=base_prompt)
@@ -3,45 +3,137 @@ FastAPI Application — REST API for the frontend.
 
 Endpoints mirror the LangGraph workflows:
   POST /extract      → extraction_graph
+  POST /extract/stream → extraction as Server-Sent Events, one event per field
   POST /validate     → validation_graph
   POST /verify       → verification_graph
   POST /chat         → chat_graph
   POST /pipeline     → pipeline_graph (extract → validate → verify)
   GET  /tools        → list FastMCP tools
-  GET  /health       → health check
+  GET  /health       → health check (liveness)
+  GET  /ready        → 200 once the startup warm-up has finished (readiness)
+  GET  /cache/stats  → extraction cache hit/miss counters
+  GET  /llm/stats    → LLM retries, breaker state, hedge wins, latency
 
 All endpoints accept JSON, return JSON. The frontend (React/Next.js)
 calls these endpoints. Each endpoint invokes a LangGraph graph.
 """
 from __future__ import annotations
 import base64
+import json
 import logging
+import threading
+import time
 from typing import Optional
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import os
 
 logger = logging.getLogger(__name__)
 
 
+# ═══════════════════════════════════════════════════════════════
+#  WARM-UP (preload lazy singletons off the request path)
+# ═══════════════════════════════════════════════════════════════
+
+def _warm_unlocode():
+    from utils.unlocode import get_ports_stats
+    stats = get_ports_stats()
+    return f"{stats['locations']} locations ({stats['loaded_from'] or 'none'})"
+
+
+def _warm_external_agent():
+    from tools.server import _get_external_agent
+    return type(_get_external_agent()).__name__
+
+
+def _warm_extraction_prompt():
+    from tools.server import build_extraction_prompt, extraction_prompt_version
+    from config.settings import SUPPORTED_LANGUAGES, get_settings
+    structured = get_settings().extraction_structured_output
+    for lang in SUPPORTED_LANGUAGES:
+        build_extraction_prompt(lang, structured)
+        extraction_prompt_version(lang, structured)
+    return f"{len(SUPPORTED_LANGUAGES)} languages"
+
+
+def _warm_llm_clients():
+    from utils.llm_clients import _get_gemini_client, _get_openai_client
+    ready = [name for name, client in (("gemini", _get_gemini_client()), ("openai", _get_openai_client()))
+             if client is not None]
+    return ", ".join(ready) or "no API keys configured"
+
+
+def _warm_ocr_pool():
+    from utils.pdf_utils import warm_ocr_pool
+    workers = warm_ocr_pool()
+    return f"{workers} worker(s)" if workers else "OCR not installed"
+
+
+WARMUP_STEPS = {
+    "unlocode": _warm_unlocode,
+    "external_agent": _warm_external_agent,
+    "extraction_prompt": _warm_extraction_prompt,
+    "llm_clients": _warm_llm_clients,
+    "ocr_pool": _warm_ocr_pool,
+}
+
+_warmup_state = {"ready": False, "steps": {}, "duration_ms": None}
+
+
+def _run_warmup(steps: list[str]):
+    """Run the configured warm-up steps. A failed step is logged and left lazy."""
+    start = time.perf_counter()
+    for name in steps:
+        fn = WARMUP_STEPS.get(name)
+        if fn is None:
+            logger.warning(f"Unknown warm-up step: {name}. Available: {list(WARMUP_STEPS)}")
+            continue
+        t0 = time.perf_counter()
+        try:
+            detail = fn()
+            _warmup_state["steps"][name] = {"ok": True, "detail": detail,
+                                            "ms": int((time.perf_counter() - t0) * 1000)}
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            _warmup_state["steps"][name] = {"ok": False, "error": str(e),
+                                            "ms": int((time.perf_counter() - t0) * 1000)}
+    _warmup_state["duration_ms"] = int((time.perf_counter() - start) * 1000)
+    _warmup_state["ready"] = True
+    logger.info(f"Warm-up finished in {_warmup_state['duration_ms']}ms")
+
+
 # ═══════════════════════════════════════════════════════════════
 #  LIFESPAN (startup/shutdown)
 # ═══════════════════════════════════════════════════════════════
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: pre-build graphs. Shutdown: cleanup."""
+    """Startup: pre-build graphs, start background warm-up. Shutdown: cleanup."""
     from workflows.graphs import get_graph
+    from config.settings import get_settings
     for name in ("extraction", "validation", "verification", "chat", "pipeline"):
         get_graph(name)
     logger.info("All LangGraph workflows compiled")
+
+    settings = get_settings()
+    if settings.app_warmup:
+        steps = [s.strip() for s in settings.app_warmup_steps.split(",") if s.strip()]
+        threading.Thread(target=_run_warmup, args=(steps,), name="warmup", daemon=True).start()
+    else:
+        _warmup_state["ready"] = True
     yield
     logger.info("Shutting down")
+    from utils.pdf_utils import shutdown_ocr_pool
+    from utils.llm_clients import aclose_llm_clients
+    from tools.server import shutdown_tool_pool
+    shutdown_ocr_pool()
+    shutdown_tool_pool()
+    await aclose_llm_clients()
 
 
 app = FastAPI(
@@ -67,10 +159,12 @@ if os.path.exists(STATIC_DIR):
 
 class ExtractRequest(BaseModel):
     pdf_bytes_b64: str                    # Base64-encoded PDF
-    method: str = "vision"                # vision | text | ocr
+    method: str = "vision"                # vision | text | ocr | hybrid
     llm_provider: str = "gemini"
     model_name: str = "gemini-2.5-flash"
     language: str = "en"
+    image_profile: str = ""               # lossless | balanced | compact (OpenAI vision)
+    chunking: str = ""                    # auto | always | off (long documents)
 
 class ValidateRequest(BaseModel):
     documents: dict                       # {doc_type: extracted_data}
@@ -82,6 +176,8 @@ class VerifyRequest(BaseModel):
 
 class VerifyBatchRequest(BaseModel):
     fields: list                          # [{tool_name, args}, ...]
+    max_parallel: int = 0                 # 0 → settings.verify_max_parallel
+    timeout_s: float = 0                  # per field; 0 → settings.verify_timeout_s
 
 class ChatRequest(BaseModel):
     message: str
@@ -96,6 +192,8 @@ class PipelineRequest(BaseModel):
     llm_provider: str = "gemini"
     model_name: str = "gemini-2.5-flash"
     language: str = "en"
+    image_profile: str = ""
+    chunking: str = ""
     verify_fields: list = []              # [{tool_name, args}]
 
 class CustomerLookupRequest(BaseModel):
@@ -120,11 +218,33 @@ async def health():
     return {"status": "ok", "service": "magna-ai-lc-platform", "version": "2.0.0"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe — 503 until the startup warm-up has finished."""
+    if not _warmup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up", "warmup": _warmup_state})
+    return {"status": "ready", "warmup": _warmup_state}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Extraction cache backend, hit/miss/eviction counters and entry count."""
+    from utils.extraction_cache import get_extraction_cache
+    return get_extraction_cache().stats()
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Per-provider LLM call counters, retries, hedges, p50/p95 latency and breaker state."""
+    from utils.llm_clients import get_llm_stats
+    return get_llm_stats()
+
+
 @app.get("/tools")
 async def get_tools():
     """List all registered FastMCP tools."""
-    from tools.server import list_tools
-    return {"tools": list_tools()}
+    from tools.server import alist_tools
+    return {"tools": await alist_tools()}
 
 
 @app.post("/extract")
@@ -132,18 +252,46 @@ async def extract(req: ExtractRequest):
     """Extract L/C fields from a PDF."""
     from workflows.graphs import get_graph
     graph = get_graph("extraction")
-    state = graph.invoke({
+    state = await graph.ainvoke({
         "pdf_bytes_b64": req.pdf_bytes_b64,
         "method": req.method,
         "llm_provider": req.llm_provider,
         "model_name": req.model_name,
         "language": req.language,
+        "image_profile": req.image_profile,
+        "chunking": req.chunking,
     })
     if state.get("error"):
         raise HTTPException(500, detail=state["error"])
     return state.get("result", {})
 
 
+@app.post("/extract/stream")
+async def extract_stream(req: ExtractRequest):
+    """Extract L/C fields as Server-Sent Events.
+
+    ``event: field`` ({"key", "value"}) is sent as soon as each field has been
+    generated, then ``event: done`` ({"result"}) with the full /extract result,
+    or ``event: error`` ({"error"}).
+    """
+    from tools.server import stream_extract_lc_document
+    try:
+        pdf_bytes = base64.b64decode(req.pdf_bytes_b64, validate=True)
+    except ValueError:
+        raise HTTPException(400, detail="pdf_bytes_b64 is not valid base64")
+
+    async def events():
+        async for event in stream_extract_lc_document(
+            pdf_bytes, method=req.method, llm_provider=req.llm_provider, model_name=req.model_name,
+            language=req.language, image_profile=req.image_profile, chunking=req.chunking,
+        ):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.post("/extract/upload")
 async def extract_upload(
     file: UploadFile = File(...),
@@ -151,6 +299,8 @@ async def extract_upload(
     llm_provider: str = Form("gemini"),
     model_name: str = Form("gemini-2.5-flash"),
     language: str = Form("en"),
+    image_profile: str = Form(""),
+    chunking: str = Form(""),
 ):
     """Extract L/C fields — accepts multipart file upload."""
     pdf_bytes = await file.read()
@@ -158,12 +308,14 @@ async def extract_upload(
 
     from workflows.graphs import get_graph
     graph = get_graph("extraction")
-    state = graph.invoke({
+    state = await graph.ainvoke({
         "pdf_bytes_b64": pdf_b64,
         "method": method,
         "llm_provider": llm_provider,
         "model_name": model_name,
         "language": language,
+        "image_profile": image_profile,
+        "chunking": chunking,
     })
     if state.get("error"):
         raise HTTPException(500, detail=state["error"])
@@ -175,7 +327,7 @@ async def validate(req: ValidateRequest):
     """Cross-validate multiple extracted documents."""
     from workflows.graphs import get_graph
     graph = get_graph("validation")
-    state = graph.invoke({"documents": req.documents, "language": req.language})
+    state = await graph.ainvoke({"documents": req.documents, "language": req.language})
     if state.get("error"):
         raise HTTPException(500, detail=state["error"])
     return state.get("result", {})
@@ -186,7 +338,7 @@ async def verify(req: VerifyRequest):
     """Verify a single field via external API."""
     from workflows.graphs import get_graph
     graph = get_graph("verification")
-    state = graph.invoke({"tool_name": req.tool_name, "args": req.args})
+    state = await graph.ainvoke({"tool_name": req.tool_name, "args": req.args})
     if state.get("error"):
         raise HTTPException(500, detail=state["error"])
     return state.get("result", {})
@@ -194,19 +346,21 @@ async def verify(req: VerifyRequest):
 
 @app.post("/verify/batch")
 async def verify_batch(req: VerifyBatchRequest):
-    """Verify multiple fields at once."""
-    from workflows.graphs import get_graph
-    # Use pipeline graph's batch verify logic directly
-    from tools.server import call_tool
-    results = []
-    errors = []
-    for field in req.fields:
-        try:
-            r = call_tool(field["tool_name"], field["args"])
-            results.append(r)
-        except Exception as e:
-            errors.append({"tool": field["tool_name"], "error": str(e)})
-    return {"results": results, "errors": errors}
+    """Verify multiple fields concurrently.
+
+    ``results``, ``errors`` and ``latency_ms`` are in the order of
+    ``fields``: a failed field has a None result and an error entry, a
+    successful one a None error.
+    """
+    from tools.server import acall_tools
+    start = time.perf_counter()
+    outcomes = await acall_tools(req.fields, req.max_parallel, req.timeout_s)
+    return {
+        "results": [o.get("result") for o in outcomes],
+        "errors": [{"tool": o["tool_name"], "error": o["error"]} if "error" in o else None for o in outcomes],
+        "latency_ms": [o["latency_ms"] for o in outcomes],
+        "total_ms": int((time.perf_counter() - start) * 1000),
+    }
 
 
 @app.post("/chat")
@@ -214,7 +368,7 @@ async def chat(req: ChatRequest):
     """Chat about an L/C document."""
     from workflows.graphs import get_graph
     graph = get_graph("chat")
-    state = graph.invoke({
+    state = await graph.ainvoke({
         "message": req.message,
         "extracted_data": req.extracted_data,
         "pdf_text": req.pdf_text,
@@ -231,18 +385,21 @@ async def pipeline(req: PipelineRequest):
     """Full pipeline: Extract → Validate → Verify."""
     from workflows.graphs import get_graph
     graph = get_graph("pipeline")
-    state = graph.invoke({
+    state = await graph.ainvoke({
         "pdf_bytes_b64": req.pdf_bytes_b64,
         "method": req.method,
         "llm_provider": req.llm_provider,
         "model_name": req.model_name,
         "language": req.language,
+        "image_profile": req.image_profile,
+        "chunking": req.chunking,
         "verify_fields": req.verify_fields,
     })
     return {
         "extraction": state.get("extraction_result"),
         "validation": state.get("validation_result"),
         "verifications": state.get("verification_results", []),
+        "verification_latency_ms": state.get("verification_latency_ms", []),
         "errors": state.get("errors", []),
     }
 
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark — UN/LOCODE port search: legacy linear scan vs prebuilt index.
+
+Replays the lookups ExternalAPIAgent.verify_port issues for real L/C port
+strings (country-filtered ports, country-filtered any, then global ports)
+and checks both implementations return identical results.
+
+Usage:
+  python bench_unlocode.py             # default: 200 rounds
+  python bench_unlocode.py --rounds 50
+"""
+import sys, os, re, time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+from utils.unlocode import _load_ports, search_port, get_ports_stats
+from agents.external_api_agent import COUNTRY_ALIASES, _guess_country_code
+
+# Port strings as they appear in fields 44E/44F of real L/C documents
+LC_PORT_STRINGS = [
+    "TRIPOLI, LIBYA",
+    "MISURATA SEAPORT",
+    "GENOA AND/OR LA SPEZIA",
+    "BENGHAZI PORT, LIBYA",
+    "ANY ITALIAN PORT",
+    "ALEXANDRIA, EGYPT",
+    "SHANGHAI OR NINGBO, CHINA",
+    "MERSIN SEAPORT, TURKEY",
+    "VALENCIA / BARCELONA",
+    "KHOMS",
+]
+
+
+def header(msg):
+    print(f"\n{'='*60}\n  {msg}\n{'='*60}")
+
+
+_legacy_ports = []
+
+
+def linear_search_port(query, country_code="", ports_only=False, max_results=10):
+    """The pre-index implementation of search_port — a full scan per call."""
+    q = query.lower().strip()
+    results = []
+    for p in _legacy_ports:
+        if ports_only and not p["is_port"]:
+            continue
+        if country_code and p["country_code"].upper() != country_code.upper():
+            continue
+        name_lower = p["name_ascii"].lower()
+        name_orig = p["name"].lower()
+        if name_lower == q or name_orig == q:
+            results.insert(0, {**p, "_score": 100})
+        elif name_lower.startswith(q) or name_orig.startswith(q):
+            results.append({**p, "_score": 80})
+        elif q in name_lower or q in name_orig:
+            results.append({**p, "_score": 60})
+        elif q.upper() == p["locode"] or q.upper() == p["location_code"]:
+            results.insert(0, {**p, "_score": 100})
+    results.sort(key=lambda x: (-x.get("_score", 0), -int(x["is_port"])))
+    for r in results:
+        r.pop("_score", None)
+    return results[:max_results]
+
+
+def build_calls(raw_port):
+    """Expand one raw L/C string into the search_port calls verify_port makes."""
+    cleaned = raw_port
+    for nw in ["seaport", "sea port", "port", "airport", "terminal", "harbour", "harbor"]:
+        cleaned = re.sub(r'\b' + re.escape(nw) + r'\b', "", cleaned, flags=re.IGNORECASE)
+    cleaned = cleaned.strip().strip(",").strip()
+    names = re.split(r'\s+AND/OR\s+|\s+AND\s+|\s+OR\s+|/|,', cleaned, flags=re.IGNORECASE)
+    names = [n.strip() for n in names if n.strip() and len(n.strip()) >= 2] or [raw_port]
+    doc_cc = _guess_country_code(raw_port)
+
+    calls = []
+    for name in names:
+        search_name = name
+        for alias in COUNTRY_ALIASES:
+            search_name = re.sub(r'\b' + re.escape(alias) + r'\b', '', search_name, flags=re.IGNORECASE).strip()
+        if len(search_name) < 2:
+            search_name = name
+        cc = _guess_country_code(name) or doc_cc
+        if cc:
+            calls.append((search_name, cc, True, 5))
+            calls.append((search_name, cc, False, 5))
+        calls.append((search_name, "", True, 10))
+    return calls
+
+
+def run(fn, calls, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for args in calls:
+            fn(*args)
+    return (time.perf_counter() - start) / (rounds * len(calls)) * 1e6
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[sys.argv.index("--rounds") + 1]) if "--rounds" in sys.argv else 200
+
+    header("UN/LOCODE search benchmark")
+    t0 = time.perf_counter()
+    table = _load_ports()
+    print(f"  Loaded {len(table)} locations + index in {(time.perf_counter() - t0) * 1000:.0f}ms")
+    if not len(table):
+        print("  ❌ No UNLOCODE CSV files found — nothing to benchmark.")
+        sys.exit(1)
+    # The legacy scan ran over one dict per location
+    _legacy_ports.extend(table.record(row) for row in range(len(table)))
+
+    calls = [c for s in LC_PORT_STRINGS for c in build_calls(s)]
+    mismatches = [c for c in calls if linear_search_port(*c) != search_port(*c)]
+    if mismatches:
+        print(f"  ❌ {len(mismatches)} call(s) differ, e.g. {mismatches[0]}")
+        sys.exit(1)
+    print(f"  ✅ {len(calls)} calls return identical results\n")
+
+    print(f"  {'L/C port string':30s} {'calls':>5s} {'linear µs':>11s} {'index µs':>10s} {'speedup':>8s}")
+    for s in LC_PORT_STRINGS:
+        c = build_calls(s)
+        old = run(linear_search_port, c, max(1, rounds // 20))
+        new = run(search_port, c, rounds)
+        print(f"  {s:30s} {len(c):5d} {old:11.0f} {new:10.1f} {old / new:7.0f}x")
+
+    old = run(linear_search_port, calls, max(1, rounds // 20))
+    new = run(search_port, calls, rounds)
+    print(f"\n  Mean per call: linear {old:.0f}µs → index {new:.1f}µs ({old / new:.0f}x)")
+
+    stats = get_ports_stats()
+    print(f"\n  Memory: table {stats['table_bytes'] / 1e6:.1f}MB + index {stats['index_bytes'] / 1e6:.1f}MB"
+          f" (process RSS {(stats['process_rss_bytes'] or 0) / 1e6:.0f}MB)")
@@ -24,7 +24,7 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from config.settings import get_settings, GEMINI_MODELS
-from schemas.lc_fields import SECTIONS
+from schemas.lc_fields import SECTIONS, VERIFIABLE_FIELDS
 from locales.i18n import t, is_rtl, get_available_languages
 
 settings = get_settings()
@@ -116,68 +116,6 @@ def api_lookup_customer(lookup_value: str):
     return api_post("/lookup_customer", {"lookup_value": lookup_value})
 
 
-# ═══════════════════════════════════════════════════════════════
-#  FIELD → VERIFICATION TOOL MAPPING
-# ═══════════════════════════════════════════════════════════════
-
-FIELD_API_MAPPING = {
-    "beneficiary_bank_swift": "verify_swift_code",
-    "correspondent_bank_swift": "verify_swift_code",
-    "advising_bank_swift": "verify_swift_code",
-    "available_at_correspondent": "verify_swift_code",
-    "port_loading": "verify_port",
-    "port_destination": "verify_port",
-    "port_of_loading": "verify_port",
-    "port_of_destination": "verify_port",
-    "port_of_discharge": "verify_port",
-    "named_place_port": "verify_port",
-    "place_of_receipt": "verify_port",
-    "hs_code": "verify_hs_code",
-    "goods_hs_code": "verify_hs_code",
-    "beneficiary_name": "verify_company",
-    "applicant_name": "check_sanctions",
-    "beneficiary_bank": "verify_bank_by_name",
-    "price_delivery_term": "_incoterm",
-    "incoterm": "_incoterm",
-    "delivery_term": "_incoterm",
-}
-
-VERIFY_PATTERNS = ["swift","bic","port","loading","destination","hs_code",
-                   "beneficiary_name","beneficiary_bank","applicant_name","incoterm"]
-
-
-def _get_verifiable_fields():
-    fields, seen = [], set()
-    for sec in SECTIONS:
-        for f in sec.fields:
-            if f.type in ("file","signature","stamp","checkbox") or f.key in seen:
-                continue
-            if f.key in FIELD_API_MAPPING:
-                fields.append((f.key, f, sec, FIELD_API_MAPPING[f.key]))
-                seen.add(f.key); continue
-            text = f"{f.key} {f.en} {f.ar}".lower()
-            for p in VERIFY_PATTERNS:
-                if p in text:
-                    vtype = _infer_verify_tool(f.key)
-                    if vtype:
-                        fields.append((f.key, f, sec, vtype))
-                        seen.add(f.key)
-                    break
-    return fields
-
-
-def _infer_verify_tool(k):
-    k = k.lower()
-    if any(w in k for w in ["swift","bic"]): return "verify_swift_code"
-    if any(w in k for w in ["port","loading","destination","discharge"]): return "verify_port"
-    if "hs" in k and "code" in k: return "verify_hs_code"
-    if "beneficiary_name" in k: return "verify_company"
-    if "applicant_name" in k: return "check_sanctions"
-    if "beneficiary_bank" in k and "swift" not in k: return "verify_bank_by_name"
-    if "incoterm" in k or "delivery_term" in k: return "_incoterm"
-    return None
-
-
 def _build_verify_args(tool_name, value):
     """Build the correct args dict for each verification tool."""
     if tool_name == "verify_swift_code": return {"code": value}
@@ -224,7 +162,8 @@ def _verify_single_field(field_key, value, tool_name):
     results = (batch or {}).get("results") or []
     errors = (batch or {}).get("errors") or []
 
-    if (not results) and errors:
+    # results/errors are aligned with the request: a failed field has a None result
+    if not (results and results[0]) and errors and errors[0]:
         err0 = errors[0] if isinstance(errors[0], dict) else {"error": str(errors[0])}
         return {
             "status": "error",
@@ -296,7 +235,7 @@ def _verify_all_async(fields_to_verify):
     for i, fk in enumerate(key_order):
         r = results[i] if i < len(results) else None
         if not r:
-            err = errors[i] if i < len(errors) else {"error": "Missing result"}
+            err = (errors[i] if i < len(errors) else None) or {"error": "Missing result"}
             out[fk] = {"status": "error", "message": str(err.get("error", err)), "confidence": 0.0, "source": "api_error", "details": err}
             continue
 
@@ -417,7 +356,7 @@ def render_section_form(section, info, lang):
             else:
                 info[f.key] = st.text_input(display_label + " (DD/MM/YYYY)", str(val) if val else "", key=wk)
         elif f.type == "select":
-            opts = [""] + f.options
+            opts = ["", *f.options]
             cur = str(val) if val else ""
             idx = opts.index(cur) if cur in opts else 0
             info[f.key] = st.selectbox(display_label, opts, index=idx, key=wk)
@@ -557,7 +496,7 @@ def render_verification_panel(info):
                 st.session_state["accepted"] = {}
                 st.rerun()
 
-        verifiable = _get_verifiable_fields()
+        verifiable = VERIFIABLE_FIELDS
         if not verifiable:
             st.info("No verifiable fields detected."); return
 
@@ -796,8 +735,8 @@ with st.sidebar:
         if provider == "gemini":
             gemini_model = st.selectbox("Gemini Model", GEMINI_MODELS, index=0)
 
-        methods = ["vision","text"]
-        method_labels = [t("vision_ai",lang), t("text_llm",lang)]
+        methods = ["vision","text","hybrid"]
+        method_labels = [t("vision_ai",lang), t("text_llm",lang), t("hybrid_llm",lang)]
         try:
             from pdf2image import convert_from_bytes
             methods.append("ocr"); method_labels.append(t("ocr_llm",lang))
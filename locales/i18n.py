@@ -16,6 +16,7 @@ STRINGS = {
         "extraction_method": "Extraction Method",
         "vision_ai": "Vision AI (send PDF to LLM)",
         "text_llm": "Text → LLM (fast)",
+        "hybrid_llm": "Hybrid (text pages + scanned pages as images)",
         "ocr_llm": "OCR → LLM",
         "extracting": "Extracting information...",
         "extraction_complete": "Extraction complete!",
@@ -58,6 +59,7 @@ STRINGS = {
         "extraction_method": "طريقة الاستخراج",
         "vision_ai": "الذكاء الاصطناعي البصري",
         "text_llm": "نص → ذكاء اصطناعي (سريع)",
+        "hybrid_llm": "هجين (صفحات نصية + صفحات ممسوحة كصور)",
         "ocr_llm": "التعرف الضوئي → ذكاء اصطناعي",
         "extracting": "جاري استخراج المعلومات...",
         "extraction_complete": "تم الاستخراج بنجاح!",
@@ -3,14 +3,23 @@ LC Fields Schema — SINGLE SOURCE OF TRUTH.
 
 This module defines every field in the L/C application.
 Used by: extraction prompts, frontend form generation, validation rules, export.
+
+The registry is immutable and built once at import: frozen FieldDef /
+SectionDef instances, flat field tuples, a key → field map, the verifiable
+fields and SCHEMA_VERSION — a hash of the whole definition that prompts and
+caches key on, so editing a field invalidates them.
 """
 
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import Optional
+import json
+import hashlib
+from dataclasses import dataclass, asdict, replace
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class FieldDef:
     """Definition of a single form field."""
     key: str
@@ -19,17 +28,20 @@ class FieldDef:
     es: str = ""                            # Spanish label
     it: str = ""                            # Italian label
     type: str = "text"                      # text | textarea | date | number | select | checkbox
-    options: list[str] = field(default_factory=list)  # For select fields
-    section: str = ""                       # Parent section key
+    options: tuple[str, ...] = ()           # For select fields
+    section: str = ""                       # Parent section key (set by SectionDef)
     required: bool = False                  # Required for submission
     extractable: bool = True                # Can be extracted from PDF
 
+    def __post_init__(self):
+        object.__setattr__(self, "options", tuple(self.options))
+
     def label(self, lang: str = "en") -> str:
         """Get label in the specified language, fallback to English."""
         return getattr(self, lang, "") or self.en
 
 
-@dataclass
+@dataclass(frozen=True)
 class SectionDef:
     """Definition of a form section."""
     key: str
@@ -37,7 +49,10 @@ class SectionDef:
     ar: str
     es: str = ""
     it: str = ""
-    fields: list[FieldDef] = field(default_factory=list)
+    fields: tuple[FieldDef, ...] = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, "fields", tuple(replace(f, section=self.key) for f in self.fields))
 
     def label(self, lang: str = "en") -> str:
         return getattr(self, lang, "") or self.en
@@ -47,7 +62,7 @@ class SectionDef:
 #  FULL LC FIELDS DEFINITION
 # ══════════════════════════════════════════════════════════════════════════════
 
-SECTIONS: list[SectionDef] = [
+SECTIONS: tuple[SectionDef, ...] = (
     SectionDef(
         key="basic_information",
         en="Basic Information", ar="المعلومات الأساسية",
@@ -223,28 +238,99 @@ SECTIONS: list[SectionDef] = [
             FieldDef("icc_rules_compliance", "ICC Rules Compliance", "الامتثال لقواعد غرفة التجارة الدولية", "Cumplimiento Reglas ICC", "Conformità Regole ICC", type="checkbox"),
         ],
     ),
-]
+)
 
-# ── Helper functions ──────────────────────────────────────────────────────────
+# ══════════════════════════════════════════════════════════════════════════════
+#  REGISTRY (built once at import)
+# ══════════════════════════════════════════════════════════════════════════════
 
-def get_all_fields() -> list[FieldDef]:
-    """Return a flat list of all fields across all sections."""
-    fields = []
-    for section in SECTIONS:
-        for f in section.fields:
-            f.section = section.key
-            fields.append(f)
-    return fields
+ALL_FIELDS: tuple[FieldDef, ...] = tuple(f for section in SECTIONS for f in section.fields)
+EXTRACTABLE_FIELDS: tuple[FieldDef, ...] = tuple(
+    f for f in ALL_FIELDS if f.extractable and f.type not in ("file", "signature", "stamp"))
+FIELD_MAP: Mapping[str, FieldDef] = MappingProxyType({f.key: f for f in ALL_FIELDS})
+SCHEMA_VERSION: str = hashlib.sha256(json.dumps(
+    [asdict(section) for section in SECTIONS], sort_keys=True, ensure_ascii=False,
+).encode("utf-8")).hexdigest()[:12]
+
+
+def get_all_fields() -> tuple[FieldDef, ...]:
+    """Return a flat tuple of all fields across all sections."""
+    return ALL_FIELDS
 
 
-def get_extractable_fields() -> list[FieldDef]:
+def get_extractable_fields() -> tuple[FieldDef, ...]:
     """Return only fields that can be extracted from documents."""
-    return [f for f in get_all_fields() if f.extractable and f.type not in ("file", "signature", "stamp")]
+    return EXTRACTABLE_FIELDS
 
 
-def get_field_map() -> dict[str, FieldDef]:
-    """Return {field_key: FieldDef} map."""
-    return {f.key: f for f in get_all_fields()}
+def get_field_map() -> Mapping[str, FieldDef]:
+    """Return a read-only {field_key: FieldDef} map."""
+    return FIELD_MAP
+
+
+# ── Field → verification tool ─────────────────────────────────────────────────
+
+FIELD_VERIFY_TOOLS: Mapping[str, str] = MappingProxyType({
+    "beneficiary_bank_swift": "verify_swift_code",
+    "correspondent_bank_swift": "verify_swift_code",
+    "advising_bank_swift": "verify_swift_code",
+    "available_at_correspondent": "verify_swift_code",
+    "port_loading": "verify_port",
+    "port_destination": "verify_port",
+    "port_of_loading": "verify_port",
+    "port_of_destination": "verify_port",
+    "port_of_discharge": "verify_port",
+    "named_place_port": "verify_port",
+    "place_of_receipt": "verify_port",
+    "hs_code": "verify_hs_code",
+    "goods_hs_code": "verify_hs_code",
+    "beneficiary_name": "verify_company",
+    "applicant_name": "check_sanctions",
+    "beneficiary_bank": "verify_bank_by_name",
+    "price_delivery_term": "_incoterm",
+    "incoterm": "_incoterm",
+    "delivery_term": "_incoterm",
+})
+
+VERIFY_PATTERNS = ("swift", "bic", "port", "loading", "destination", "hs_code",
+                   "beneficiary_name", "beneficiary_bank", "applicant_name", "incoterm")
+
+
+def _infer_verify_tool(key: str) -> str | None:
+    k = key.lower()
+    if any(w in k for w in ("swift", "bic")): return "verify_swift_code"
+    if any(w in k for w in ("port", "loading", "destination", "discharge")): return "verify_port"
+    if "hs" in k and "code" in k: return "verify_hs_code"
+    if "beneficiary_name" in k: return "verify_company"
+    if "applicant_name" in k: return "check_sanctions"
+    if "beneficiary_bank" in k and "swift" not in k: return "verify_bank_by_name"
+    if "incoterm" in k or "delivery_term" in k: return "_incoterm"
+    return None
+
+
+def _build_verifiable_fields() -> tuple[tuple[str, FieldDef, SectionDef, str], ...]:
+    fields, seen = [], set()
+    for section in SECTIONS:
+        for f in section.fields:
+            if f.type in ("file", "signature", "stamp", "checkbox") or f.key in seen:
+                continue
+            if f.key in FIELD_VERIFY_TOOLS:
+                fields.append((f.key, f, section, FIELD_VERIFY_TOOLS[f.key]))
+                seen.add(f.key)
+                continue
+            text = f"{f.key} {f.en} {f.ar}".lower()
+            for p in VERIFY_PATTERNS:
+                if p in text:
+                    tool = _infer_verify_tool(f.key)
+                    if tool:
+                        fields.append((f.key, f, section, tool))
+                        seen.add(f.key)
+                    break
+    return tuple(fields)
+
+
+# (field_key, FieldDef, SectionDef, verification tool) in form order
+VERIFIABLE_FIELDS: tuple[tuple[str, FieldDef, SectionDef, str], ...] = _build_verifiable_fields()
 
 
 def build_extraction_json_keys() -> dict[str, str]:
@@ -252,6 +338,35 @@ def build_extraction_json_keys() -> dict[str, str]:
     return {f.key: "value or null" for f in get_extractable_fields()}
 
 
+def build_extraction_json_schema() -> dict:
+    """JSON Schema of the extraction result, for provider structured-output modes.
+
+    Every extractable field is a required, nullable property: checkboxes are
+    booleans, everything else a string (labels, date format and select
+    options go in the description).
+    """
+    properties = {}
+    for f in get_extractable_fields():
+        description = f"{f.en} / {f.ar}"
+        if f.type == "checkbox":
+            properties[f.key] = {"type": ["boolean", "null"], "description": description}
+            continue
+        if f.type == "date":
+            description += " (DD/MM/YYYY)"
+        elif f.type == "select" and f.options:
+            description += f" — one of: {', '.join(f.options)}"
+        properties[f.key] = {"type": ["string", "null"], "description": description}
+    return {"type": "object", "properties": properties,
+            "required": list(properties), "additionalProperties": False}
+
+
+@lru_cache(maxsize=None)
+def extraction_json_schema() -> dict:
+    """Response schema for structured-output extraction calls (do not mutate)."""
+    return build_extraction_json_schema()
+
+
+@lru_cache(maxsize=None)
 def build_field_hints(lang: str = "en") -> str:
     """Build a human-readable field reference for LLM prompts."""
     lines = []
@@ -262,8 +377,45 @@ def build_field_hints(lang: str = "en") -> str:
     return "\n".join(lines)
 
 
+@lru_cache(maxsize=None)
+def build_extraction_prompt(language: str = "en", structured: bool = False) -> str:
+    """Static extraction instructions for a language — built once per process.
+
+    ``structured``: the output shape comes from the response schema (see
+    extraction_json_schema), so the JSON key template is left out.
+    """
+    field_hints = build_field_hints(language)
+    if structured:
+        target = "the JSON object defined by the response schema"
+        output = "Return the JSON object defined by the response schema."
+    else:
+        target = "the JSON structure below"
+        json_keys = json.dumps(build_extraction_json_keys(), indent=2)
+        output = f"Return ONLY a raw JSON object — no markdown fences:\n{json_keys}"
+    return f"""You are an expert trade-finance and Letter of Credit (L/C) document analyst.
+You can read documents in English, Arabic, Spanish, and Italian.
+
+TASK: Extract ALL information from the document into {target}.
+
+FIELD REFERENCE (key → English label / Arabic label):
+{field_hints}
+
+RULES:
+1. Read the ENTIRE document — every line, header, footer, stamp, annotation.
+2. Extract EVERY value. NEVER return null if data exists ANYWHERE.
+3. Convert ALL dates to DD/MM/YYYY.
+4. For amounts, include currency code + number (e.g., "USD 150,000.00").
+5. If a field truly cannot be found, use null.
+
+{output}"""
+
+
+@lru_cache(maxsize=None)
 def get_sections_as_dict(lang: str = "en") -> list[dict]:
-    """Export sections as JSON-serializable dicts for the frontend."""
+    """Export sections as JSON-serializable dicts for the frontend.
+
+    Built once per language and shared between callers — do not mutate.
+    """
     result = []
     for section in SECTIONS:
         s = {
@@ -281,7 +433,7 @@ def get_sections_as_dict(lang: str = "en") -> list[dict]:
                 "required": f.required,
             }
             if f.options:
-                fd["options"] = f.options
+                fd["options"] = list(f.options)
             s["fields"].append(fd)
         result.append(s)
     return result
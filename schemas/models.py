@@ -17,6 +17,14 @@ class ExtractionMethod(str, Enum):
     TEXT = "text"
     VISION = "vision"
     OCR = "ocr"
+    HYBRID = "hybrid"   # text layer where present, vision for image-only pages
+
+
+class VisionImageProfile(str, Enum):
+    """How PDF pages are encoded for OpenAI vision (see utils.pdf_utils.VISION_PROFILES)."""
+    LOSSLESS = "lossless"   # 200 DPI RGB PNG
+    BALANCED = "balanced"   # grayscale JPEG at the model's effective resolution
+    COMPACT = "compact"     # grayscale WebP, lower quality
 
 
 class ExtractionResult(BaseModel):
@@ -31,6 +39,10 @@ class ExtractionResult(BaseModel):
     # PDF preprocessing outputs (moved from frontend to backend)
     pdf_text: str = ""
     is_scanned: bool = False
+    # Chunked extraction of long documents
+    chunks: list[dict[str, Any]] = []           # per chunk: index, pages, ms, fields_found[, error]
+    field_conflicts: dict[str, Any] = {}
+    failed_pages: list[int] = []                # pages of failed chunks — result is partial
 
 
 # ═══════════════════════════════════════════════════
@@ -132,6 +144,8 @@ class ExtractionRequest(BaseModel):
     llm_provider: str = "gemini"
     model_name: str = "gemini-2.5-flash"
     language: str = "en"
+    image_profile: Optional[VisionImageProfile] = None   # None → settings.vision_image_profile
+    chunking: Optional[str] = None                        # auto | always | off; None → settings.extraction_chunking
     user_id: Optional[str] = None
     tenant_id: Optional[str] = None
 
@@ -51,6 +51,54 @@ async function extractDocument(pdfBytesB64, method, provider, model) {
     });
 }
 
+/**
+ * Extract via /extract/stream (Server-Sent Events). Calls onField(key, value)
+ * as each field arrives and resolves with the final result.
+ */
+async function extractDocumentStream(pdfBytesB64, method, provider, model, onField) {
+    const response = await fetch(`${API_BASE}/extract/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            pdf_bytes_b64: pdfBytesB64,
+            method: method,
+            llm_provider: provider,
+            model_name: model,
+            language: 'en',
+        }),
+    });
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({ detail: response.statusText }));
+        throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+            const message = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            let event = 'message';
+            let data = '';
+            for (const line of message.split('\n')) {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            const payload = JSON.parse(data || '{}');
+            if (event === 'field') onField(payload.key, payload.value);
+            else if (event === 'done') return payload.result;
+            else if (event === 'error') return { success: false, error: payload.error };
+        }
+    }
+    throw new Error('Extraction stream ended early');
+}
+
 async function validateDocument(documents) {
     return apiPost('/validate', {
         documents: documents,
@@ -203,8 +251,27 @@ async function handleExtraction() {
 
     showLoading('Extracting L/C fields...');
 
+    let streamedFields = 0;
+    const onField = (key, value) => {
+        if (streamedFields++ === 0) {
+            // First field — swap the spinner for the live results grid
+            hideLoading();
+            document.getElementById('welcomeScreen').style.display = 'none';
+            document.getElementById('resultsArea').classList.remove('hidden');
+            document.getElementById('fieldsGrid').innerHTML = '';
+        }
+        appendFieldRow(key, value);
+    };
+
     try {
-        const result = await extractDocument(base64, method, provider, model);
+        let result;
+        try {
+            result = await extractDocumentStream(base64, method, provider, model, onField);
+        } catch (error) {
+            if (streamedFields > 0) throw error;
+            // Streaming unavailable (proxy, older server) — fall back to the one-shot endpoint
+            result = await extractDocument(base64, method, provider, model);
+        }
 
         if (result.success) {
             state.extractionResult = result;
@@ -260,19 +327,7 @@ function displayResults(result) {
     if (fieldEntries.length === 0) {
         fieldsGrid.innerHTML = '<p style="color: var(--text-secondary);">No fields extracted.</p>';
     } else {
-        fieldsGrid.innerHTML = fieldEntries
-            .map(([key, value]) => {
-                const label = formatFieldLabel(key);
-                const displayValue = String(value).substring(0, 100);
-                return `
-                    <div class="field-row">
-                        <div class="field-label">${label}</div>
-                        <div class="field-value">${escapeHtml(displayValue)}</div>
-                        <div class="field-confidence conf-high">✓</div>
-                    </div>
-                `;
-            })
-            .join('');
+        fieldsGrid.innerHTML = fieldEntries.map(([key, value]) => renderFieldRow(key, value)).join('');
     }
 
     // PDF Preview Tab
@@ -292,6 +347,23 @@ function displayResults(result) {
     document.getElementById('rawResponse').textContent = JSON.stringify(result, null, 2);
 }
 
+function renderFieldRow(key, value) {
+    const label = formatFieldLabel(key);
+    const displayValue = String(value).substring(0, 100);
+    return `
+        <div class="field-row">
+            <div class="field-label">${label}</div>
+            <div class="field-value">${escapeHtml(displayValue)}</div>
+            <div class="field-confidence conf-high">✓</div>
+        </div>
+    `;
+}
+
+function appendFieldRow(key, value) {
+    if (value === null || value === '') return;
+    document.getElementById('fieldsGrid').insertAdjacentHTML('beforeend', renderFieldRow(key, value));
+}
+
 function formatFieldLabel(key) {
     return key
         .replace(/_/g, ' ')
@@ -465,7 +537,7 @@ async function handleVerifyAll() {
         const result = await verifyBatch(batchRequest);
 
         displayVerificationResults(fieldsToVerify, result.results || [], result.errors || []);
-        showSuccess(`Verified ${result.results?.length || 0} fields`);
+        showSuccess(`Verified ${(result.results || []).filter(Boolean).length} fields`);
     } catch (error) {
         showError(`Verification failed: ${error.message}`);
     } finally {
@@ -6,6 +6,7 @@ Usage:
   python test_stack.py --tools       # Test FastMCP tools directly (no server needed)
   python test_stack.py --graphs      # Test LangGraph workflows
   python test_stack.py --api         # Test FastAPI endpoints (requires: python main.py)
+  python test_stack.py --load [N]    # Concurrency on one uvicorn worker (no server needed)
   python test_stack.py --all         # Run all tests
 """
 import sys, os, json, asyncio
@@ -80,9 +81,78 @@ def test_tools():
     else:
         print(f"  ⚠️ Chat failed (likely no API keys): {chat_result}")
 
+    test_stream_parsing()
+    test_chunk_merge()
+
     print("\n  ✅ FastMCP tools test PASSED")
 
 
+def test_stream_parsing():
+    """JSONFieldStream must give the same fields however the stream is split."""
+    from utils.llm_clients import JSONFieldStream, parse_json_response
+
+    raw = ('Here you go:\n```json\n{"lc_number": "LC-\\"77\\"-8", "amount": 150000.5, '
+           '"applicant_address": "Via Roma 1\\nGenoa \\\\ IT \\u00e9", "currency": "N/A", '
+           '"nested": {"a": [1, {"b": "}]"}]}, "bills_of_lading": true, "expiry_date": null}\n```')
+    expected = list(parse_json_response(raw).items())
+
+    def _fields(chunks):
+        stream, out = JSONFieldStream(), []
+        for chunk in chunks:
+            out += stream.feed(chunk)
+        return out, stream.done
+
+    print("\n  Testing JSONFieldStream chunk splits...")
+    # Every two-way split (mid-key, mid-string, between a backslash and what it
+    # escapes, inside \\u00e9), then one character at a time
+    for cut in range(len(raw) + 1):
+        fields, done = _fields([raw[:cut], raw[cut:]])
+        assert fields == expected and done, f"split at {cut} ({raw[max(0, cut - 5):cut]!r}|…): {fields}"
+    fields, done = _fields(list(raw))
+    assert fields == expected and done, f"char-by-char: {fields}"
+
+    # Fields arrive as soon as their value closes, not at the end of the object
+    stream = JSONFieldStream()
+    assert stream.feed('{"lc_number": "LC-1", "amo') == [("lc_number", "LC-1")]
+    assert stream.feed('unt": "USD \\"5\\"') == []
+    assert stream.feed('"}') == [("amount", 'USD "5"')] and stream.done
+    print(f"  ✅ {len(raw) + 2} splittings parse to the same {len(expected)} fields")
+
+
+def test_chunk_merge():
+    """merge_extractions: textarea join, checkbox OR, majority vote and conflicts."""
+    from utils.chunked_extraction import merge_extractions
+
+    print("\n  Testing chunked extraction merge...")
+    merged, conflicts = merge_extractions([
+        ([1, 2], {"lc_number": "LC-1", "currency": "USD", "goods_description": "Steel pipes",
+                  "bills_of_lading": False, "airway_bill": "no", "expiry_date": None}),
+        ([3], {"lc_number": "lc-1 ", "currency": "EUR", "goods_description": "STEEL   pipes",
+               "bills_of_lading": "yes", "applicant_address": "Via Roma 1"}),
+        ([4], {"lc_number": "LC-2", "currency": "EUR", "goods_description": "Packed in crates",
+               "applicant_address": "Via Roma 1, Genoa", "expiry_date": ""}),
+        ([5], {"currency": "GBP"}),
+    ])
+
+    # Majority vote on normalized values; the earliest spelling is kept
+    assert merged["lc_number"] == "LC-1", merged["lc_number"]
+    assert conflicts["lc_number"] == [{"value": "LC-1", "pages": [1, 2, 3]}, {"value": "LC-2", "pages": [4]}]
+    # Page count decides the vote, not the number of chunks: USD (2 pages) ties EUR (2 pages),
+    # and ties go to the earliest chunk
+    assert merged["currency"] == "USD", merged["currency"]
+    assert [c["value"] for c in conflicts["currency"]] == ["USD", "EUR", "GBP"]
+    # Textareas: distinct values joined in page order, values another chunk contains dropped
+    assert merged["goods_description"] == "Steel pipes\nPacked in crates", merged["goods_description"]
+    assert merged["applicant_address"] == "Via Roma 1, Genoa", merged["applicant_address"]
+    assert "goods_description" not in conflicts
+    # Checkboxes: true if any chunk found it
+    assert merged["bills_of_lading"] is True and merged["airway_bill"] is False
+    # Only null / empty everywhere → None, no conflict
+    assert merged["expiry_date"] is None and "expiry_date" not in conflicts
+    assert set(conflicts) == {"lc_number", "currency"}, conflicts
+    print(f"  ✅ {len(merged)} merged fields, conflicts on {sorted(conflicts)}")
+
+
 # ═══════════════════════════════════════════════════════════════
 #  TEST 2: LangGraph Workflows
 # ═══════════════════════════════════════════════════════════════
@@ -97,9 +167,9 @@ def test_graphs():
         print(f"  ✅ Built graph: {name}")
 
     # Test validation graph
-    print("\n  Running validation_graph.invoke()...")
+    print("\n  Running validation_graph.ainvoke()...")
     graph = get_graph("validation")
-    state = graph.invoke({
+    state = asyncio.run(graph.ainvoke({
         "documents": {
             "letter_of_credit": {
                 "lc_number": "LC-TEST-999",
@@ -109,7 +179,7 @@ def test_graphs():
             },
         },
         "language": "en",
-    })
+    }))
 
     result = state.get("result", {})
     print(f"  ✅ Validation: {result.get('total_checks',0)} checks")
@@ -193,6 +263,83 @@ def test_api():
     print("\n  ✅ FastAPI endpoints test PASSED")
 
 
+# ═══════════════════════════════════════════════════════════════
+#  TEST 4: Load — concurrent requests on a single uvicorn worker
+# ═══════════════════════════════════════════════════════════════
+
+def test_load(n: int = 12, delay: float = 2.0):
+    """Fire n slow /verify requests at once and poll /health while they run.
+
+    A probe tool that sleeps ``delay`` seconds stands in for an LLM or
+    registry call. With the graphs awaited on the event loop the batch
+    finishes in about one delay, not n of them, and /health stays fast.
+    """
+    header(f"TEST: Load ({n} concurrent requests, one worker)")
+    import time, threading
+    import httpx, uvicorn
+    from config.settings import get_settings
+    os.environ["APP_WARMUP"] = "false"          # keep warmup threads out of the measurement
+    get_settings.cache_clear()
+
+    from tools.server import mcp
+    from api.main import app
+
+    @mcp.tool(name="load_probe")
+    def load_probe(delay: float) -> dict:
+        time.sleep(delay)
+        return {"verified": True, "message": f"slept {delay}s"}
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, workers=1, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    async def _run():
+        async with httpx.AsyncClient(base_url=base, timeout=n * delay + 30) as client:
+            async def _verify():
+                t0 = time.perf_counter()
+                r = await client.post("/verify", json={"tool_name": "load_probe", "args": {"delay": delay}})
+                return r.json().get("verified"), time.perf_counter() - t0
+
+            async def _health(done):
+                samples = []
+                while not done.is_set():
+                    t0 = time.perf_counter()
+                    await client.get("/health")
+                    samples.append(time.perf_counter() - t0)
+                    await asyncio.sleep(0.1)
+                return samples
+
+            done = asyncio.Event()
+            probe = asyncio.create_task(_health(done))
+            t0 = time.perf_counter()
+            results = await asyncio.gather(*(_verify() for _ in range(n)))
+            wall = time.perf_counter() - t0
+            done.set()
+            return results, wall, await probe
+
+    try:
+        results, wall, health = asyncio.run(_run())
+    finally:
+        server.should_exit = True
+
+    serial = sum(s for _, s in results)
+    ok = sum(1 for v, _ in results if v)
+    print(f"  {ok}/{n} requests verified")
+    print(f"  Wall time:      {wall:.2f}s  (serial would be ≥ {n * delay:.1f}s, sum of latencies {serial:.1f}s)")
+    print(f"  Parallelism:    {serial / wall:.1f}x")
+    print(f"  /health:        {len(health)} polls, max {max(health) * 1000:.0f} ms")
+
+    workers = get_settings().tool_workers
+    expected = delay * -(-n // workers)          # ceil(n / tool_workers) rounds of the probe
+    if ok == n and wall < expected + delay and max(health) < 0.5:
+        print("\n  ✅ Load test PASSED — requests served in parallel, event loop stayed responsive")
+    else:
+        print(f"\n  ❌ Load test FAILED — expected ~{expected:.1f}s wall and /health under 500 ms")
+
+
 # ═══════════════════════════════════════════════════════════════
 #  MAIN
 # ═══════════════════════════════════════════════════════════════
@@ -204,6 +351,9 @@ if __name__ == "__main__":
         test_graphs()
     elif "--api" in sys.argv:
         test_api()
+    elif "--load" in sys.argv:
+        rest = sys.argv[sys.argv.index("--load") + 1:]
+        test_load(int(rest[0]) if rest and rest[0].isdigit() else 12)
     elif "--all" in sys.argv:
         test_tools()
         test_graphs()
@@ -213,6 +363,7 @@ if __name__ == "__main__":
         print("Quick start:")
         print("  python test_stack.py --tools   # No server needed")
         print("  python test_stack.py --graphs  # No server needed")
+        print("  python test_stack.py --load    # No server needed")
         print("")
         print("  python main.py                 # Terminal 1: start FastAPI")
         print("  python test_stack.py --api     # Terminal 2: test endpoints")
@@ -5,19 +5,26 @@ This is the ONLY place tools are defined. Each tool is a plain function
 that calls business logic from utils/. No agent classes, no registries.
 
 Run standalone:  python -m tools.server
-Run in-process:  from tools.server import mcp, call_tool
+Run in-process:  from tools.server import mcp, call_tool   (async code: acall_tool)
 """
 from __future__ import annotations
 import asyncio
 import base64
+import hashlib
+import inspect
 import json
 import logging
+import threading
 import time
 import re
-from typing import Any
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
 
 from fastmcp import FastMCP
 
+# Shared with the v1 ExtractionAgent so both extraction paths send the same prompt and schema
+from schemas.lc_fields import build_extraction_prompt, extraction_json_schema
+
 logger = logging.getLogger(__name__)
 
 mcp = FastMCP(
@@ -31,93 +38,331 @@ mcp = FastMCP(
 #  EXTRACTION TOOL
 # ═══════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=None)
+def extraction_prompt_version(language: str = "en", structured: bool = False) -> str:
+    """Short hash of the extraction prompt, field registry and response schema —
+    part of the extraction cache key."""
+    from schemas.lc_fields import SCHEMA_VERSION
+    text = SCHEMA_VERSION + build_extraction_prompt(language, structured)
+    if structured:
+        text += json.dumps(extraction_json_schema(), sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _extraction_cache_key(pdf_sha256: str, method: str, llm_provider: str, model_name: str, language: str,
+                          image_profile: str, chunking: str, structured: bool) -> str:
+    from utils.extraction_cache import extraction_cache_key
+
+    # The image profile only changes what OpenAI vision sees
+    method_key = f"{method}:{image_profile}" if method in ("vision", "hybrid") and llm_provider != "gemini" else method
+    method_key += f":chunks-{chunking}"
+    return extraction_cache_key(pdf_sha256, method_key, llm_provider, model_name, language,
+                                extraction_prompt_version(language, structured))
+
+
+def _prepare_extraction(doc, method: str, llm_provider: str, image_profile: str, base_prompt: str) -> dict:
+    """Prompt + payload for a single-prompt extraction, and the preprocessing outputs.
+
+    Returns {"instructions" (the static ``base_prompt``, sent separately so
+    providers can cache it), "prompt" (the per-document part), "pdf_bytes"
+    (Gemini vision), "images"/"mime_types" (OpenAI vision), "pdf_text",
+    "extras"}; no payload → text prompt.
+    """
+    from utils.pdf_utils import PAGE_TEXT, PAGE_IMAGE
+    from config.settings import MAX_PDF_TEXT_FOR_LLM, MAX_VISION_PAGES
+
+    prep = {"instructions": base_prompt, "pdf_bytes": None, "images": None, "mime_types": None,
+            "pdf_text": "", "extras": {}}
+    if method == "vision":
+        prep["prompt"] = "Document pages provided as images. Read every page. ONLY JSON."
+        if llm_provider == "gemini":
+            prep["pdf_bytes"] = doc.pdf_bytes
+        else:
+            prep["images"], prep["mime_types"], prep["extras"]["image_stats"] = \
+                doc.vision_images(MAX_VISION_PAGES, image_profile)
+        # For vision, still extract text for chat/preview (fallback to PyPDF2)
+        prep["pdf_text"] = doc.text if not doc.is_scanned else ""
+    elif method == "hybrid":
+        page_map = doc.page_map()
+        prep["extras"]["page_map"] = page_map
+        text_pages = [n for n, kind in page_map.items() if kind == PAGE_TEXT]
+        image_pages = [n for n, kind in page_map.items() if kind == PAGE_IMAGE][:MAX_VISION_PAGES]
+        text = doc.text_of_pages(text_pages)
+        prep["pdf_text"] = text
+        prompt = ""
+        if text:
+            prompt += f"DOCUMENT TEXT (pages with a text layer):\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\n"
+        if not image_pages:
+            prompt += "JSON:"
+        else:
+            prompt += (f"\nPages {', '.join(map(str, image_pages))} have no text layer and are "
+                       f"provided as images, in that order. Read them too. ONLY JSON.")
+            if llm_provider == "gemini":
+                prep["pdf_bytes"] = doc.subset_pdf(image_pages)
+            else:
+                prep["images"], prep["mime_types"], prep["extras"]["image_stats"] = \
+                    doc.vision_images(MAX_VISION_PAGES, image_profile, pages=image_pages)
+        prep["prompt"] = prompt.strip()
+    elif method == "ocr":
+        text = doc.ocr_text()
+        prep["extras"]["ocr_timings"] = [{k: p[k] for k in ("page", "raster_ms", "ocr_ms")} for p in doc.ocr_pages()]
+        prep["pdf_text"] = text  # Store full OCR text
+        prep["prompt"] = f"DOCUMENT TEXT (OCR):\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\nJSON:"
+    else:
+        text = doc.text
+        prep["pdf_text"] = text  # Store full text
+        prep["prompt"] = f"DOCUMENT TEXT:\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\nJSON:"
+    return prep
+
+
+def _chunked_pdf_text(doc, method: str) -> str:
+    """pdf_text for a chunked extraction — the same text the single-prompt path keeps."""
+    from utils.pdf_utils import PAGE_TEXT
+    if method == "ocr":
+        return doc.ocr_text()
+    if method == "hybrid":
+        return doc.text_of_pages(doc.pages_of_kind(PAGE_TEXT))
+    return doc.text if method == "text" or not doc.is_scanned else ""
+
+
+def _extraction_result(parsed: dict, raw: str, method: str, start: float, pdf_text: str, scanned: bool,
+                       pdf_sha256: str, extras: dict) -> dict:
+    """The tool result for a finished extraction."""
+    found = sum(1 for v in parsed.values() if v is not None)
+    elapsed = int((time.perf_counter() - start) * 1000)
+    return {
+        "success": True, "extracted_data": parsed, "raw_llm_response": raw,
+        "fields_found": found, "fields_total": len(parsed),
+        "method_used": method, "processing_time_ms": elapsed,
+        # PDF preprocessing outputs (now backend responsibility)
+        "pdf_text": pdf_text, "is_scanned": scanned,
+        "pdf_sha256": pdf_sha256,
+        **extras,
+    }
+
+
+def _store_extraction(cache_key: str, result: dict):
+    """Cache ``result`` unless it is empty (unparseable reply) or a chunk failed —
+    a re-run should call the LLM again rather than get the bad result back."""
+    from utils.extraction_cache import get_extraction_cache
+
+    if not result["fields_found"] or result.get("failed_pages"):
+        logger.info(f"Not caching extraction of PDF {result['pdf_sha256'][:12]}: empty or incomplete result")
+        return
+    get_extraction_cache().set(cache_key, result)
+
+
+def _finish_extraction(parsed: dict, raw: str, method: str, start: float, pdf_text: str, scanned: bool,
+                       pdf_sha256: str, extras: dict, cache_key: str) -> dict:
+    """Build the tool result and store it in the extraction cache."""
+    result = _extraction_result(parsed, raw, method, start, pdf_text, scanned, pdf_sha256, extras)
+    _store_extraction(cache_key, result)
+    return {**result, "cache_hit": False}
+
+
+def _extract_chunked(doc, method: str, base_prompt: str, llm_provider: str, model_name: str, image_profile: str,
+                     schema: dict | None, start: float, scanned: bool, pdf_sha256: str, cache_key: str) -> dict:
+    """Chunked extraction (sync: the chunks run on their own thread pool) → tool result."""
+    from utils.chunked_extraction import extract_chunked
+
+    parsed, chunk_info = extract_chunked(doc, method, base_prompt, llm_provider, model_name,
+                                         image_profile=image_profile, response_schema=schema)
+    raw = "\n\n".join(chunk_info["raw_responses"])
+    extras = {"chunks": chunk_info["chunks"], "field_conflicts": chunk_info["conflicts"],
+              "failed_pages": chunk_info["failed_pages"]}
+    if method == "hybrid":
+        extras["page_map"] = doc.page_map()
+    return _finish_extraction(parsed, raw, method, start, _chunked_pdf_text(doc, method), scanned,
+                              pdf_sha256, extras, cache_key)
+
+
 @mcp.tool(tags={"extraction"})
-def extract_lc_document(
+async def extract_lc_document(
     pdf_bytes_b64: str,
     method: str = "vision",
     llm_provider: str = "gemini",
     model_name: str = "gemini-2.5-flash",
     language: str = "en",
+    use_cache: bool = True,
+    image_profile: str = "",
+    chunking: str = "",
 ) -> dict:
-    """Extract all L/C fields from a PDF into structured JSON."""
-    from schemas.lc_fields import build_extraction_json_keys, build_field_hints
-    from utils.llm_clients import (
-        call_gemini, call_openai, call_gemini_vision, call_openai_vision, parse_json_response,
-    )
-    from utils.pdf_utils import extract_text_pypdf2, extract_text_ocr, pdf_to_base64_images, is_scanned_pdf
-    from config.settings import MAX_PDF_TEXT_FOR_LLM, MAX_VISION_PAGES
+    """Extract all L/C fields from a PDF into structured JSON.
+
+    ``method``: vision | text | ocr | hybrid. Hybrid sends the text layer of
+    pages that have one and only the image-only pages to the vision model.
+
+    Successful results are cached by PDF content + method/provider/model/language
+    and prompt version; pass ``use_cache=False`` to force a fresh LLM call.
+    ``image_profile`` (lossless | balanced | compact) sets how pages are
+    encoded for OpenAI vision; empty → VISION_IMAGE_PROFILE.
+    ``chunking`` (auto | always | off; empty → EXTRACTION_CHUNKING) splits
+    documents longer than one prompt into page chunks that are extracted
+    concurrently and merged, instead of truncating them. If some chunks fail
+    the result is partial: ``failed_pages`` lists their pages and it is not cached.
+
+    The LLM call is native async; PDF parsing, rendering, OCR, chunked
+    extraction and cache I/O run in worker threads, off the caller's loop.
+    """
+    from utils.llm_clients import acall_llm, acall_gemini_vision, acall_openai_vision, parse_json_response
+    from utils.pdf_utils import PdfDocument
+    from config.settings import get_settings
+    from utils.extraction_cache import get_extraction_cache
+    from utils.chunked_extraction import needs_chunking
 
     start = time.perf_counter()
     pdf_bytes = base64.b64decode(pdf_bytes_b64)
 
+    settings = get_settings()
+    image_profile = image_profile or settings.vision_image_profile
+    chunking = chunking or settings.extraction_chunking
+
+    pdf_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+    cache = get_extraction_cache()
+    structured = settings.extraction_structured_output
+    schema = extraction_json_schema() if structured else None
+    cache_key = _extraction_cache_key(pdf_sha256, method, llm_provider, model_name, language,
+                                      image_profile, chunking, structured)
+    if use_cache:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"Extraction cache hit ({cache.backend}) for PDF {pdf_sha256[:12]}")
+            return {**cached, "cache_hit": True,
+                    "processing_time_ms": int((time.perf_counter() - start) * 1000)}
+
+    # One parse of the PDF, shared by every step below
+    doc = PdfDocument(pdf_bytes)
+
     # Check if scanned (needed for auto-detection and return value)
-    scanned = is_scanned_pdf(pdf_bytes)
+    scanned = await asyncio.to_thread(lambda: doc.is_scanned)
 
     # Auto-detect scanned → vision
     if method == "text" and scanned:
         method = "vision"
 
-    # Build prompt
-    field_hints = build_field_hints(language)
-    json_keys = json.dumps(build_extraction_json_keys(), indent=2)
-    base_prompt = f"""You are an expert trade-finance and Letter of Credit (L/C) document analyst.
-You can read documents in English, Arabic, Spanish, and Italian.
+    base_prompt = build_extraction_prompt(language, structured)
 
-TASK: Extract ALL information from the document into the JSON structure below.
+    try:
+        if chunking == "always" or (chunking == "auto" and
+                                    await asyncio.to_thread(needs_chunking, doc, method, llm_provider)):
+            return await asyncio.to_thread(_extract_chunked, doc, method, base_prompt, llm_provider, model_name,
+                                           image_profile, schema, start, scanned, pdf_sha256, cache_key)
+
+        prep = await asyncio.to_thread(_prepare_extraction, doc, method, llm_provider, image_profile, base_prompt)
+        if prep["pdf_bytes"] is not None:
+            raw = await acall_gemini_vision(prep["pdf_bytes"], prep["prompt"], model_name=model_name,
+                                            response_schema=schema, instructions=prep["instructions"])
+        elif prep["images"] is not None:
+            raw = await acall_openai_vision(prep["images"], prep["prompt"], model_name=model_name,
+                                            mime_types=prep["mime_types"], response_schema=schema,
+                                            instructions=prep["instructions"])
+        else:
+            raw = await acall_llm(prep["prompt"], llm_provider, model_name, response_schema=schema,
+                                  instructions=prep["instructions"])
 
-FIELD REFERENCE (key → English label / Arabic label):
-{field_hints}
+        if not raw:
+            return {"success": False, "error": "LLM returned empty response"}
+        result = _extraction_result(parse_json_response(raw), raw, method, start, prep["pdf_text"], scanned,
+                                    pdf_sha256, prep["extras"])
+        await asyncio.to_thread(_store_extraction, cache_key, result)
+        return {**result, "cache_hit": False}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
-RULES:
-1. Read the ENTIRE document — every line, header, footer, stamp, annotation.
-2. Extract EVERY value. NEVER return null if data exists ANYWHERE.
-3. Convert ALL dates to DD/MM/YYYY.
-4. For amounts, include currency code + number (e.g., "USD 150,000.00").
-5. If a field truly cannot be found, use null.
 
-Return ONLY a raw JSON object — no markdown fences:
-{json_keys}"""
+async def stream_extract_lc_document(
+    pdf_bytes: bytes,
+    method: str = "vision",
+    llm_provider: str = "gemini",
+    model_name: str = "gemini-2.5-flash",
+    language: str = "en",
+    use_cache: bool = True,
+    image_profile: str = "",
+    chunking: str = "",
+):
+    """Streaming :func:`extract_lc_document` — an async generator of events.
+
+    Yields ``{"event": "field", "key", "value"}`` for each field as soon as
+    the LLM has finished generating it, then one ``{"event": "done",
+    "result"}`` with the same result the tool returns (or ``{"event":
+    "error", "error"}``). Cache hits and chunked extractions are not
+    streamed token by token; their fields are emitted all at once.
+    """
+    from utils.llm_clients import (
+        astream_llm, astream_gemini_vision, astream_openai_vision, parse_json_response, JSONFieldStream,
+    )
+    from utils.pdf_utils import PdfDocument
+    from config.settings import get_settings
+    from utils.extraction_cache import get_extraction_cache
+    from utils.chunked_extraction import needs_chunking
 
-    # Compute pdf_text based on method (for chat context and preview)
-    pdf_text = ""
+    settings = get_settings()
+    image_profile = image_profile or settings.vision_image_profile
+    chunking = chunking or settings.extraction_chunking
+    start = time.perf_counter()
+    pdf_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+    structured = settings.extraction_structured_output
+    schema = extraction_json_schema() if structured else None
+    cache_key = _extraction_cache_key(pdf_sha256, method, llm_provider, model_name, language,
+                                      image_profile, chunking, structured)
+
+    def _all_at_once(result: dict):
+        for key, value in (result.get("extracted_data") or {}).items():
+            yield {"event": "field", "key": key, "value": value}
+        yield {"event": "done", "result": result} if result.get("success") else \
+            {"event": "error", "error": result.get("error")}
+
+    # Cache lookups and writes can be DB round-trips (sqlite / postgres) — off the loop too
+    cached = await asyncio.to_thread(get_extraction_cache().get, cache_key) if use_cache else None
+    if cached is not None:
+        for event in _all_at_once({**cached, "cache_hit": True,
+                                   "processing_time_ms": int((time.perf_counter() - start) * 1000)}):
+            yield event
+        return
 
     try:
-        if method == "vision":
-            prompt = base_prompt + "\n\nDocument pages provided as images. Read every page. ONLY JSON."
-            if llm_provider == "gemini":
-                raw = call_gemini_vision(pdf_bytes, prompt, model_name=model_name)
-            else:
-                images = pdf_to_base64_images(pdf_bytes, max_pages=MAX_VISION_PAGES)
-                raw = call_openai_vision(images, prompt, model_name=model_name)
-            # For vision, still extract text for chat/preview (fallback to PyPDF2)
-            pdf_text = extract_text_pypdf2(pdf_bytes) if not scanned else ""
-        elif method == "ocr":
-            text = extract_text_ocr(pdf_bytes)
-            pdf_text = text  # Store full OCR text
-            prompt = base_prompt + f"\n\nDOCUMENT TEXT (OCR):\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\nJSON:"
-            raw = call_gemini(prompt, model_name) if llm_provider == "gemini" else call_openai(prompt, model_name)
+        # PDF parsing, OCR and rendering are CPU-bound — keep them off the event loop
+        doc = PdfDocument(pdf_bytes)
+        scanned = await asyncio.to_thread(lambda: doc.is_scanned)
+        if method == "text" and scanned:
+            method = "vision"
+        if chunking == "always" or (chunking == "auto" and await asyncio.to_thread(needs_chunking, doc, method, llm_provider)):
+            result = await asyncio.to_thread(
+                _extract_chunked, doc, method, build_extraction_prompt(language, structured), llm_provider,
+                model_name, image_profile, schema, start, scanned, pdf_sha256, cache_key)
+            for event in _all_at_once(result):
+                yield event
+            return
+        prep = await asyncio.to_thread(_prepare_extraction, doc, method, llm_provider, image_profile,
+                                       build_extraction_prompt(language, structured))
+
+        if prep["pdf_bytes"] is not None:
+            chunks = astream_gemini_vision(prep["pdf_bytes"], prep["prompt"], model_name=model_name,
+                                           response_schema=schema, instructions=prep["instructions"])
+        elif prep["images"] is not None:
+            chunks = astream_openai_vision(prep["images"], prep["prompt"], model_name=model_name,
+                                           mime_types=prep["mime_types"], response_schema=schema,
+                                           instructions=prep["instructions"])
         else:
-            text = extract_text_pypdf2(pdf_bytes)
-            pdf_text = text  # Store full text
-            prompt = base_prompt + f"\n\nDOCUMENT TEXT:\n===\n{text[:MAX_PDF_TEXT_FOR_LLM]}\n===\nJSON:"
-            raw = call_gemini(prompt, model_name) if llm_provider == "gemini" else call_openai(prompt, model_name)
+            chunks = astream_llm(prep["prompt"], llm_provider, model_name, response_schema=schema,
+                                 instructions=prep["instructions"])
 
-        if not raw:
-            return {"success": False, "error": "LLM returned empty response"}
+        fields = JSONFieldStream()
+        raw = ""
+        async for chunk in chunks:
+            raw += chunk
+            for key, value in fields.feed(chunk):
+                yield {"event": "field", "key": key, "value": value}
 
-        parsed = parse_json_response(raw)
-        found = sum(1 for v in parsed.values() if v is not None)
-        elapsed = int((time.perf_counter() - start) * 1000)
-
-        return {
-            "success": True, "extracted_data": parsed, "raw_llm_response": raw,
-            "fields_found": found, "fields_total": len(parsed),
-            "method_used": method, "processing_time_ms": elapsed,
-            # PDF preprocessing outputs (now backend responsibility)
-            "pdf_text": pdf_text, "is_scanned": scanned,
-        }
+        if not raw:
+            yield {"event": "error", "error": "LLM returned empty response"}
+            return
+        result = _extraction_result(parse_json_response(raw), raw, method, start, prep["pdf_text"], scanned,
+                                    pdf_sha256, prep["extras"])
+        await asyncio.to_thread(_store_extraction, cache_key, result)
+        yield {"event": "done", "result": {**result, "cache_hit": False}}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        yield {"event": "error", "error": str(e)}
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -330,7 +575,7 @@ def deep_research(query: str, context: str = "", language: str = "en") -> dict:
 # ═══════════════════════════════════════════════════════════════
 
 @mcp.tool(tags={"chat"})
-def chat_with_document(
+async def chat_with_document(
     message: str,
     extracted_data: dict = None,
     pdf_text: str = "",
@@ -338,7 +583,7 @@ def chat_with_document(
     language: str = "en",
 ) -> dict:
     """Chat about an L/C document with full context."""
-    from utils.llm_clients import call_llm
+    from utils.llm_clients import acall_llm
 
     context = json.dumps(extracted_data or {}, indent=2, ensure_ascii=False, default=str)
     pdf_excerpt = (pdf_text or "")[:8000]
@@ -368,15 +613,78 @@ User: {message}
 Answer concisely based on the document data."""
 
     try:
-        response_text = call_llm(prompt)
+        response_text = await acall_llm(prompt)
         return {"message": response_text or "Sorry, I couldn't generate a response.", "language": language}
     except Exception as e:
         return {"message": f"Error: {str(e)}", "language": language}
 
 
 # ═══════════════════════════════════════════════════════════════
-#  SYNC HELPERS (for non-async callers: FastAPI, Streamlit)
+#  CALLING TOOLS IN-PROCESS (async, and sync for scripts / Streamlit)
 # ═══════════════════════════════════════════════════════════════
+# FastMCP runs a sync tool inline on whichever loop awaits it, so acall_tool
+# hands sync tools to a persistent worker pool instead of blocking the
+# caller's loop. Each worker thread keeps one event loop for its lifetime:
+# a call costs no thread or loop creation. Async tools are awaited directly.
+# Sync wrappers called from inside a running loop block on a separate bridge
+# pool, never on a tool worker, so they cannot wait on work queued behind
+# themselves.
+
+_tool_pool = None
+_bridge_pool = None
+_tool_pool_lock = threading.Lock()
+_thread_state = threading.local()
+_async_tools: dict[str, bool] = {}
+
+
+def _get_tool_pool():
+    global _tool_pool
+    if _tool_pool is None:
+        with _tool_pool_lock:
+            if _tool_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                from config.settings import get_settings
+                _tool_pool = ThreadPoolExecutor(max_workers=get_settings().tool_workers, thread_name_prefix="tool")
+    return _tool_pool
+
+
+def _get_bridge_pool():
+    global _bridge_pool
+    if _bridge_pool is None:
+        with _tool_pool_lock:
+            if _bridge_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _bridge_pool = ThreadPoolExecutor(thread_name_prefix="tool-bridge")
+    return _bridge_pool
+
+
+def shutdown_tool_pool():
+    """Stop the tool worker pools (API shutdown); running calls finish in the background."""
+    global _tool_pool, _bridge_pool
+    with _tool_pool_lock:
+        for pool in (_tool_pool, _bridge_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        _tool_pool = _bridge_pool = None
+
+
+def _thread_loop() -> asyncio.AbstractEventLoop:
+    """This thread's persistent event loop (created on first use)."""
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _thread_state.loop = asyncio.new_event_loop()
+    return loop
+
+
+def _run_sync(make_coro: Callable[[], Awaitable]) -> Any:
+    """Run a coroutine from sync code on this thread's loop — or, if that loop
+    is already running (sync code called from async code), on a bridge thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _thread_loop().run_until_complete(make_coro())
+    return _get_bridge_pool().submit(lambda: _thread_loop().run_until_complete(make_coro())).result()
+
 
 def _extract_tool_result(result) -> Any:
     """Extract plain dict/value from a FastMCP ToolResult object."""
@@ -395,33 +703,100 @@ def _extract_tool_result(result) -> Any:
     return {"result": str(result)}
 
 
+async def _is_async_tool(tool_name: str) -> bool:
+    if tool_name not in _async_tools:
+        tool = await mcp._tool_manager.get_tool(tool_name)
+        _async_tools[tool_name] = inspect.iscoroutinefunction(getattr(tool, "fn", None))
+    return _async_tools[tool_name]
+
+
+async def _acall_tool(tool_name: str, args: dict, started: asyncio.Event | None = None) -> Any:
+    """:func:`acall_tool`, setting ``started`` once the tool actually begins
+    running (for sync tools: when a pool worker picks the call up)."""
+    if await _is_async_tool(tool_name):
+        if started:
+            started.set()
+        result = await mcp._tool_manager.call_tool(tool_name, args)
+    else:
+        loop = asyncio.get_running_loop()
+
+        def _work():
+            if started:
+                loop.call_soon_threadsafe(started.set)
+            return _thread_loop().run_until_complete(mcp._tool_manager.call_tool(tool_name, args))
+
+        result = await asyncio.wrap_future(_get_tool_pool().submit(_work))
+    return _extract_tool_result(result)
+
+
+async def acall_tool(tool_name: str, args: dict) -> Any:
+    """Call any registered tool from async code. Returns a plain dict."""
+    return await _acall_tool(tool_name, args)
+
+
 def call_tool(tool_name: str, args: dict) -> Any:
     """Call any registered tool synchronously. Returns a plain dict."""
-    async def _call():
-        result = await mcp._tool_manager.call_tool(tool_name, args)
-        return _extract_tool_result(result)
+    return _extract_tool_result(_run_sync(lambda: mcp._tool_manager.call_tool(tool_name, args)))
 
-    try:
-        asyncio.get_running_loop()
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            return pool.submit(asyncio.run, _call()).result()
-    except RuntimeError:
-        return asyncio.run(_call())
+
+async def acall_tools(calls: list[dict], max_parallel: int = 0, timeout_s: float = 0) -> list[dict]:
+    """Call several tools concurrently, at most ``max_parallel`` at a time.
+
+    ``calls`` is [{tool_name, args}]. Returns one outcome per call, in input
+    order: {"tool_name", "result" | "error", "latency_ms"}. The timeout and
+    latency_ms count from when a worker picks the call up, not time spent
+    queued for the shared tool pool. A timed-out call is reported at once,
+    but keeps its ``max_parallel`` slot until its worker is really free.
+    0 → VERIFY_MAX_PARALLEL / VERIFY_TIMEOUT_S.
+    """
+    from config.settings import get_settings
+
+    settings = get_settings()
+    timeout_s = timeout_s or settings.verify_timeout_s
+    semaphore = asyncio.Semaphore(max_parallel or settings.verify_max_parallel)
+
+    async def _one(call: dict) -> dict:
+        await semaphore.acquire()
+        started = asyncio.Event()
+        task = asyncio.ensure_future(_acall_tool(call["tool_name"], call.get("args") or {}, started))
+
+        def _done(t: asyncio.Task):
+            semaphore.release()
+            if not t.cancelled():
+                t.exception()    # a timed-out call's late error is not left unretrieved
+
+        task.add_done_callback(_done)
+        waiter = asyncio.ensure_future(started.wait())
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        start = time.perf_counter()
+        try:
+            outcome = {"result": await asyncio.wait_for(asyncio.shield(task), timeout_s)}
+        except asyncio.TimeoutError:
+            outcome = {"error": f"timed out after {timeout_s:g}s"}
+            logger.warning(f"{call['tool_name']} timed out after {timeout_s:g}s")
+        except Exception as e:
+            outcome = {"error": str(e)}
+        return {"tool_name": call["tool_name"], **outcome,
+                "latency_ms": int((time.perf_counter() - start) * 1000)}
+
+    return list(await asyncio.gather(*(_one(call) for call in calls)))
+
+
+def call_tools(calls: list[dict], max_parallel: int = 0, timeout_s: float = 0) -> list[dict]:
+    """Sync :func:`acall_tools`."""
+    return _run_sync(lambda: acall_tools(calls, max_parallel, timeout_s))
+
+
+async def alist_tools() -> list[dict]:
+    """List all tools."""
+    tools = await mcp._tool_manager.get_tools()
+    return [{"name": n, "description": t.description, "tags": list(t.tags)} for n, t in tools.items()]
 
 
 def list_tools() -> list[dict]:
     """List all tools synchronously."""
-    async def _list():
-        tools = await mcp._tool_manager.get_tools()
-        return [{"name": n, "description": t.description, "tags": list(t.tags)} for n, t in tools.items()]
-    try:
-        asyncio.get_running_loop()
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            return pool.submit(asyncio.run, _list()).result()
-    except RuntimeError:
-        return asyncio.run(_list())
+    return _run_sync(alist_tools)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -0,0 +1,280 @@
+"""
+Chunked (map-reduce) extraction for documents too long for one prompt.
+
+A single extraction prompt holds at most MAX_PDF_TEXT_FOR_LLM characters of
+text or, for OpenAI vision and hybrid image pages, MAX_VISION_PAGES page
+images (Gemini vision gets the whole PDF); anything after that used to be cut
+off, which is where field 47A (additional conditions) tends to live. In chunked
+mode the document is split on page boundaries, every chunk is extracted
+concurrently with the shared extraction instructions (one cacheable prefix),
+and the per-chunk JSON is merged field by field:
+
+  - textarea fields (addresses, goods, 46A/47A): distinct values from every
+    chunk are joined in page order
+  - checkbox fields: true if any chunk found it
+  - everything else: the value most chunks agree on; ties go to the earliest
+    chunk. Disagreements are reported as conflicts.
+
+Usage:
+  from utils.chunked_extraction import needs_chunking, extract_chunked
+  if needs_chunking(doc, "text", "gemini"):
+      merged, info = extract_chunked(doc, "text", base_prompt, "gemini", "gemini-2.5-flash")
+      info["chunks"]     # [{"index": 1, "pages": [1, 2, 3], "fields_found": 41, "ms": 5120}, ...]
+      info["conflicts"]  # {"currency": [{"value": "USD", "pages": [1, 2]}, {"value": "EUR", "pages": [9]}]}
+      info["failed_pages"]   # [] unless a chunk failed — then ``merged`` is partial
+"""
+
+from __future__ import annotations
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import MAX_PDF_TEXT_FOR_LLM, MAX_VISION_PAGES, get_settings
+from schemas.lc_fields import get_field_map
+from utils.pdf_utils import PdfDocument, PAGE_TEXT, PAGE_IMAGE
+
+logger = logging.getLogger(__name__)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  PLANNING
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _page_sources(doc: PdfDocument, method: str) -> tuple[dict[int, str], list[int]]:
+    """({page: text} sent as text, [pages] sent as images) for ``method``."""
+    if method == "vision":
+        return {}, list(range(1, doc.page_count + 1))
+    if method == "hybrid":
+        return ({n: doc.page_text(n - 1) for n in doc.pages_of_kind(PAGE_TEXT)},
+                doc.pages_of_kind(PAGE_IMAGE))
+    if method == "ocr":
+        return {p["page"]: p["text"] for p in doc.ocr_pages()}, []
+    return {n: doc.page_text(n - 1) for n in range(1, doc.page_count + 1)}, []
+
+
+def _split_text(text: str, max_chars: int) -> list[str]:
+    """Split one oversized page on line boundaries into pieces of <= max_chars."""
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(current) + len(line) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+
+def plan_chunks(page_texts: dict[int, str], image_pages: list[int],
+                max_chars: int = MAX_PDF_TEXT_FOR_LLM, max_images: int = MAX_VISION_PAGES) -> list[dict]:
+    """Group pages into chunks that each fit one extraction prompt.
+
+    Text pages are packed in order up to ``max_chars`` (a page is never split
+    unless it alone is over the limit); image pages are packed up to
+    ``max_images`` per chunk. Returns [{"pages", "text", "image_pages"}] in
+    page order.
+    """
+    chunks: list[dict] = []
+    current: dict | None = None
+
+    def _flush():
+        nonlocal current
+        if current and (current["text"] or current["image_pages"]):
+            chunks.append(current)
+        current = None
+
+    for n in sorted(set(page_texts) | set(image_pages)):
+        if n in page_texts:
+            page = f"\n--- Page {n} ---\n{page_texts[n]}"
+            if not page_texts[n].strip():
+                continue
+            if len(page) > max_chars:
+                _flush()
+                for piece in _split_text(page, max_chars):
+                    chunks.append({"pages": [n], "text": piece.strip(), "image_pages": []})
+                continue
+            if current is None or len(current["text"]) + len(page) > max_chars:
+                _flush()
+                current = {"pages": [], "text": "", "image_pages": []}
+            current["pages"].append(n)
+            current["text"] = (current["text"] + page).strip()
+        else:
+            if current is None or len(current["image_pages"]) >= max_images:
+                _flush()
+                current = {"pages": [], "text": "", "image_pages": []}
+            current["pages"].append(n)
+            current["image_pages"].append(n)
+    _flush()
+    return chunks
+
+
+def needs_chunking(doc: PdfDocument, method: str, llm_provider: str) -> bool:
+    """True if ``method`` would have to truncate this document to fit one prompt.
+
+    Gemini vision sends the whole PDF, so only OpenAI vision and hybrid image
+    pages are capped at MAX_VISION_PAGES.
+    """
+    page_texts, image_pages = _page_sources(doc, method)
+    text_chars = sum(len(f"\n--- Page {n} ---\n{t}") for n, t in page_texts.items() if t.strip())
+    pages_capped = method == "hybrid" or (method == "vision" and llm_provider != "gemini")
+    return text_chars > MAX_PDF_TEXT_FOR_LLM or (pages_capped and len(image_pages) > MAX_VISION_PAGES)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  MERGE
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _normalize(value) -> str:
+    return " ".join(str(value).split()).casefold()
+
+
+def _truthy(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().casefold() in ("true", "yes", "1", "x", "✓")
+    return bool(value)
+
+
+def merge_extractions(results: list[tuple[list[int], dict]]) -> tuple[dict, dict]:
+    """Merge per-chunk extractions [(pages, parsed)] in page order.
+
+    Returns (merged fields, {field: [{"value", "pages"}]} for fields where
+    chunks disagreed).
+    """
+    fields = get_field_map()
+    keys: list[str] = []
+    for _, parsed in results:
+        keys += [k for k in parsed if k not in keys]
+
+    merged, conflicts = {}, {}
+    for key in keys:
+        found = [(pages, parsed[key]) for pages, parsed in results if parsed.get(key) not in (None, "")]
+        if not found:
+            merged[key] = None
+            continue
+        kind = fields[key].type if key in fields else "text"
+
+        if kind == "checkbox":
+            merged[key] = any(_truthy(v) for _, v in found)
+            continue
+
+        # Group equal values, keeping first-seen (page) order
+        groups: dict[str, dict] = {}
+        for pages, value in found:
+            g = groups.setdefault(_normalize(value), {"value": value, "pages": []})
+            g["pages"] += pages
+
+        if kind == "textarea":
+            parts = [g["value"] for g in groups.values()]
+            # Drop values another chunk already reported in full
+            parts = [p for p in parts if not any(p != o and _normalize(p) in _normalize(o) for o in parts)]
+            merged[key] = "\n".join(str(p) for p in parts)
+            continue
+
+        ranked = sorted(groups.values(), key=lambda g: -len(g["pages"]))   # stable → earliest wins ties
+        merged[key] = ranked[0]["value"]
+        if len(groups) > 1:
+            conflicts[key] = list(groups.values())
+    return merged, conflicts
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  MAP-REDUCE
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _chunk_prompt(chunk: dict, index: int, total: int) -> str:
+    """Per-chunk prompt; the shared extraction instructions are sent separately."""
+    first, last = chunk["pages"][0], chunk["pages"][-1]
+    span = f"page {first}" if first == last else f"pages {first}-{last}"
+    prompt = (f"This is part {index} of {total} of a longer document ({span}). "
+              f"Extract only what appears in this part; use null for fields that are not in it.")
+    if chunk["text"]:
+        prompt += f"\n\nDOCUMENT TEXT:\n===\n{chunk['text']}\n==="
+    if chunk["image_pages"]:
+        prompt += (f"\n\nPages {', '.join(map(str, chunk['image_pages']))} are provided as images, "
+                   f"in that order. Read them carefully.")
+    return prompt + "\nONLY the JSON object."
+
+
+def extract_chunked(doc: PdfDocument, method: str, base_prompt: str, llm_provider: str, model_name: str,
+                    image_profile: str = "", workers: int | None = None,
+                    response_schema: dict | None = None) -> tuple[dict, dict]:
+    """Extract every chunk of ``doc`` concurrently and merge the results.
+
+    Returns (merged fields, info) where info holds the per-chunk report,
+    the field conflicts, the raw responses and ``failed_pages`` — pages of
+    chunks that failed; if it is not empty the merged result is partial.
+    Raises RuntimeError if no chunk could be extracted.
+    """
+    from utils.llm_clients import (
+        call_gemini, call_openai, call_gemini_vision, call_openai_vision, parse_json_response,
+    )
+
+    page_texts, image_pages = _page_sources(doc, method)
+    chunks = plan_chunks(page_texts, image_pages)
+    if not chunks:
+        raise RuntimeError("No extractable content in PDF.")
+    image_profile = image_profile or get_settings().vision_image_profile
+
+    # Build prompts and page payloads up front: rendering stays on this thread,
+    # only the LLM calls run concurrently
+    jobs = []
+    for i, chunk in enumerate(chunks, 1):
+        prompt = _chunk_prompt(chunk, i, len(chunks))
+        payload = None
+        if chunk["image_pages"]:
+            if llm_provider == "gemini":
+                payload = doc.subset_pdf(chunk["image_pages"])
+            else:
+                images, mime_types, _ = doc.vision_images(len(chunk["image_pages"]), image_profile,
+                                                          pages=chunk["image_pages"])
+                payload = (images, mime_types)
+        jobs.append((chunk, prompt, payload))
+
+    def _run(job):
+        chunk, prompt, payload = job
+        t0 = time.perf_counter()
+        try:
+            if payload is None:
+                call = call_gemini if llm_provider == "gemini" else call_openai
+                raw = call(prompt, model_name, response_schema=response_schema, instructions=base_prompt)
+            elif llm_provider == "gemini":
+                raw = call_gemini_vision(payload, prompt, model_name=model_name, response_schema=response_schema,
+                                         instructions=base_prompt)
+            else:
+                raw = call_openai_vision(payload[0], prompt, model_name=model_name, mime_types=payload[1],
+                                         response_schema=response_schema, instructions=base_prompt)
+            parsed = parse_json_response(raw) if raw else {}
+            error = None if raw else "LLM returned empty response"
+        except Exception as e:
+            raw, parsed, error = None, {}, str(e)
+        return raw, parsed, error, int((time.perf_counter() - t0) * 1000)
+
+    workers = workers or get_settings().extraction_chunk_workers
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs))), thread_name_prefix="chunk") as pool:
+        outputs = list(pool.map(_run, jobs))
+
+    report, results, raws = [], [], []
+    for i, ((chunk, _, _), (raw, parsed, error, ms)) in enumerate(zip(jobs, outputs), 1):
+        entry = {"index": i, "pages": chunk["pages"], "ms": ms,
+                 "fields_found": sum(1 for v in parsed.values() if v is not None)}
+        if error:
+            entry["error"] = error
+            logger.warning(f"Chunk {i}/{len(jobs)} (pages {chunk['pages']}) failed: {error}")
+        else:
+            results.append((chunk["pages"], parsed))
+            raws.append(raw)
+        report.append(entry)
+
+    if not results:
+        raise RuntimeError(f"All {len(jobs)} chunks failed: {report[0].get('error')}")
+    merged, conflicts = merge_extractions(results)
+    failed_pages = [n for entry in report if "error" in entry for n in entry["pages"]]
+    logger.info(f"Chunked extraction: {len(jobs)} chunks, {len(results)} ok, {len(conflicts)} conflicts")
+    return merged, {"chunks": report, "conflicts": conflicts, "raw_responses": raws,
+                    "failed_pages": failed_pages}
@@ -6,10 +6,11 @@ Tables:
   - documents: Stores uploaded PDF metadata + extracted data
   - validation_runs: Stores validation results
   - audit_log: Tracks all user actions
+  - extraction_cache: Cached extraction results (utils/extraction_cache.py)
 
 Usage:
   from utils.database import get_db, init_db
-  init_db()                        # Create tables
+  init_db()                        # Create tables + apply migrations
   db = get_db()
   db.save_application(data)
 """
@@ -143,6 +144,17 @@ class AuditLog(Base):
     )
 
 
+class ExtractionCacheEntry(Base):
+    """One cached extraction result (utils/extraction_cache.py), stored whole."""
+    __tablename__ = "extraction_cache"
+
+    key = Column(String(64), primary_key=True)             # extraction_cache_key()
+    pdf_sha256 = Column(String(64), index=True, nullable=True)
+    value = Column(JSON, nullable=False)                   # the full tool result
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+    accessed_at = Column(DateTime, server_default=func.now(), index=True)   # LRU order
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  ENGINE & SESSION
 # ══════════════════════════════════════════════════════════════════════════════
@@ -182,12 +194,34 @@ def get_session() -> Session:
 # ══════════════════════════════════════════════════════════════════════════════
 
 def init_db():
-    """Create all tables if they don't exist."""
+    """Create all tables if they don't exist, then apply migrations."""
     engine = _get_engine()
     Base.metadata.create_all(engine)
+    migrate_db(engine)
     logger.info("Database tables created/verified.")
 
 
+def migrate_db(engine=None):
+    """Bring an existing database up to the current models. Idempotent.
+
+    create_all() only creates missing tables, so changes to existing tables
+    are applied here:
+      - early extraction-cache builds kept cache rows in `documents`
+        (cache_key / content_hash / pdf_text columns); those rows are dropped
+        — the cache now has its own table — along with the columns.
+    """
+    from sqlalchemy import inspect, text
+    engine = engine or _get_engine()
+    columns = {c["name"] for c in inspect(engine).get_columns("documents")}
+    if "cache_key" in columns:
+        with engine.begin() as conn:
+            removed = conn.execute(text("DELETE FROM documents WHERE cache_key IS NOT NULL")).rowcount
+            for column in ("cache_key", "content_hash", "pdf_text"):
+                if column in columns:
+                    conn.execute(text(f"ALTER TABLE documents DROP COLUMN {column}"))
+        logger.info(f"Migrated documents: moved out {removed} extraction cache rows, dropped cache columns")
+
+
 def drop_db():
     """Drop all tables. USE WITH CAUTION."""
     engine = _get_engine()
@@ -0,0 +1,335 @@
+"""
+Extraction result cache — content-addressed by the PDF bytes.
+
+The same L/C PDF is extracted again and again (re-runs after editing,
+Streamlit reruns, /pipeline after /extract). Each extraction is a multi-second
+paid LLM call, so successful results are cached under
+
+    sha256(pdf bytes) + method + provider + model + language + prompt version
+
+Backends (EXTRACTION_CACHE_BACKEND):
+  - memory:   in-process LRU (default)
+  - sqlite:   on-disk SQLite file shared by all workers on a host
+  - postgres: rows in the `extraction_cache` table (utils/database.py)
+  - off:      no caching
+
+Every backend applies the TTL (EXTRACTION_CACHE_TTL_S) and keeps at most
+EXTRACTION_CACHE_MAX_ENTRIES results, evicting the least recently used.
+
+Usage:
+  from utils.extraction_cache import get_extraction_cache, extraction_cache_key
+  cache = get_extraction_cache()
+  key = extraction_cache_key(hashlib.sha256(pdf_bytes).hexdigest(), "vision", "gemini", "gemini-2.5-flash", "en", prompt_version)
+  result = cache.get(key)
+  cache.set(key, result)
+  cache.stats()   # {"backend": "memory", "hits": 3, "misses": 1, ...}
+"""
+
+from __future__ import annotations
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def extraction_cache_key(pdf_sha256: str, method: str, provider: str, model: str,
+                         language: str, prompt_version: str) -> str:
+    """Content address of one extraction: PDF hash plus everything that changes the output."""
+    parts = "|".join([pdf_sha256, method, provider, model, language, prompt_version])
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  BACKENDS
+# ══════════════════════════════════════════════════════════════════════════════
+
+class ExtractionCache:
+    """Base backend: counters + TTL/size bookkeeping; subclasses store the entries."""
+
+    backend = "off"
+
+    def __init__(self, ttl_s: int = 0, max_entries: int = 0):
+        self.ttl_s = ttl_s                  # 0 → entries never expire
+        self.max_entries = max_entries      # 0 → no size limit
+        self._counter_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "errors": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._counter_lock:
+            self.counters[name] += n
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl_s) and time.time() - created_at > self.ttl_s
+
+    def get(self, key: str) -> dict | None:
+        """Cached result for ``key``, or None. Backend failures count as misses."""
+        try:
+            value = self._get(key)
+        except Exception as e:
+            logger.warning(f"Extraction cache ({self.backend}) read failed: {e}")
+            self._count("errors")
+            value = None
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: dict):
+        try:
+            self._count("evictions", self._set(key, value))
+            self._count("sets")
+        except Exception as e:
+            logger.warning(f"Extraction cache ({self.backend}) write failed: {e}")
+            self._count("errors")
+
+    def clear(self):
+        self._clear()
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        try:
+            entries = self._size()
+        except Exception:
+            entries = None
+        return {"backend": self.backend, **counters, "entries": entries,
+                "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+                "ttl_s": self.ttl_s, "max_entries": self.max_entries}
+
+    # ── backend hooks ──
+
+    def _get(self, key: str) -> dict | None:
+        return None
+
+    def _set(self, key: str, value: dict) -> int:
+        """Store ``value``; returns the number of entries evicted."""
+        return 0
+
+    def _clear(self):
+        pass
+
+    def _size(self) -> int:
+        return 0
+
+
+class MemoryExtractionCache(ExtractionCache):
+    """In-process LRU — per worker, lost on restart."""
+
+    backend = "memory"
+
+    def __init__(self, ttl_s: int = 0, max_entries: int = 0):
+        super().__init__(ttl_s, max_entries)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0]):
+                del self._entries[key]
+                self._count("evictions")
+                return None
+            self._entries.move_to_end(key)
+            # Callers edit extracted_data in place — never hand out the stored dict
+            return copy.deepcopy(entry[1])
+
+    def _set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            evicted = 0
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def _clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _size(self):
+        return len(self._entries)
+
+
+class SQLiteExtractionCache(ExtractionCache):
+    """On-disk cache in one SQLite file — survives restarts, shared across workers."""
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, ttl_s: int = 0, max_entries: int = 0):
+        super().__init__(ttl_s, max_entries)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS extraction_cache (
+                                key TEXT PRIMARY KEY,
+                                value TEXT NOT NULL,
+                                created_at REAL NOT NULL,
+                                accessed_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_extraction_cache_accessed "
+                         "ON extraction_cache (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        """One short-lived connection per operation; commits on success, always closes."""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM extraction_cache WHERE key = ?",
+                               (key,)).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1]):
+                conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                self._count("evictions")
+                return None
+            conn.execute("UPDATE extraction_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+
+    def _set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO extraction_cache VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(value, ensure_ascii=False), now, now))
+            evicted = 0
+            if self.ttl_s:
+                evicted += conn.execute("DELETE FROM extraction_cache WHERE created_at < ?",
+                                        (now - self.ttl_s,)).rowcount
+            if self.max_entries:
+                evicted += conn.execute(
+                    """DELETE FROM extraction_cache WHERE key IN (
+                           SELECT key FROM extraction_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)""",
+                    (self.max_entries,)).rowcount
+            return evicted
+
+    def _clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM extraction_cache")
+
+    def _size(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+
+
+class PostgresExtractionCache(ExtractionCache):
+    """Cache rows in the dedicated `extraction_cache` table (utils/database.py),
+    each holding the full result JSON — same payloads as the other backends."""
+
+    backend = "postgres"
+
+    def __init__(self, ttl_s: int = 0, max_entries: int = 0):
+        super().__init__(ttl_s, max_entries)
+        from utils.database import ExtractionCacheEntry, _get_engine
+        ExtractionCacheEntry.__table__.create(_get_engine(), checkfirst=True)
+
+    def _get(self, key):
+        from sqlalchemy.sql import func
+        from utils.database import ExtractionCacheEntry as Entry, get_session
+        session = get_session()
+        try:
+            entry = session.get(Entry, key)
+            if entry is None:
+                return None
+            if self._expired(entry.created_at.timestamp()):
+                session.delete(entry)
+                session.commit()
+                self._count("evictions")
+                return None
+            value = entry.value
+            session.query(Entry).filter(Entry.key == key).update(
+                {Entry.accessed_at: func.now()}, synchronize_session=False)
+            session.commit()
+            return value
+        finally:
+            session.close()
+
+    def _set(self, key, value):
+        from datetime import datetime, timedelta
+        from sqlalchemy.sql import func
+        from utils.database import ExtractionCacheEntry as Entry, get_session
+        session = get_session()
+        try:
+            session.merge(Entry(key=key, pdf_sha256=value.get("pdf_sha256"), value=value,
+                                created_at=func.now(), accessed_at=func.now()))
+            session.flush()
+            evicted = 0
+            if self.ttl_s:
+                cutoff = datetime.now() - timedelta(seconds=self.ttl_s)
+                evicted += session.query(Entry).filter(Entry.created_at < cutoff).delete(synchronize_session=False)
+            if self.max_entries:
+                stale = [row.key for row in session.query(Entry.key)
+                         .order_by(Entry.accessed_at.desc()).offset(self.max_entries).all()]
+                if stale:
+                    evicted += session.query(Entry).filter(Entry.key.in_(stale)).delete(synchronize_session=False)
+            session.commit()
+            return evicted
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _clear(self):
+        from utils.database import ExtractionCacheEntry as Entry, get_session
+        session = get_session()
+        try:
+            session.query(Entry).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _size(self):
+        from utils.database import ExtractionCacheEntry as Entry, get_session
+        session = get_session()
+        try:
+            return session.query(Entry).count()
+        finally:
+            session.close()
+
+
+# ── Singleton ─────────────────────────────────────────────────────────────────
+_cache: ExtractionCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get the configured extraction cache (built on first use)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                s = get_settings()
+                backend = s.extraction_cache_backend
+                ttl, size = s.extraction_cache_ttl_s, s.extraction_cache_max_entries
+                try:
+                    if backend == "memory":
+                        _cache = MemoryExtractionCache(ttl, size)
+                    elif backend == "sqlite":
+                        _cache = SQLiteExtractionCache(s.extraction_cache_path, ttl, size)
+                    elif backend == "postgres":
+                        _cache = PostgresExtractionCache(ttl, size)
+                    else:
+                        _cache = ExtractionCache()
+                except Exception as e:
+                    logger.warning(f"Extraction cache backend '{backend}' unavailable ({e}) — caching disabled")
+                    _cache = ExtractionCache()
+                logger.info(f"Extraction cache: {_cache.backend}")
+    return _cache
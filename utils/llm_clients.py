@@ -1,6 +1,20 @@
 """
 Unified LLM client wrappers for Gemini and OpenAI.
 All agents use these — never call LLM APIs directly.
+
+Every call has an async twin (acall_gemini, acall_openai, acall_llm,
+acall_gemini_vision, acall_openai_vision) for use inside an event loop —
+they await the SDKs' async clients instead of blocking the loop.
+
+All calls share one policy — a per provider/model rate limiter (RATE
+LIMITING below), retries with backoff, per-provider circuit breakers and
+optional hedging (RESILIENCE); counters are in get_llm_stats().
+
+stream_* / astream_* yield the response text as it is generated;
+JSONFieldStream turns those chunks into extracted fields as each completes.
+Pass ``response_schema`` (JSON Schema) to any call for provider-native
+structured output, and long static ``instructions`` separately from the
+prompt so the providers can cache them.
 """
 
 from __future__ import annotations
@@ -8,12 +22,28 @@ import re
 import json
 import io
 import base64
-from typing import Optional, Any
+import hashlib
+import time
+import random
+import asyncio
+import logging
+import weakref
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, Any, AsyncIterator, Callable, Iterator, NamedTuple
 from config.settings import get_settings
 
+logger = logging.getLogger(__name__)
+
 # ── Lazy imports (only load what's configured) ──
 _gemini_client = None
 _openai_client = None
+# Async clients hold connection pools bound to the event loop that created
+# them, so they are shared per loop: {loop: {"gemini": client, "openai": client}}
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
 
 def _get_gemini_client():
@@ -32,50 +62,909 @@ def _get_openai_client():
         settings = get_settings()
         if settings.has_openai:
             from openai import OpenAI
-            _openai_client = OpenAI(api_key=settings.openai_api_key)
+            # Retries are handled by the policy below, not the SDK
+            _openai_client = OpenAI(api_key=settings.openai_api_key, max_retries=0)
     return _openai_client
 
 
+def _loop_clients() -> dict:
+    return _async_clients.setdefault(asyncio.get_running_loop(), {})
+
+
+def _get_async_gemini_client():
+    """Gemini async surface (``client.aio``) shared by all calls on the running loop."""
+    clients = _loop_clients()
+    if "gemini" not in clients:
+        settings = get_settings()
+        if not settings.has_gemini:
+            return None
+        from google import genai
+        clients["gemini"] = genai.Client(api_key=settings.google_gemini_api_key).aio
+    return clients["gemini"]
+
+
+def _get_async_openai_client():
+    """AsyncOpenAI client shared by all calls on the running loop."""
+    clients = _loop_clients()
+    if "openai" not in clients:
+        settings = get_settings()
+        if not settings.has_openai:
+            return None
+        from openai import AsyncOpenAI
+        clients["openai"] = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0)
+    return clients["openai"]
+
+
+async def aclose_llm_clients():
+    """Close the running loop's async clients and their connection pools."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for name, client in clients.items():
+        try:
+            await (client.aclose() if name == "gemini" else client.close())
+        except Exception:
+            pass
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  RATE LIMITING (per provider + model)
+# ══════════════════════════════════════════════════════════════════════════════
+#
+# Every request first takes a slot from its provider+model limiter:
+#   - at most `concurrency` requests in flight
+#   - token buckets for requests/minute and estimated tokens/minute
+# Callers that don't fit wait in one FIFO queue (sync threads and async tasks
+# alike) instead of failing on a 429. Limits: LLM_MAX_CONCURRENCY / LLM_RPM /
+# LLM_TPM, overridden per provider or provider/model by LLM_LIMITS, e.g.
+#   LLM_LIMITS='{"gemini": {"rpm": 1000}, "gemini/gemini-2.5-pro": {"rpm": 150, "tpm": 2000000}}'
+
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 800              # OpenAI high-detail image, upper end
+PDF_PAGE_TOKENS = 258           # Gemini tokens per PDF page
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+def estimate_tokens(prompt: str = "", images: int = 0, pdf_bytes: bytes | None = None) -> int:
+    """Rough request size (input + expected output) for the tokens/minute budget."""
+    pages = len(_PDF_PAGE_RE.findall(pdf_bytes)) if pdf_bytes else 0
+    return (len(prompt) // CHARS_PER_TOKEN + images * IMAGE_TOKENS + pages * PDF_PAGE_TOKENS
+            + get_settings().llm_output_tokens_estimate)
+
+
+class _Waiter:
+    """A queued caller; ``wake`` is safe to call from any thread."""
+
+    def __init__(self, tokens: int, loop: asyncio.AbstractEventLoop | None = None):
+        self.tokens = tokens
+        self.loop = loop
+        self.event = asyncio.Event() if loop else threading.Event()
+
+    def wake(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.event.set)
+        else:
+            self.event.set()
+
+
+class RateLimiter:
+    """Concurrency cap + requests/minute + tokens/minute, with a fair FIFO queue.
+
+    A limit of 0 means unlimited. A request larger than the whole TPM budget
+    is admitted once the bucket is full, so it can never wait forever.
+    """
+
+    def __init__(self, name: str, concurrency: int = 0, rpm: int = 0, tpm: int = 0):
+        self.name = name
+        self.concurrency, self.rpm, self.tpm = concurrency, rpm, tpm
+        self.in_flight = 0
+        self._requests = float(rpm)             # bucket levels
+        self._tokens = float(tpm)
+        self._refilled = time.monotonic()
+        self._queue: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self.counters = {"admitted": 0, "queued": 0, "wait_ms_total": 0, "wait_ms_max": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._refilled
+        self._refilled = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _wait_s(self, tokens: int) -> float | None:
+        """0 if ``tokens`` can be admitted now, seconds until the buckets allow it,
+        or None if only a release (a free concurrency slot) can help."""
+        if self.concurrency and self.in_flight >= self.concurrency:
+            return None
+        wait_s = 0.0
+        if self.rpm and self._requests < 1:
+            wait_s = max(wait_s, (1 - self._requests) * 60 / self.rpm)
+        if self.tpm:
+            need = min(tokens, self.tpm)
+            if self._tokens < need:
+                wait_s = max(wait_s, (need - self._tokens) * 60 / self.tpm)
+        return wait_s
+
+    def _try_admit(self, waiter: _Waiter | None, tokens: int) -> float | None | bool:
+        """Under the lock: admit if it is this caller's turn and the limits allow.
+        Returns True when admitted, else how long to wait (see ``_wait_s``)."""
+        self._refill()
+        if self._queue and self._queue[0] is not waiter:
+            return None                         # not our turn — woken when we reach the head
+        wait_s = self._wait_s(tokens)
+        if wait_s != 0:
+            return wait_s
+        if waiter is not None:
+            self._queue.popleft()
+            if self._queue:
+                self._queue[0].wake()
+        self.in_flight += 1
+        if self.rpm:
+            self._requests -= 1
+        if self.tpm:
+            self._tokens -= tokens
+        self.counters["admitted"] += 1
+        return True
+
+    def _record_wait(self, start: float):
+        ms = int((time.perf_counter() - start) * 1000)
+        self.counters["wait_ms_total"] += ms
+        self.counters["wait_ms_max"] = max(self.counters["wait_ms_max"], ms)
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            was_head = bool(self._queue) and self._queue[0] is waiter
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+            if was_head and self._queue:
+                self._queue[0].wake()
+
+    def acquire(self, tokens: int):
+        with self._lock:
+            if self._try_admit(None, tokens) is True:
+                return
+            waiter = _Waiter(tokens)
+            self._queue.append(waiter)
+            self.counters["queued"] += 1
+        start = time.perf_counter()
+        try:
+            while True:
+                with self._lock:
+                    admitted = self._try_admit(waiter, tokens)
+                    if admitted is True:
+                        self._record_wait(start)
+                        return
+                    waiter.event.clear()
+                waiter.event.wait(admitted)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def aacquire(self, tokens: int):
+        with self._lock:
+            if self._try_admit(None, tokens) is True:
+                return
+            waiter = _Waiter(tokens, asyncio.get_running_loop())
+            self._queue.append(waiter)
+            self.counters["queued"] += 1
+        start = time.perf_counter()
+        try:
+            while True:
+                with self._lock:
+                    admitted = self._try_admit(waiter, tokens)
+                    if admitted is True:
+                        self._record_wait(start)
+                        return
+                    waiter.event.clear()
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), admitted)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            if self._queue:
+                self._queue[0].wake()
+
+    @contextmanager
+    def slot(self, tokens: int):
+        self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int):
+        await self.aacquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill()
+            admitted = self.counters["admitted"]
+            return {
+                "concurrency": self.concurrency, "rpm": self.rpm, "tpm": self.tpm,
+                "in_flight": self.in_flight, "queue_depth": len(self._queue),
+                **self.counters,
+                "wait_ms_avg": round(self.counters["wait_ms_total"] / admitted) if admitted else 0,
+                "requests_available": int(self._requests) if self.rpm else None,
+                "tokens_available": int(self._tokens) if self.tpm else None,
+            }
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(provider: str, model: str) -> RateLimiter:
+    """Shared limiter for ``provider/model`` (built from settings on first use)."""
+    key = f"{provider}/{model}"
+    if key not in _limiters:
+        with _limiters_lock:
+            if key not in _limiters:
+                s = get_settings()
+                limits = {"concurrency": s.llm_max_concurrency, "rpm": s.llm_rpm, "tpm": s.llm_tpm,
+                          **s.llm_limits.get(provider, {}), **s.llm_limits.get(key, {})}
+                _limiters[key] = RateLimiter(key, limits["concurrency"], limits["rpm"], limits["tpm"])
+    return _limiters[key]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  RESILIENCE (retries, circuit breakers, hedging)
+# ══════════════════════════════════════════════════════════════════════════════
+#
+# Every call below goes through one policy:
+#   - transient failures (429, 5xx, timeouts, dropped connections) are retried
+#     with jittered exponential backoff; a Retry-After header sets the minimum wait
+#   - each provider has a circuit breaker: after LLM_BREAKER_FAILURES
+#     consecutive transient failures its calls fail fast for LLM_BREAKER_RESET_S,
+#     then one trial call is let through
+#   - with LLM_HEDGE on, a call still running after the hedge delay (fixed, or
+#     the provider's observed p95 latency) fires a second request — to the
+#     other provider for text prompts — and the first answer wins
+
+TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+HEDGE_MIN_SAMPLES = 20          # latencies needed before the p95 hedge delay is trusted
+
+
+class LLMRequest(NamedTuple):
+    """One provider request: who it goes to, its estimated size, and how to send it."""
+    provider: str
+    model: str
+    tokens: int
+    send: Callable[[], Any]
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed → open → half-open (one trial call) → closed."""
+
+    def __init__(self, failure_threshold: int, reset_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_s else "open"
+
+    def allow(self) -> str | None:
+        """Ticket for one call — "closed", or "trial" for the single half-open
+        call — or None to fail fast. A call that ends without record_success()
+        or record_failure() must hand its ticket to release()."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return "closed"
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return "trial"
+            return None
+
+    def release(self, ticket: str | None, answered: bool = False):
+        """End a trial that recorded no outcome. If the provider still answered
+        (a non-transient error like a 400) the breaker closes; if the call was
+        cancelled the next caller gets the trial."""
+        if ticket != "trial":
+            return
+        with self._lock:
+            if self._trial:
+                self._trial = False
+                if answered:
+                    self.failures, self.opened_at = 0, None
+
+    def record_success(self):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failure_threshold and self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class _ProviderStats:
+    """Per-provider call counters and a window of recent latencies."""
+
+    def __init__(self):
+        self.counters = {"calls": 0, "successes": 0, "failures": 0, "retries": 0,
+                         "breaker_rejections": 0, "hedges": 0, "hedge_wins": 0,
+                         "prompt_tokens": 0, "cached_tokens": 0}
+        self.latencies_ms: deque[float] = deque(maxlen=200)
+
+    def p95_ms(self) -> float | None:
+        if len(self.latencies_ms) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_stats: dict[str, _ProviderStats] = {}
+_stats_lock = threading.Lock()
+_hedge_pool = None
+
+
+def _breaker(provider: str) -> CircuitBreaker:
+    if provider not in _breakers:
+        with _stats_lock:
+            if provider not in _breakers:
+                s = get_settings()
+                _breakers[provider] = CircuitBreaker(s.llm_breaker_failures, s.llm_breaker_reset_s)
+    return _breakers[provider]
+
+
+def _count(provider: str, name: str, n: int = 1):
+    with _stats_lock:
+        _stats.setdefault(provider, _ProviderStats()).counters[name] += n
+
+
+def _record_latency(provider: str, ms: float):
+    with _stats_lock:
+        _stats.setdefault(provider, _ProviderStats()).latencies_ms.append(ms)
+
+
+def get_llm_stats() -> dict:
+    """Per-provider counters, latency percentiles, breaker state and the share
+    of prompt tokens served from the provider's prompt cache, plus
+    per provider/model limiter queue depth and wait times under "limits"."""
+    with _stats_lock:
+        out = {}
+        for provider, st in _stats.items():
+            ordered = sorted(st.latencies_ms)
+            out[provider] = {
+                **st.counters,
+                "p50_ms": round(ordered[len(ordered) // 2]) if ordered else None,
+                "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))]) if ordered else None,
+                "breaker": _breakers[provider].state if provider in _breakers else "closed",
+                "cached_token_ratio": (round(st.counters["cached_tokens"] / st.counters["prompt_tokens"], 3)
+                                       if st.counters["prompt_tokens"] else None),
+            }
+    out["limits"] = {key: limiter.stats() for key, limiter in list(_limiters.items())}
+    return out
+
+
+def _status_code(e: Exception) -> int | None:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(e, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def _is_transient(e: Exception) -> bool:
+    if isinstance(e, CircuitOpenError):
+        return False
+    status = _status_code(e)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    # No HTTP status: connection resets and timeouts from the SDK / HTTP client
+    name = type(e).__name__
+    return isinstance(e, (TimeoutError, ConnectionError)) or any(
+        word in name for word in ("Timeout", "Connection", "Connect", "RemoteProtocol", "ReadError"))
+
+
+def _retry_after_s(e: Exception) -> float | None:
+    """Seconds from the error response's Retry-After header, if any."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _backoff_s(attempt: int, e: Exception) -> float:
+    """Full-jitter exponential backoff, never shorter than Retry-After."""
+    s = get_settings()
+    delay = random.uniform(0, min(s.llm_backoff_max_s, s.llm_backoff_base_s * 2 ** attempt))
+    retry_after = _retry_after_s(e)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, s.llm_backoff_max_s))
+    return delay
+
+
+def _hedge_delay_s(provider: str) -> float | None:
+    s = get_settings()
+    if s.llm_hedge_after_ms:
+        return s.llm_hedge_after_ms / 1000
+    with _stats_lock:
+        st = _stats.get(provider)
+        p95 = st.p95_ms() if st else None
+    return p95 / 1000 if p95 is not None else None
+
+
+def _with_retries(req: LLMRequest, on_retry: Callable[[], None] | None = None) -> str | None:
+    """Send ``req`` under its provider's rate limiter, retry policy and circuit breaker."""
+    provider = req.provider
+    limiter = _limiter(provider, req.model)
+    breaker = _breaker(provider)
+    max_retries = get_settings().llm_max_retries
+    attempt = 0
+    while True:
+        ticket = breaker.allow()
+        if not ticket:
+            _count(provider, "breaker_rejections")
+            raise CircuitOpenError(f"{provider} circuit breaker open — failing fast")
+        settled = False
+        try:
+            with limiter.slot(req.tokens):
+                _count(provider, "calls")
+                t0 = time.perf_counter()
+                result = req.send()
+        except Exception as e:
+            settled, error = True, e
+            transient = _is_transient(e)
+            if transient:
+                breaker.record_failure()
+            else:
+                breaker.release(ticket, answered=True)
+            if not transient or attempt >= max_retries:
+                _count(provider, "failures")
+                raise
+        else:
+            settled = True
+            breaker.record_success()
+            _count(provider, "successes")
+            _record_latency(provider, (time.perf_counter() - t0) * 1000)
+            return result
+        finally:
+            if not settled:   # cancelled or interrupted mid-call
+                breaker.release(ticket)
+        delay = _backoff_s(attempt, error)
+        logger.warning(f"{provider} transient error ({error}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        _count(provider, "retries")
+        if on_retry:
+            on_retry()
+        attempt += 1
+        time.sleep(delay)
+
+
+async def _awith_retries(req: LLMRequest, on_retry: Callable[[], None] | None = None) -> str | None:
+    """Async :func:`_with_retries`; ``req.send`` returns an awaitable."""
+    provider = req.provider
+    limiter = _limiter(provider, req.model)
+    breaker = _breaker(provider)
+    max_retries = get_settings().llm_max_retries
+    attempt = 0
+    while True:
+        ticket = breaker.allow()
+        if not ticket:
+            _count(provider, "breaker_rejections")
+            raise CircuitOpenError(f"{provider} circuit breaker open — failing fast")
+        settled = False
+        try:
+            async with limiter.aslot(req.tokens):
+                _count(provider, "calls")
+                t0 = time.perf_counter()
+                result = await req.send()
+        except Exception as e:
+            settled, error = True, e
+            transient = _is_transient(e)
+            if transient:
+                breaker.record_failure()
+            else:
+                breaker.release(ticket, answered=True)
+            if not transient or attempt >= max_retries:
+                _count(provider, "failures")
+                raise
+        else:
+            settled = True
+            breaker.record_success()
+            _count(provider, "successes")
+            _record_latency(provider, (time.perf_counter() - t0) * 1000)
+            return result
+        finally:
+            if not settled:   # cancelled or interrupted mid-call
+                breaker.release(ticket)
+        delay = _backoff_s(attempt, error)
+        logger.warning(f"{provider} transient error ({error}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        _count(provider, "retries")
+        if on_retry:
+            on_retry()
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+def _get_hedge_pool():
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _stats_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+    return _hedge_pool
+
+
+def _resilient(req: LLMRequest, hedge: LLMRequest | None = None) -> str | None:
+    """Retried call, optionally hedged with a second request ``hedge``."""
+    provider = req.provider
+    if hedge is None or not get_settings().llm_hedge:
+        return _with_retries(req)
+    if hedge.provider != provider and _breaker(provider).state == "open":
+        # Primary is known to be down — go straight to the hedge target
+        _count(provider, "breaker_rejections")
+        return _with_retries(hedge)
+    delay = _hedge_delay_s(provider)
+    if delay is None:
+        return _with_retries(req)
+
+    pool = _get_hedge_pool()
+    retrying = threading.Event()
+    primary = pool.submit(_with_retries, req, retrying.set)
+    done, _ = wait([primary], timeout=delay)
+    if done or retrying.is_set():
+        # Slow because it is backing off from errors, not a slow tail — don't add load
+        return primary.result()
+    _count(provider, "hedges")
+    logger.info(f"{provider} call slower than {delay:.1f}s — hedging to {hedge.provider}")
+    secondary = pool.submit(_with_retries, hedge)
+    pending = {primary, secondary}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is secondary:
+                    _count(provider, "hedge_wins")
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+async def _aresilient(req: LLMRequest, hedge: LLMRequest | None = None) -> str | None:
+    """Async :func:`_resilient`; the losing request is cancelled."""
+    provider = req.provider
+    if hedge is None or not get_settings().llm_hedge:
+        return await _awith_retries(req)
+    if hedge.provider != provider and _breaker(provider).state == "open":
+        _count(provider, "breaker_rejections")
+        return await _awith_retries(hedge)
+    delay = _hedge_delay_s(provider)
+    if delay is None:
+        return await _awith_retries(req)
+
+    retrying = asyncio.Event()
+    primary = asyncio.ensure_future(_awith_retries(req, retrying.set))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done or retrying.is_set():
+        return await primary
+    _count(provider, "hedges")
+    logger.info(f"{provider} call slower than {delay:.1f}s — hedging to {hedge.provider}")
+    secondary = asyncio.ensure_future(_awith_retries(hedge))
+    pending = {primary, secondary}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is secondary:
+                        _count(provider, "hedge_wins")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _text_hedge_target(provider: str, model: str) -> tuple[str, str] | None:
+    """(provider, model) a slow text call is hedged to: the other provider if configured."""
+    s = get_settings()
+    other = "openai" if provider == "gemini" else "gemini"
+    if s.llm_hedge_target == "other_provider" and (s.has_openai if other == "openai" else s.has_gemini):
+        return other, (s.openai_model if other == "openai" else s.gemini_model)
+    return provider, model
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  STRUCTURED OUTPUT & PROMPT CACHING
+# ══════════════════════════════════════════════════════════════════════════════
+# Every call takes an optional ``response_schema`` (a JSON Schema object). The
+# provider then constrains decoding to valid JSON of that shape — Gemini via
+# response_json_schema, OpenAI via a strict json_schema response_format.
+#
+# Calls also take optional ``instructions``: a long static prefix (the
+# extraction rules) sent ahead of the per-request prompt, so providers only
+# process the document part from scratch:
+#   - OpenAI: a system message first — an identical prefix on every request
+#     for automatic prompt caching — plus a prompt_cache_key so requests with
+#     the same instructions are routed to the same cache
+#   - Gemini: with GEMINI_CONTEXT_CACHE on, the instructions are stored once
+#     per model as cached content (recreated shortly before its TTL runs out)
+#     and referenced by name; otherwise they go in system_instruction, which
+#     still gets implicit prefix caching
+# Prompt and cached-prompt token counts from every response are summed in
+# get_llm_stats().
+
+GEMINI_CACHE_REFRESH_S = 60     # recreate a context cache this close to expiry
+GEMINI_CACHE_RETRY_S = 300      # after a failed create, use system_instruction this long
+
+_gemini_caches: dict[tuple[str, str], tuple[str | None, float]] = {}   # (model, hash) → (name, expires)
+_gemini_caches_lock = threading.Lock()
+_gemini_caches_pending: dict[tuple[str, str], Future] = {}              # (model, hash) → create in flight
+
+
+def _instructions_hash(instructions: str) -> str:
+    return hashlib.sha256(instructions.encode("utf-8")).hexdigest()[:16]
+
+
+def _gemini_cache_name(model: str, instructions: str) -> str | None:
+    """Name of the context cache holding ``instructions`` for ``model`` (created
+    on first use), or None if context caching is off or unavailable.
+
+    The create round-trip runs outside the lock: other keys are never held up,
+    and callers of the same key wait for the one create in flight (or keep
+    using the old cache while it is being refreshed).
+    """
+    s = get_settings()
+    if not s.gemini_context_cache:
+        return None
+    key = (model, _instructions_hash(instructions))
+    with _gemini_caches_lock:
+        name, expires = _gemini_caches.get(key, (None, 0.0))
+        if expires - GEMINI_CACHE_REFRESH_S > time.time():
+            return name
+        pending = _gemini_caches_pending.get(key)
+        if pending is None:
+            pending = _gemini_caches_pending[key] = Future()
+            creating = True
+        else:
+            creating = False
+    if not creating:
+        return name if name and expires > time.time() else pending.result()
+
+    entry = (None, time.time() + GEMINI_CACHE_RETRY_S)
+    try:
+        from google.genai import types as genai_types
+        cache = _get_gemini_client().caches.create(model=model, config=genai_types.CreateCachedContentConfig(
+            system_instruction=instructions, ttl=f"{s.gemini_context_cache_ttl_s}s",
+            display_name=f"lc-instructions-{key[1]}"))
+        entry = (cache.name, time.time() + s.gemini_context_cache_ttl_s)
+        logger.info(f"Gemini context cache {cache.name} created for {model}")
+    except Exception as e:
+        logger.warning(f"Gemini context cache unavailable for {model} ({e}); using system_instruction")
+    finally:
+        with _gemini_caches_lock:
+            _gemini_caches[key] = entry
+            del _gemini_caches_pending[key]
+        pending.set_result(entry[0])
+    return entry[0]
+
+
+def _gemini_config(model: str, schema: dict | None, instructions: str | None = None):
+    if not (schema or instructions):
+        return None
+    from google.genai import types as genai_types
+    kwargs = {}
+    if schema:
+        kwargs.update(response_mime_type="application/json", response_json_schema=schema)
+    if instructions:
+        cache_name = _gemini_cache_name(model, instructions)
+        if cache_name:
+            kwargs["cached_content"] = cache_name
+        else:
+            kwargs["system_instruction"] = instructions
+    return genai_types.GenerateContentConfig(**kwargs)
+
+
+async def _agemini_config(model: str, schema: dict | None, instructions: str | None = None):
+    """Async :func:`_gemini_config` — creating a context cache runs off the loop."""
+    if instructions and get_settings().gemini_context_cache:
+        return await asyncio.to_thread(_gemini_config, model, schema, instructions)
+    return _gemini_config(model, schema, instructions)
+
+
+def _openai_messages(content: str | list[dict], instructions: str | None = None) -> list[dict]:
+    messages = [{"role": "system", "content": instructions}] if instructions else []
+    return messages + [{"role": "user", "content": content}]
+
+
+def _openai_kwargs(schema: dict | None, instructions: str | None = None) -> dict:
+    """Extra chat.completions.create kwargs for ``schema`` and ``instructions``."""
+    kwargs = {}
+    if schema:
+        kwargs["response_format"] = {"type": "json_schema",
+                                     "json_schema": {"name": "extraction", "schema": schema, "strict": True}}
+    if instructions:
+        kwargs["prompt_cache_key"] = f"lc-{_instructions_hash(instructions)}"
+    return kwargs
+
+
+def _record_usage(provider: str, response):
+    """Add a response's prompt and cached-prompt token counts to the provider stats."""
+    if provider == "gemini":
+        usage = getattr(response, "usage_metadata", None)
+        prompt = getattr(usage, "prompt_token_count", None)
+        cached = getattr(usage, "cached_content_token_count", None)
+    else:
+        usage = getattr(response, "usage", None)
+        prompt = getattr(usage, "prompt_tokens", None)
+        cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    if not isinstance(prompt, int):
+        return
+    with _stats_lock:
+        counters = _stats.setdefault(provider, _ProviderStats()).counters
+        counters["prompt_tokens"] += prompt
+        counters["cached_tokens"] += cached if isinstance(cached, int) else 0
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  TEXT-ONLY CALLS
 # ══════════════════════════════════════════════════════════════════════════════
 
-def call_gemini(prompt: str, model_name: str | None = None) -> str | None:
+def _send_text(provider: str, model: str, prompt: str, schema: dict | None = None,
+               instructions: str | None = None) -> str | None:
+    if provider == "gemini":
+        response = _get_gemini_client().models.generate_content(
+            model=model, contents=prompt, config=_gemini_config(model, schema, instructions))
+        _record_usage(provider, response)
+        return response.text
+    response = _get_openai_client().chat.completions.create(
+        model=model,
+        messages=_openai_messages(prompt, instructions),
+        **_openai_kwargs(schema, instructions),
+    )
+    _record_usage(provider, response)
+    return response.choices[0].message.content
+
+
+async def _asend_text(provider: str, model: str, prompt: str, schema: dict | None = None,
+                      instructions: str | None = None) -> str | None:
+    if provider == "gemini":
+        response = await _get_async_gemini_client().models.generate_content(
+            model=model, contents=prompt, config=await _agemini_config(model, schema, instructions))
+        _record_usage(provider, response)
+        return response.text
+    response = await _get_async_openai_client().chat.completions.create(
+        model=model,
+        messages=_openai_messages(prompt, instructions),
+        **_openai_kwargs(schema, instructions),
+    )
+    _record_usage(provider, response)
+    return response.choices[0].message.content
+
+
+def _call_text(provider: str, model: str, prompt: str, schema: dict | None,
+               instructions: str | None) -> str | None:
+    hedge_provider, hedge_model = _text_hedge_target(provider, model)
+    tokens = estimate_tokens((instructions or "") + prompt)
+    return _resilient(
+        LLMRequest(provider, model, tokens, lambda: _send_text(provider, model, prompt, schema, instructions)),
+        hedge=LLMRequest(hedge_provider, hedge_model, tokens,
+                         lambda: _send_text(hedge_provider, hedge_model, prompt, schema, instructions)))
+
+
+async def _acall_text(provider: str, model: str, prompt: str, schema: dict | None,
+                      instructions: str | None) -> str | None:
+    hedge_provider, hedge_model = _text_hedge_target(provider, model)
+    tokens = estimate_tokens((instructions or "") + prompt)
+    return await _aresilient(
+        LLMRequest(provider, model, tokens, lambda: _asend_text(provider, model, prompt, schema, instructions)),
+        hedge=LLMRequest(hedge_provider, hedge_model, tokens,
+                         lambda: _asend_text(hedge_provider, hedge_model, prompt, schema, instructions)))
+
+
+def call_gemini(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                instructions: str | None = None) -> str | None:
     """Call Gemini with a text prompt."""
     client = _get_gemini_client()
     if not client:
         return None
     model = model_name or get_settings().gemini_model
     try:
-        response = client.models.generate_content(model=model, contents=prompt)
-        return response.text
+        return _call_text("gemini", model, prompt, response_schema, instructions)
     except Exception as e:
         raise RuntimeError(f"Gemini error: {e}") from e
 
 
-def call_openai(prompt: str, model_name: str | None = None) -> str | None:
+def call_openai(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                instructions: str | None = None) -> str | None:
     """Call OpenAI with a text prompt."""
     client = _get_openai_client()
     if not client:
         return None
     model = model_name or get_settings().openai_model
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return response.choices[0].message.content
+        return _call_text("openai", model, prompt, response_schema, instructions)
     except Exception as e:
         raise RuntimeError(f"OpenAI error: {e}") from e
 
 
-def call_llm(prompt: str, provider: str | None = None, model_name: str | None = None) -> str | None:
+def call_llm(prompt: str, provider: str | None = None, model_name: str | None = None,
+             response_schema: dict | None = None, instructions: str | None = None) -> str | None:
     """Unified LLM call — routes to the correct provider."""
     provider = provider or get_settings().default_llm_provider
     if provider == "gemini":
-        return call_gemini(prompt, model_name)
+        return call_gemini(prompt, model_name, response_schema, instructions)
     elif provider == "openai":
-        return call_openai(prompt, model_name)
+        return call_openai(prompt, model_name, response_schema, instructions)
+    else:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+async def acall_gemini(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                       instructions: str | None = None) -> str | None:
+    """Async :func:`call_gemini`."""
+    client = _get_async_gemini_client()
+    if not client:
+        return None
+    model = model_name or get_settings().gemini_model
+    try:
+        return await _acall_text("gemini", model, prompt, response_schema, instructions)
+    except Exception as e:
+        raise RuntimeError(f"Gemini error: {e}") from e
+
+
+async def acall_openai(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                       instructions: str | None = None) -> str | None:
+    """Async :func:`call_openai`."""
+    client = _get_async_openai_client()
+    if not client:
+        return None
+    model = model_name or get_settings().openai_model
+    try:
+        return await _acall_text("openai", model, prompt, response_schema, instructions)
+    except Exception as e:
+        raise RuntimeError(f"OpenAI error: {e}") from e
+
+
+async def acall_llm(prompt: str, provider: str | None = None, model_name: str | None = None,
+                    response_schema: dict | None = None, instructions: str | None = None) -> str | None:
+    """Async :func:`call_llm`."""
+    provider = provider or get_settings().default_llm_provider
+    if provider == "gemini":
+        return await acall_gemini(prompt, model_name, response_schema, instructions)
+    elif provider == "openai":
+        return await acall_openai(prompt, model_name, response_schema, instructions)
     else:
         raise ValueError(f"Unknown LLM provider: {provider}")
 
@@ -83,8 +972,11 @@ def call_llm(prompt: str, provider: str | None = None, model_name: str | None =
 # ══════════════════════════════════════════════════════════════════════════════
 #  VISION CALLS (PDF/image input)
 # ══════════════════════════════════════════════════════════════════════════════
+# Vision payloads differ per provider, so a slow vision call is hedged with a
+# duplicate request to the same model.
 
-def call_gemini_vision(pdf_bytes: bytes, prompt: str, model_name: str | None = None) -> str | None:
+def call_gemini_vision(pdf_bytes: bytes, prompt: str, model_name: str | None = None,
+                       response_schema: dict | None = None, instructions: str | None = None) -> str | None:
     """Send a PDF directly to Gemini Vision."""
     client = _get_gemini_client()
     if not client:
@@ -94,34 +986,382 @@ def call_gemini_vision(pdf_bytes: bytes, prompt: str, model_name: str | None = N
     try:
         from google.genai import types as genai_types
         pdf_part = genai_types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf")
-        response = client.models.generate_content(model=model, contents=[pdf_part, prompt])
-        return response.text
+
+        def send():
+            response = client.models.generate_content(
+                model=model, contents=[pdf_part, prompt],
+                config=_gemini_config(model, response_schema, instructions))
+            _record_usage("gemini", response)
+            return response.text
+        req = LLMRequest("gemini", model, estimate_tokens((instructions or "") + prompt, pdf_bytes=pdf_bytes), send)
+        return _resilient(req, hedge=req)
     except Exception as e:
         raise RuntimeError(f"Gemini Vision error: {e}") from e
 
 
-def call_openai_vision(images_b64: list[str], prompt: str, model_name: str | None = None) -> str | None:
-    """Send images to OpenAI GPT-4o Vision."""
+def _openai_vision_content(images_b64: list[str], prompt: str, mime_types: list[str] | None) -> list[dict]:
+    content = []
+    for i, b64 in enumerate(images_b64):
+        mime_type = mime_types[i] if mime_types else "image/png"
+        content.append({
+            "type": "image_url",
+            "image_url": {"url": f"data:{mime_type};base64,{b64}"},
+        })
+    content.append({"type": "text", "text": prompt})
+    return content
+
+
+def call_openai_vision(images_b64: list[str], prompt: str, model_name: str | None = None,
+                       mime_types: list[str] | None = None, response_schema: dict | None = None,
+                       instructions: str | None = None) -> str | None:
+    """Send images to OpenAI GPT-4o Vision. ``mime_types`` defaults to PNG for every image."""
     client = _get_openai_client()
     if not client:
         return None
     model = model_name or get_settings().openai_model
 
     try:
-        content = []
-        for b64 in images_b64:
-            content.append({
-                "type": "image_url",
-                "image_url": {"url": f"data:image/png;base64,{b64}"},
-            })
-        content.append({"type": "text", "text": prompt})
-
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": content}],
-            max_tokens=4000,
-        )
-        return response.choices[0].message.content
+        messages = _openai_messages(_openai_vision_content(images_b64, prompt, mime_types), instructions)
+
+        def send():
+            response = client.chat.completions.create(model=model, messages=messages, max_tokens=4000,
+                                                      **_openai_kwargs(response_schema, instructions))
+            _record_usage("openai", response)
+            return response.choices[0].message.content
+        req = LLMRequest("openai", model, estimate_tokens((instructions or "") + prompt, images=len(images_b64)), send)
+        return _resilient(req, hedge=req)
+    except Exception as e:
+        raise RuntimeError(f"OpenAI Vision error: {e}") from e
+
+
+async def acall_gemini_vision(pdf_bytes: bytes, prompt: str, model_name: str | None = None,
+                              response_schema: dict | None = None, instructions: str | None = None) -> str | None:
+    """Async :func:`call_gemini_vision`."""
+    client = _get_async_gemini_client()
+    if not client:
+        return None
+    model = model_name or get_settings().gemini_vision_model
+
+    try:
+        from google.genai import types as genai_types
+        pdf_part = genai_types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf")
+
+        async def send():
+            response = await client.models.generate_content(
+                model=model, contents=[pdf_part, prompt],
+                config=await _agemini_config(model, response_schema, instructions))
+            _record_usage("gemini", response)
+            return response.text
+        req = LLMRequest("gemini", model, estimate_tokens((instructions or "") + prompt, pdf_bytes=pdf_bytes), send)
+        return await _aresilient(req, hedge=req)
+    except Exception as e:
+        raise RuntimeError(f"Gemini Vision error: {e}") from e
+
+
+async def acall_openai_vision(images_b64: list[str], prompt: str, model_name: str | None = None,
+                              mime_types: list[str] | None = None, response_schema: dict | None = None,
+                              instructions: str | None = None) -> str | None:
+    """Async :func:`call_openai_vision`."""
+    client = _get_async_openai_client()
+    if not client:
+        return None
+    model = model_name or get_settings().openai_model
+
+    try:
+        messages = _openai_messages(_openai_vision_content(images_b64, prompt, mime_types), instructions)
+
+        async def send():
+            response = await client.chat.completions.create(model=model, messages=messages, max_tokens=4000,
+                                                            **_openai_kwargs(response_schema, instructions))
+            _record_usage("openai", response)
+            return response.choices[0].message.content
+        req = LLMRequest("openai", model, estimate_tokens((instructions or "") + prompt, images=len(images_b64)), send)
+        return await _aresilient(req, hedge=req)
+    except Exception as e:
+        raise RuntimeError(f"OpenAI Vision error: {e}") from e
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  STREAMING CALLS (text chunks as they are generated)
+# ══════════════════════════════════════════════════════════════════════════════
+# Streams take a rate-limiter slot for their whole duration and are retried
+# only if they fail before the first chunk; they are never hedged. Feed the
+# chunks to JSONFieldStream to get extracted fields as soon as they complete.
+
+def _stream_with_retries(req: LLMRequest) -> Iterator[str]:
+    """Stream ``req.send()`` (an iterator of text chunks) under the call policy."""
+    provider = req.provider
+    limiter = _limiter(provider, req.model)
+    breaker = _breaker(provider)
+    max_retries = get_settings().llm_max_retries
+    attempt = 0
+    while True:
+        ticket = breaker.allow()
+        if not ticket:
+            _count(provider, "breaker_rejections")
+            raise CircuitOpenError(f"{provider} circuit breaker open — failing fast")
+        started = settled = False
+        try:
+            with limiter.slot(req.tokens):
+                _count(provider, "calls")
+                t0 = time.perf_counter()
+                for chunk in req.send():
+                    if chunk:
+                        started = True
+                        yield chunk
+        except Exception as e:
+            settled, error = True, e
+            transient = _is_transient(e)
+            if transient:
+                breaker.record_failure()
+            else:
+                breaker.release(ticket, answered=True)
+            if not transient or started or attempt >= max_retries:
+                _count(provider, "failures")
+                raise
+        else:
+            settled = True
+            breaker.record_success()
+            _count(provider, "successes")
+            _record_latency(provider, (time.perf_counter() - t0) * 1000)
+            return
+        finally:
+            if not settled:   # consumer stopped reading, or cancelled
+                breaker.release(ticket)
+        delay = _backoff_s(attempt, error)
+        logger.warning(f"{provider} stream failed before first chunk ({error}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        _count(provider, "retries")
+        attempt += 1
+        time.sleep(delay)
+
+
+async def _astream_with_retries(req: LLMRequest) -> AsyncIterator[str]:
+    """Async :func:`_stream_with_retries`; ``req.send()`` is awaited for an async iterator."""
+    provider = req.provider
+    limiter = _limiter(provider, req.model)
+    breaker = _breaker(provider)
+    max_retries = get_settings().llm_max_retries
+    attempt = 0
+    while True:
+        ticket = breaker.allow()
+        if not ticket:
+            _count(provider, "breaker_rejections")
+            raise CircuitOpenError(f"{provider} circuit breaker open — failing fast")
+        started = settled = False
+        try:
+            async with limiter.aslot(req.tokens):
+                _count(provider, "calls")
+                t0 = time.perf_counter()
+                async for chunk in await req.send():
+                    if chunk:
+                        started = True
+                        yield chunk
+        except Exception as e:
+            settled, error = True, e
+            transient = _is_transient(e)
+            if transient:
+                breaker.record_failure()
+            else:
+                breaker.release(ticket, answered=True)
+            if not transient or started or attempt >= max_retries:
+                _count(provider, "failures")
+                raise
+        else:
+            settled = True
+            breaker.record_success()
+            _count(provider, "successes")
+            _record_latency(provider, (time.perf_counter() - t0) * 1000)
+            return
+        finally:
+            if not settled:   # consumer stopped reading, or cancelled
+                breaker.release(ticket)
+        delay = _backoff_s(attempt, error)
+        logger.warning(f"{provider} stream failed before first chunk ({error}); retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        _count(provider, "retries")
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+def _openai_deltas(stream) -> Iterator[str]:
+    for event in stream:
+        if event.usage:
+            _record_usage("openai", event)
+        if event.choices and event.choices[0].delta.content:
+            yield event.choices[0].delta.content
+
+
+async def _aopenai_deltas(stream) -> AsyncIterator[str]:
+    async for event in stream:
+        if event.usage:
+            _record_usage("openai", event)
+        if event.choices and event.choices[0].delta.content:
+            yield event.choices[0].delta.content
+
+
+def _gemini_texts(stream) -> Iterator[str]:
+    last = None
+    for chunk in stream:
+        last = chunk
+        if chunk.text:
+            yield chunk.text
+    _record_usage("gemini", last)
+
+
+async def _agemini_texts(stream) -> AsyncIterator[str]:
+    last = None
+    async for chunk in stream:
+        last = chunk
+        if chunk.text:
+            yield chunk.text
+    _record_usage("gemini", last)
+
+
+_OPENAI_STREAM = {"stream": True, "stream_options": {"include_usage": True}}
+
+
+def stream_gemini(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                  instructions: str | None = None) -> Iterator[str]:
+    """Streaming :func:`call_gemini` — yields text chunks as Gemini generates them."""
+    client = _get_gemini_client()
+    if not client:
+        return
+    model = model_name or get_settings().gemini_model
+
+    def send():
+        return _gemini_texts(client.models.generate_content_stream(
+            model=model, contents=prompt, config=_gemini_config(model, response_schema, instructions)))
+    try:
+        req = LLMRequest("gemini", model, estimate_tokens((instructions or "") + prompt), send)
+        yield from _stream_with_retries(req)
+    except Exception as e:
+        raise RuntimeError(f"Gemini error: {e}") from e
+
+
+def stream_openai(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                  instructions: str | None = None) -> Iterator[str]:
+    """Streaming :func:`call_openai` — yields text chunks as OpenAI generates them."""
+    client = _get_openai_client()
+    if not client:
+        return
+    model = model_name or get_settings().openai_model
+
+    def send():
+        return _openai_deltas(client.chat.completions.create(
+            model=model, messages=_openai_messages(prompt, instructions), **_OPENAI_STREAM,
+            **_openai_kwargs(response_schema, instructions)))
+    try:
+        req = LLMRequest("openai", model, estimate_tokens((instructions or "") + prompt), send)
+        yield from _stream_with_retries(req)
+    except Exception as e:
+        raise RuntimeError(f"OpenAI error: {e}") from e
+
+
+def stream_llm(prompt: str, provider: str | None = None, model_name: str | None = None,
+               response_schema: dict | None = None, instructions: str | None = None) -> Iterator[str]:
+    """Streaming :func:`call_llm`."""
+    provider = provider or get_settings().default_llm_provider
+    if provider == "gemini":
+        return stream_gemini(prompt, model_name, response_schema, instructions)
+    elif provider == "openai":
+        return stream_openai(prompt, model_name, response_schema, instructions)
+    else:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+async def astream_gemini(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                         instructions: str | None = None) -> AsyncIterator[str]:
+    """Async :func:`stream_gemini`."""
+    client = _get_async_gemini_client()
+    if not client:
+        return
+    model = model_name or get_settings().gemini_model
+
+    async def send():
+        return _agemini_texts(await client.models.generate_content_stream(
+            model=model, contents=prompt, config=await _agemini_config(model, response_schema, instructions)))
+    try:
+        req = LLMRequest("gemini", model, estimate_tokens((instructions or "") + prompt), send)
+        async for chunk in _astream_with_retries(req):
+            yield chunk
+    except Exception as e:
+        raise RuntimeError(f"Gemini error: {e}") from e
+
+
+async def astream_openai(prompt: str, model_name: str | None = None, response_schema: dict | None = None,
+                         instructions: str | None = None) -> AsyncIterator[str]:
+    """Async :func:`stream_openai`."""
+    client = _get_async_openai_client()
+    if not client:
+        return
+    model = model_name or get_settings().openai_model
+
+    async def send():
+        return _aopenai_deltas(await client.chat.completions.create(
+            model=model, messages=_openai_messages(prompt, instructions), **_OPENAI_STREAM,
+            **_openai_kwargs(response_schema, instructions)))
+    try:
+        req = LLMRequest("openai", model, estimate_tokens((instructions or "") + prompt), send)
+        async for chunk in _astream_with_retries(req):
+            yield chunk
+    except Exception as e:
+        raise RuntimeError(f"OpenAI error: {e}") from e
+
+
+def astream_llm(prompt: str, provider: str | None = None, model_name: str | None = None,
+                response_schema: dict | None = None, instructions: str | None = None) -> AsyncIterator[str]:
+    """Async :func:`stream_llm`."""
+    provider = provider or get_settings().default_llm_provider
+    if provider == "gemini":
+        return astream_gemini(prompt, model_name, response_schema, instructions)
+    elif provider == "openai":
+        return astream_openai(prompt, model_name, response_schema, instructions)
+    else:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+async def astream_gemini_vision(pdf_bytes: bytes, prompt: str, model_name: str | None = None,
+                                response_schema: dict | None = None,
+                                instructions: str | None = None) -> AsyncIterator[str]:
+    """Streaming :func:`acall_gemini_vision`."""
+    client = _get_async_gemini_client()
+    if not client:
+        return
+    model = model_name or get_settings().gemini_vision_model
+
+    try:
+        from google.genai import types as genai_types
+        pdf_part = genai_types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf")
+
+        async def send():
+            return _agemini_texts(await client.models.generate_content_stream(
+                model=model, contents=[pdf_part, prompt],
+                config=await _agemini_config(model, response_schema, instructions)))
+        req = LLMRequest("gemini", model, estimate_tokens((instructions or "") + prompt, pdf_bytes=pdf_bytes), send)
+        async for chunk in _astream_with_retries(req):
+            yield chunk
+    except Exception as e:
+        raise RuntimeError(f"Gemini Vision error: {e}") from e
+
+
+async def astream_openai_vision(images_b64: list[str], prompt: str, model_name: str | None = None,
+                                mime_types: list[str] | None = None, response_schema: dict | None = None,
+                                instructions: str | None = None) -> AsyncIterator[str]:
+    """Streaming :func:`acall_openai_vision`."""
+    client = _get_async_openai_client()
+    if not client:
+        return
+    model = model_name or get_settings().openai_model
+
+    try:
+        messages = _openai_messages(_openai_vision_content(images_b64, prompt, mime_types), instructions)
+
+        async def send():
+            return _aopenai_deltas(await client.chat.completions.create(
+                model=model, messages=messages, max_tokens=4000, **_OPENAI_STREAM,
+                **_openai_kwargs(response_schema, instructions)))
+        req = LLMRequest("openai", model, estimate_tokens((instructions or "") + prompt, images=len(images_b64)), send)
+        async for chunk in _astream_with_retries(req):
+            yield chunk
     except Exception as e:
         raise RuntimeError(f"OpenAI Vision error: {e}") from e
 
@@ -150,11 +1390,116 @@ def parse_json_response(raw_text: str) -> dict[str, Any]:
         if isinstance(data, dict):
             # Normalize null-like strings
             for k, v in data.items():
-                if isinstance(v, str) and v.strip().lower() in (
-                    "null", "n/a", "none", "not found", "not available", "not specified", ""
-                ):
-                    data[k] = None
+                data[k] = _null_like(v)
             return data
         return {}
     except json.JSONDecodeError:
         return {}
+
+
+_NULL_LIKE = ("null", "n/a", "none", "not found", "not available", "not specified", "")
+
+
+def _null_like(value):
+    """None for the null-like strings LLMs write instead of JSON null."""
+    if isinstance(value, str) and value.strip().lower() in _NULL_LIKE:
+        return None
+    return value
+
+
+class JSONFieldStream:
+    """Incremental parser for the top-level JSON object of a streamed response.
+
+    ``feed(chunk)`` returns the (key, value) pairs completed by that chunk, in
+    order. Text before the opening brace (markdown fences, preamble) is
+    skipped; values get the same null normalization as parse_json_response.
+
+        fields = JSONFieldStream()
+        for chunk in stream_llm(prompt):
+            for key, value in fields.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0                   # next character to scan
+        self._state = "start"           # start → key → in_key → colon → value_start → value → comma → … → end
+        self._start = 0                 # where the current key / value began
+        self._key = None
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self._is_str = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == "end"
+
+    def _emit(self, out: list, end: int):
+        try:
+            value = json.loads(self._buf[self._start:end])
+        except json.JSONDecodeError:
+            return                      # malformed value — parse_json_response settles it at the end
+        out.append((self._key, _null_like(value)))
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        self._buf += chunk
+        buf, out = self._buf, []
+        while self._pos < len(buf) and self._state != "end":
+            c, state = buf[self._pos], self._state
+            if state == "start":
+                if c == "{":
+                    self._state = "key"
+            elif state == "key":
+                if c == '"':
+                    self._start, self._state = self._pos, "in_key"
+                elif c == "}":
+                    self._state = "end"
+            elif state == "in_key":
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._key = json.loads(buf[self._start:self._pos + 1])
+                    self._state = "colon"
+            elif state == "colon":
+                if c == ":":
+                    self._state = "value_start"
+            elif state == "value_start":
+                if not c.isspace():
+                    self._start, self._depth, self._in_str = self._pos, 0, False
+                    self._is_str = c == '"'
+                    self._state = "value"
+                    continue            # scan this character as part of the value
+            elif state == "value":
+                if self._in_str:
+                    if self._escape:
+                        self._escape = False
+                    elif c == "\\":
+                        self._escape = True
+                    elif c == '"':
+                        self._in_str = False
+                        if self._is_str and self._depth == 0:
+                            self._emit(out, self._pos + 1)
+                            self._state = "comma"
+                elif c == '"':
+                    self._in_str = True
+                elif c in "{[":
+                    self._depth += 1
+                elif c in "}]" and self._depth:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._emit(out, self._pos + 1)
+                        self._state = "comma"
+                elif c in ",}" and self._depth == 0:
+                    # End of a bare number / true / false / null
+                    self._emit(out, self._pos)
+                    self._state = "key" if c == "," else "end"
+            elif state == "comma":
+                if c == ",":
+                    self._state = "key"
+                elif c == "}":
+                    self._state = "end"
+            self._pos += 1
+        return out
@@ -1,8 +1,20 @@
-"""PDF text extraction utilities — PyPDF2, OCR, and page-to-image conversion."""
+"""PDF text extraction utilities — PyPDF2, OCR, and page-to-image conversion.
+
+``PdfDocument`` parses a PDF once and memoizes text, page count, scanned-ness
+and rendered pages; the module-level functions are one-shot wrappers.
+"""
 
 from __future__ import annotations
 import io
+import os
+import math
+import time
 import base64
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 #import PyPDF2
 import pypdf as PyPDF2
 
@@ -15,51 +27,539 @@ try:
 except ImportError:
     pass
 
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+SCANNED_TEXT_THRESHOLD = 50   # fewer extractable characters than this → scanned
+PAGE_TEXT_MIN_CHARS = 20      # a page with less text than this is treated as an image page
+SCAN_SAMPLE_PAGES = 5         # pages (spread over the doc) checked first by the scanned detector
+
+# OpenAI vision (high detail) scales every image to fit 2048×2048 and then
+# to a 768px short side — anything sent beyond that is uploaded and discarded.
+VISION_PROFILES = {
+    "lossless": {"dpi": 200, "grayscale": False, "format": "PNG", "quality": None,
+                 "short_px": None, "long_px": None},
+    "balanced": {"dpi": None, "grayscale": True, "format": "JPEG", "quality": 80,
+                 "short_px": 768, "long_px": 2048},
+    "compact": {"dpi": None, "grayscale": True, "format": "WEBP", "quality": 60,
+                "short_px": 768, "long_px": 2048},
+}
+VISION_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+VISION_MIN_DPI, VISION_MAX_DPI = 50, 200
+
+PAGE_TEXT = "text"            # page has a usable text layer
+PAGE_IMAGE = "image"          # page must be rendered (scan, photo, vector-only)
+
+
+def _too_little_text(text: str) -> bool:
+    """The one scanned test: fewer than SCANNED_TEXT_THRESHOLD characters of text layer."""
+    return len(text) < SCANNED_TEXT_THRESHOLD
+
+
+def _sample_order(n: int, k: int = SCAN_SAMPLE_PAGES) -> list[int]:
+    """Page indices with ``k`` evenly spread samples first, then the rest in order."""
+    if n <= k or k < 2:
+        return list(range(n))
+    head = sorted({round(j * (n - 1) / (k - 1)) for j in range(k)})
+    chosen = set(head)
+    return head + [i for i in range(n) if i not in chosen]
+
+
+def _resource_signals(resources, depth: int = 0) -> tuple[bool, int]:
+    """(has fonts, image XObject count) for a resource dict, following Form XObjects."""
+    if resources is None:
+        return False, 0
+    resources = resources.get_object()
+    fonts = resources.get("/Font")
+    has_fonts = bool(fonts and len(fonts.get_object()))
+    images = 0
+    xobjects = resources.get("/XObject")
+    if xobjects:
+        for ref in xobjects.get_object().values():
+            xobj = ref.get_object()
+            subtype = xobj.get("/Subtype")
+            if subtype == "/Image":
+                images += 1
+            elif subtype == "/Form" and depth < 3:
+                f, i = _resource_signals(xobj.get("/Resources"), depth + 1)
+                has_fonts |= f
+                images += i
+    return has_fonts, images
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  PDF DOCUMENT (parse once, memoize everything)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class PdfDocument:
+    """One uploaded PDF, parsed at most once per request.
+
+    Everything is computed lazily on first access and memoized: the pypdf
+    reader, per-page text, page count, scanned-ness, OCR text and encoded
+    page images. Page bitmaps are streamed (``iter_images``), never kept.
+    Pass the object between extraction steps instead of the raw bytes so no
+    step re-decodes the file.
+
+        doc = PdfDocument(pdf_bytes)
+        if doc.is_scanned: ...
+        doc.text                   # "--- Page N ---" formatted text layer
+        doc.base64_images(max_pages=15)
+    """
+
+    def __init__(self, pdf_bytes: bytes):
+        self.pdf_bytes = pdf_bytes
+        self._reader = None
+        self._page_texts: dict[int, str] = {}
+        self._page_kinds: dict[int, str] = {}
+        self._scanned: bool | None = None
+        self._text: str | None = None
+        self._ocr_pages: dict[int, list[dict]] = {}
+        self._b64_images: dict[tuple[int, int], list[str]] = {}
+        self._vision_images: dict[tuple, tuple[list[str], list[str], dict]] = {}
+
+    @property
+    def reader(self) -> PyPDF2.PdfReader:
+        if self._reader is None:
+            self._reader = PyPDF2.PdfReader(io.BytesIO(self.pdf_bytes))
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        return len(self.reader.pages)
+
+    def page_text(self, i: int) -> str:
+        """Text layer of page ``i`` (0-based), '' when the page has none."""
+        if i not in self._page_texts:
+            self._page_texts[i] = self.reader.pages[i].extract_text() or ""
+        return self._page_texts[i]
+
+    @property
+    def text(self) -> str:
+        """Text layer of all pages, each prefixed with '--- Page N ---'."""
+        if self._text is None:
+            text = ""
+            for i in range(self.page_count):
+                page_text = self.page_text(i)
+                if page_text.strip():
+                    text += f"\n--- Page {i+1} ---\n{page_text}"
+            self._text = text.strip()
+        return self._text
+
+    def page_signals(self, i: int) -> tuple[bool, int]:
+        """Cheap structural signals for page ``i``: (has fonts, image XObject count)."""
+        try:
+            return _resource_signals(self.reader.pages[i].get("/Resources"))
+        except Exception:
+            return True, 0   # unreadable resources — let text extraction decide
+
+    def page_kind(self, i: int) -> str:
+        """PAGE_TEXT or PAGE_IMAGE for page ``i`` (0-based).
+
+        A page without any font resources cannot carry a text layer, so it is
+        classified without running text extraction.
+        """
+        if i not in self._page_kinds:
+            has_fonts, _ = self.page_signals(i)
+            if not has_fonts:
+                self._page_texts.setdefault(i, "")
+                self._page_kinds[i] = PAGE_IMAGE
+            else:
+                text = self.page_text(i).strip()
+                self._page_kinds[i] = PAGE_TEXT if len(text) >= PAGE_TEXT_MIN_CHARS else PAGE_IMAGE
+        return self._page_kinds[i]
+
+    def page_map(self) -> dict[int, str]:
+        """{page number (1-based): PAGE_TEXT | PAGE_IMAGE} for every page."""
+        return {i + 1: self.page_kind(i) for i in range(self.page_count)}
+
+    def pages_of_kind(self, kind: str) -> list[int]:
+        """1-based numbers of the pages classified as ``kind``."""
+        return [n for n, k in self.page_map().items() if k == kind]
+
+    def text_of_pages(self, pages: list[int]) -> str:
+        """Text layer of the given 1-based pages, '--- Page N ---' formatted."""
+        text = ""
+        for n in pages:
+            page_text = self.page_text(n - 1)
+            if page_text.strip():
+                text += f"\n--- Page {n} ---\n{page_text}"
+        return text.strip()
+
+    def subset_pdf(self, pages: list[int]) -> bytes:
+        """A new PDF holding only the given 1-based pages, in that order."""
+        writer = PyPDF2.PdfWriter()
+        for n in pages:
+            writer.add_page(self.reader.pages[n - 1])
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    @property
+    def is_scanned(self) -> bool:
+        """True when the PDF has (almost) no extractable text.
+
+        Stops as soon as SCANNED_TEXT_THRESHOLD characters are found, looking
+        at a spread of sample pages first; pages without fonts are skipped
+        without extracting text.
+        """
+        if self._scanned is None:
+            if self._text is not None:
+                self._scanned = _too_little_text(self._text)
+            else:
+                self._scanned = not self._has_text(_sample_order(self.page_count))
+        return self._scanned
+
+    def _has_text(self, pages) -> bool:
+        found = []
+        for i in pages:
+            if i not in self._page_texts and not self.page_signals(i)[0]:
+                self._page_texts[i] = ""
+                continue
+            if self.page_text(i).strip():
+                # Measure the exact string self.text would hold for these pages,
+                # so early exit and the full-text path always agree
+                found.append(i + 1)
+                if not _too_little_text(self.text_of_pages(sorted(found))):
+                    return True
+        return False
+
+    def page_size_pt(self, i: int) -> tuple[float, float]:
+        """(width, height) of page ``i`` in PDF points."""
+        box = self.reader.pages[i].mediabox
+        return float(box.width), float(box.height)
+
+    def iter_images(self, dpi: int = 200, first_page: int = 1, last_page: int | None = None,
+                    memory_budget_mb: int | None = None):
+        """Yield (page number, PIL image) for pages first_page..last_page, streaming.
+
+        See ``iter_page_images``; page sizes come from the already parsed reader.
+        """
+        last_page = min(last_page or self.page_count, self.page_count)
+        sizes = {n: self.page_size_pt(n - 1) for n in range(first_page, last_page + 1)}
+        yield from iter_page_images(self.pdf_bytes, dpi, first_page, last_page,
+                                    memory_budget_mb, page_sizes=sizes)
+
+    def base64_images(self, max_pages: int = 10, dpi: int = 200) -> list[str]:
+        """Rendered pages as base64 PNGs; [] without pdf2image.
+
+        Pages are encoded as they are rendered, so only the compressed PNGs
+        are kept — never the full set of page bitmaps.
+        """
+        key = (max_pages, dpi)
+        if key not in self._b64_images:
+            result = []
+            if HAS_OCR:
+                for _, img in self.iter_images(dpi, last_page=max_pages):
+                    buf = io.BytesIO()
+                    img.save(buf, format="PNG")
+                    result.append(base64.b64encode(buf.getvalue()).decode("utf-8"))
+                    img.close()
+            self._b64_images[key] = result
+        return self._b64_images[key]
+
+    def vision_images(self, max_pages: int = 10, profile: str = "balanced",
+                      pages: list[int] | None = None) -> tuple[list[str], list[str], dict]:
+        """Pages encoded for a vision model per VISION_PROFILES: (base64 images, MIME types, stats).
+
+        Each page gets the DPI that just covers the profile's target size for
+        its dimensions, then is downsampled, optionally converted to grayscale
+        and encoded. ``stats`` reports the payload and the bytes saved against
+        lossless PNG of the same pages. ``pages`` (1-based) restricts the
+        output to those pages, e.g. only the image pages of a mixed PDF.
+        """
+        key = (max_pages, profile, tuple(pages) if pages else None)
+        if key not in self._vision_images:
+            spec = VISION_PROFILES.get(profile)
+            if spec is None:
+                raise ValueError(f"Unknown image profile '{profile}'. Available: {list(VISION_PROFILES)}")
+            fmt = spec["format"]
+            if fmt == "WEBP" and not _HAS_WEBP:
+                fmt = "JPEG"
+            start = time.perf_counter()
+            wanted = (pages or list(range(1, self.page_count + 1)))[:max_pages]
+            images, mime_types, pages = [], [], []
+            if HAS_OCR and wanted:
+                dpis = {n: _vision_dpi(self.page_size_pt(n - 1), spec) for n in wanted}
+                i = 0
+                while i < len(wanted):
+                    # Render runs of consecutive pages that share a DPI in one streaming pass
+                    n = end = wanted[i]
+                    while i + 1 < len(wanted) and wanted[i + 1] == end + 1 and dpis[end + 1] == dpis[n]:
+                        i += 1
+                        end += 1
+                    i += 1
+                    for page, img in self.iter_images(dpis[n], first_page=n, last_page=end):
+                        data, used, png_bytes, size = _encode_vision_image(img, spec, fmt)
+                        img.close()
+                        images.append(base64.b64encode(data).decode("utf-8"))
+                        mime_types.append(VISION_MIME_TYPES[used])
+                        pages.append({"page": page, "dpi": dpis[n], "width": size[0], "height": size[1],
+                                      "format": used, "bytes": len(data), "png_bytes": png_bytes})
+            encoded = sum(p["bytes"] for p in pages)
+            png_total = sum(p["png_bytes"] for p in pages)
+            stats = {"profile": profile, "pages": pages,
+                     "encoded_bytes": encoded, "payload_bytes": sum(len(b) for b in images),
+                     "png_bytes": png_total, "bytes_saved": png_total - encoded,
+                     "encode_ms": int((time.perf_counter() - start) * 1000)}
+            if pages:
+                logger.info(f"Vision images ({profile}): {len(pages)} pages, {encoded} bytes "
+                            f"vs {png_total} as PNG ({stats['bytes_saved']} saved)")
+            self._vision_images[key] = (images, mime_types, stats)
+        return self._vision_images[key]
+
+    def ocr_pages(self, dpi: int = 300, workers: int | None = None) -> list[dict]:
+        """Per-page OCR results in page order: {page, text, raster_ms, ocr_ms}.
+
+        Pages are rasterized and OCR'd one at a time — in parallel across the
+        OCR process pool when ``workers`` (default: OCR_WORKERS) allows it,
+        else streamed through ``iter_images`` within the memory budget.
+        """
+        if not HAS_OCR:
+            raise RuntimeError("pytesseract and pdf2image are required for OCR. pip install pytesseract pdf2image")
+        if dpi not in self._ocr_pages:
+            start = time.perf_counter()
+            pages = list(range(1, self.page_count + 1))
+            workers = _ocr_workers() if workers is None else workers
+            results = None
+            if workers > 1 and len(pages) > 1:
+                try:
+                    pool = _get_ocr_pool(workers)
+                    futures = [pool.submit(_ocr_page, self.pdf_bytes, n, dpi) for n in pages]
+                    results = [f.result() for f in futures]
+                except BrokenProcessPool as e:
+                    logger.warning(f"OCR pool failed ({e}) — falling back to sequential OCR")
+                    _reset_ocr_pool()
+                    workers = 1
+            if results is None:
+                results = []
+                t0 = time.perf_counter()
+                for n, img in self.iter_images(dpi):
+                    t1 = time.perf_counter()
+                    text = pytesseract.image_to_string(img)
+                    img.close()
+                    t2 = time.perf_counter()
+                    results.append({"page": n, "text": text or "",
+                                    "raster_ms": int((t1 - t0) * 1000), "ocr_ms": int((t2 - t1) * 1000)})
+                    t0 = time.perf_counter()
+            elapsed = int((time.perf_counter() - start) * 1000)
+            busy = sum(r["raster_ms"] + r["ocr_ms"] for r in results)
+            logger.info(f"OCR: {len(results)} pages at {dpi} DPI in {elapsed}ms "
+                        f"({busy}ms of page work, {min(workers, len(pages)) or 1} worker(s))")
+            self._ocr_pages[dpi] = results
+        return self._ocr_pages[dpi]
+
+    def ocr_text(self, dpi: int = 300, workers: int | None = None) -> str:
+        """Tesseract OCR of every page, each prefixed with '--- Page N ---'."""
+        text = ""
+        for page in self.ocr_pages(dpi, workers):
+            if page["text"] and page["text"].strip():
+                text += f"\n--- Page {page['page']} ---\n{page['text']}"
+        return text.strip()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  STREAMING RASTERIZER
+# ══════════════════════════════════════════════════════════════════════════════
+#
+# convert_from_bytes() on a whole document returns every page as a bitmap at
+# once — a 30-page scan at 300 DPI is over a gigabyte of RGB. Instead pages
+# are rendered in first_page/last_page batches sized so the batch's estimated
+# bitmap bytes stay under PDF_RASTER_MEMORY_MB, and handed out one at a time.
+
+def _raster_bytes(size_pt: tuple[float, float], dpi: int) -> int:
+    """Estimated RGB bitmap size of a page rendered at ``dpi``."""
+    width, height = size_pt
+    return int(width / 72 * dpi) * int(height / 72 * dpi) * 3
+
+
+def iter_page_images(pdf_bytes: bytes, dpi: int = 200, first_page: int = 1,
+                     last_page: int | None = None, memory_budget_mb: int | None = None,
+                     page_sizes: dict[int, tuple[float, float]] | None = None):
+    """Yield (page number, PIL image) one page at a time, 1-based and in order.
+
+    Consecutive pages are rendered together while their estimated bitmaps fit
+    in ``memory_budget_mb`` (default: PDF_RASTER_MEMORY_MB); a page larger than
+    the budget is rendered on its own. Close or drop each image before asking
+    for the next one to keep the peak at one batch.
+    """
+    if not HAS_OCR:
+        raise RuntimeError("pdf2image is required to render PDF pages. pip install pdf2image")
+    if page_sizes is None:
+        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        last_page = min(last_page or len(reader.pages), len(reader.pages))
+        page_sizes = {n: (float(reader.pages[n - 1].mediabox.width), float(reader.pages[n - 1].mediabox.height))
+                      for n in range(first_page, last_page + 1)}
+    else:
+        last_page = last_page or max(page_sizes)
+    budget = (memory_budget_mb or get_settings().pdf_raster_memory_mb) * 1024 * 1024
+
+    n = first_page
+    while n <= last_page:
+        end, used = n, _raster_bytes(page_sizes[n], dpi)
+        while end < last_page and used + _raster_bytes(page_sizes[end + 1], dpi) <= budget:
+            end += 1
+            used += _raster_bytes(page_sizes[end], dpi)
+        batch = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=n, last_page=end)
+        batch.reverse()
+        for page in range(n, n + len(batch)):
+            yield page, batch.pop()
+        n = end + 1
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  VISION IMAGE ENCODING
+# ══════════════════════════════════════════════════════════════════════════════
+
+try:
+    from PIL import Image, features
+    _HAS_WEBP = features.check("webp")
+except ImportError:
+    _HAS_WEBP = False
+
+
+def _vision_dpi(size_pt: tuple[float, float], spec: dict) -> int:
+    """Lowest DPI at which the page still covers the profile's target size."""
+    if spec["dpi"]:
+        return spec["dpi"]
+    short_in, long_in = min(size_pt) / 72, max(size_pt) / 72
+    dpi = min(spec["short_px"] / short_in, spec["long_px"] / long_in)
+    return max(VISION_MIN_DPI, min(VISION_MAX_DPI, math.ceil(dpi)))
+
+
+def _encode_vision_image(img, spec: dict, fmt: str) -> tuple[bytes, str, int, tuple[int, int]]:
+    """Downsample/convert/encode one page: (data, format used, lossless PNG size, final size).
+
+    Lossy profiles also try PNG of the downsampled page and keep whichever is
+    smaller — clean digital pages compress better losslessly than as JPEG.
+    """
+    if spec["short_px"]:
+        w, h = img.size
+        box = (spec["short_px"], spec["long_px"]) if w <= h else (spec["long_px"], spec["short_px"])
+        img.thumbnail(box, Image.LANCZOS)
+    if spec["grayscale"]:
+        img = img.convert("L")
+    elif img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    png = io.BytesIO()
+    img.save(png, format="PNG")
+    if fmt == "PNG":
+        return png.getvalue(), fmt, png.tell(), img.size
+    buf = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=spec["quality"], method=4)
+    else:
+        img.save(buf, format="JPEG", quality=spec["quality"], optimize=True)
+    if png.tell() <= buf.tell():
+        return png.getvalue(), "PNG", png.tell(), img.size
+    return buf.getvalue(), fmt, png.tell(), img.size
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  PARALLEL OCR
+# ══════════════════════════════════════════════════════════════════════════════
+#
+# Tesseract is CPU-bound and single-threaded per page, so pages are farmed out
+# to a process pool. Each task rasterizes just its own page, so no worker holds
+# more than one page image. The pool is created on first use and reused.
+
+_ocr_pool: ProcessPoolExecutor | None = None
+_ocr_pool_size = 0
+_ocr_pool_lock = threading.Lock()
+
+
+def _ocr_workers() -> int:
+    """OCR_WORKERS, or one per CPU (max 4) when unset/0."""
+    configured = get_settings().ocr_workers
+    return configured if configured > 0 else min(4, os.cpu_count() or 1)
+
+
+def _get_ocr_pool(workers: int) -> ProcessPoolExecutor:
+    global _ocr_pool, _ocr_pool_size
+    with _ocr_pool_lock:
+        if _ocr_pool is None or _ocr_pool_size != workers:
+            if _ocr_pool is not None:
+                _ocr_pool.shutdown(wait=False)
+            # spawn: the API process is multi-threaded, forking it is unsafe
+            _ocr_pool = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+            _ocr_pool_size = workers
+        return _ocr_pool
+
+
+def _reset_ocr_pool(wait: bool = False):
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=wait, cancel_futures=True)
+        _ocr_pool = None
+
+
+def warm_ocr_pool() -> int:
+    """Start the OCR workers ahead of the first scanned PDF. Returns the pool size."""
+    if not HAS_OCR:
+        return 0
+    workers = _ocr_workers()
+    if workers > 1:
+        pool = _get_ocr_pool(workers)
+        for f in [pool.submit(os.getpid) for _ in range(workers)]:
+            f.result()
+    return workers
+
+
+def shutdown_ocr_pool():
+    """Stop the OCR workers (app shutdown)."""
+    _reset_ocr_pool(wait=True)
+
+
+def _ocr_page(pdf_bytes: bytes, page_number: int, dpi: int) -> dict:
+    """Rasterize and OCR one page (1-based). Runs in an OCR pool worker."""
+    t0 = time.perf_counter()
+    images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=page_number, last_page=page_number)
+    t1 = time.perf_counter()
+    text = pytesseract.image_to_string(images[0]) if images else ""
+    t2 = time.perf_counter()
+    return {"page": page_number, "text": text or "",
+            "raster_ms": int((t1 - t0) * 1000), "ocr_ms": int((t2 - t1) * 1000)}
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  FUNCTIONAL API (one-shot helpers over PdfDocument)
+# ══════════════════════════════════════════════════════════════════════════════
 
 def extract_text_pypdf2(pdf_bytes: bytes) -> str:
     """Extract text from a text-based PDF using PyPDF2."""
-    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-    text = ""
-    for i, page in enumerate(reader.pages):
-        page_text = page.extract_text()
-        if page_text and page_text.strip():
-            text += f"\n--- Page {i+1} ---\n{page_text}"
-    return text.strip()
+    return PdfDocument(pdf_bytes).text
 
 
-def extract_text_ocr(pdf_bytes: bytes, dpi: int = 300) -> str:
-    """Extract text from a scanned PDF using Tesseract OCR."""
-    if not HAS_OCR:
-        raise RuntimeError("pytesseract and pdf2image are required for OCR. pip install pytesseract pdf2image")
-    images = convert_from_bytes(pdf_bytes, dpi=dpi)
-    text = ""
-    for i, img in enumerate(images):
-        page_text = pytesseract.image_to_string(img)
-        if page_text and page_text.strip():
-            text += f"\n--- Page {i+1} ---\n{page_text}"
-    return text.strip()
+def extract_text_ocr(pdf_bytes: bytes, dpi: int = 300, workers: int | None = None) -> str:
+    """Extract text from a scanned PDF using Tesseract OCR (pages in parallel)."""
+    return PdfDocument(pdf_bytes).ocr_text(dpi, workers)
 
 
 def pdf_to_base64_images(pdf_bytes: bytes, max_pages: int = 10, dpi: int = 200) -> list[str]:
     """Convert PDF pages to base64 PNG images."""
-    if not HAS_OCR:
-        return []
-    images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=1, last_page=max_pages)
-    result = []
-    for img in images:
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        result.append(base64.b64encode(buf.getvalue()).decode("utf-8"))
-    return result
+    return PdfDocument(pdf_bytes).base64_images(max_pages, dpi)
+
+
+def is_scanned_pdf(pdf_bytes: bytes, max_pages: int | None = None) -> bool:
+    """Check if a PDF is scanned (no extractable text).
+
+    With ``max_pages`` only that many evenly spread pages are inspected.
+    """
+    doc = PdfDocument(pdf_bytes)
+    if max_pages is None:
+        return doc.is_scanned
+    return not doc._has_text(_sample_order(doc.page_count, max_pages)[:max_pages])
 
 
-def is_scanned_pdf(pdf_bytes: bytes) -> bool:
-    """Check if a PDF is scanned (no extractable text)."""
-    text = extract_text_pypdf2(pdf_bytes)
-    return len(text.strip()) < 50
+def classify_pdf_pages(pdf_bytes: bytes) -> dict[int, str]:
+    """Per-page map {page number: "text" | "image"}."""
+    return PdfDocument(pdf_bytes).page_map()
 
 
 def get_pdf_page_count(pdf_bytes: bytes) -> int:
     """Get the number of pages in a PDF."""
-    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-    return len(reader.pages)
+    return PdfDocument(pdf_bytes).page_count
@@ -3,16 +3,33 @@ UN/LOCODE Port Lookup — local database of 116K+ locations worldwide.
 
 CSV Format (no header): Change,Country,Location,Name,NameWoDiacritics,Subdivision,Function,Status,Date,IATA,Coordinates,Remarks
 
+Rows are held column-wise (UTF-8 string blobs, float arrays, a function
+bitmask per row) rather than as one dict per location; dicts are only built
+for the records a caller actually receives.
+
 Usage:
-    from utils.unlocode import search_port, get_port_by_code
+    from utils.unlocode import search_port, fuzzy_search_port, nearest_ports, get_port_by_code, get_ports_by_codes
     results = search_port("Tripoli")
+    close = fuzzy_search_port("MISURTA", country_code="LY")
+    near = nearest_ports(32.38, 15.09, k=3)
     port = get_port_by_code("LY", "TIP")
+    ports = get_ports_by_codes(["LYTIP", "ITGOA", "LY MRA"])
 """
 
 from __future__ import annotations
 import csv
 import os
+import sys
+import json
+import mmap
+import struct
+import math
+import hashlib
 import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
 from typing import Optional
 from functools import lru_cache
 
@@ -45,8 +62,540 @@ FUNCTION_LABELS = {
     6: "Fixed Transport",
     7: "Border Crossing",
 }
+PORT_FLAG = 1 << 0
+AIRPORT_FLAG = 1 << 3
+
+_ports_cache: "_PortTable | None" = None
+_index: "_PortIndex | None" = None
+_ports_source: str = ""         # "snapshot" | "csv" | ""
+_load_lock = threading.Lock()   # warm-up thread and first requests may race to load
+
+# Country partitions up to this size are scanned directly — cheaper than
+# walking the global name indexes and filtering the hits afterwards.
+COUNTRY_SCAN_THRESHOLD = 2000
+NGRAM = 3
+NO_NAME = -1
+FUZZY_MIN_LENGTH = 4
+
+# Spatial grid: rows with coordinates are bucketed into GRID_DEG° cells
+GRID_DEG = 0.5
+GRID_ROWS = int(180 / GRID_DEG)
+GRID_COLS = int(360 / GRID_DEG)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  COLUMN STORAGE
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _array_bytes(a) -> int:
+    return len(a) * a.itemsize
+
+
+class _StringColumn:
+    """Strings stored as one UTF-8 blob plus an array of end offsets."""
+
+    __slots__ = ("blob", "ends", "_parts", "_size")
+
+    def __init__(self):
+        self.blob = b""
+        self.ends = array("I")
+        self._parts: list[bytes] = []
+        self._size = 0
+
+    def append(self, value: str):
+        raw = value.encode("utf-8")
+        self._parts.append(raw)
+        self._size += len(raw)
+        self.ends.append(self._size)
+
+    def freeze(self):
+        self.blob = b"".join(self._parts)
+        self._parts = []
+
+    @classmethod
+    def from_buffers(cls, blob, ends) -> "_StringColumn":
+        """Wrap existing buffers (e.g. memoryviews over a mapped snapshot)."""
+        col = cls()
+        col.blob, col.ends = blob, ends
+        return col
+
+    @classmethod
+    def from_strings(cls, values) -> "_StringColumn":
+        col = cls()
+        for v in values:
+            col.append(v)
+        col.freeze()
+        return col
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def __getitem__(self, i: int) -> str:
+        start = self.ends[i - 1] if i else 0
+        return str(self.blob[start:self.ends[i]], "utf-8")
+
+    def nbytes(self) -> int:
+        return len(self.blob) + _array_bytes(self.ends)
+
+
+class _PortTable:
+    """Column store for UN/LOCODE rows; ``record(row)`` rebuilds the public dict.
+
+    Country codes are interned into ``countries`` and referenced by a small
+    integer, the eight function flags are a bitmask byte, and missing
+    coordinates are NaN in the float arrays.
+    """
+
+    __slots__ = ("countries", "country", "location_code", "name", "name_ascii",
+                 "subdivision", "functions", "status", "coordinates", "lat", "lon",
+                 "iata", "_country_ids")
+
+    STRING_COLUMNS = ("location_code", "name", "name_ascii", "subdivision",
+                      "status", "coordinates", "iata")
+
+    def __init__(self):
+        self.countries: list[str] = []
+        self._country_ids: dict[str, int] = {}
+        self.country = array("H")
+        self.functions = array("B")
+        self.lat = array("d")
+        self.lon = array("d")
+        for col in self.STRING_COLUMNS:
+            setattr(self, col, _StringColumn())
+
+    def append(self, country: str, location_code: str, name: str, name_ascii: str,
+               subdivision: str, functions: int, status: str, coordinates: str,
+               lat: float | None, lon: float | None, iata: str):
+        cid = self._country_ids.get(country)
+        if cid is None:
+            cid = self._country_ids[country] = len(self.countries)
+            self.countries.append(country)
+        self.country.append(cid)
+        self.location_code.append(location_code)
+        self.name.append(name)
+        # Only kept when it differs from the name — most rows are plain ASCII
+        self.name_ascii.append(name_ascii if name_ascii != name else "")
+        self.subdivision.append(subdivision)
+        self.functions.append(functions)
+        self.status.append(status)
+        self.coordinates.append(coordinates)
+        self.lat.append(float("nan") if lat is None else lat)
+        self.lon.append(float("nan") if lon is None else lon)
+        self.iata.append(iata)
+
+    def freeze(self):
+        for col in self.STRING_COLUMNS:
+            getattr(self, col).freeze()
+
+    def columns(self) -> dict:
+        """Flat buffers for the binary snapshot, keyed by section name."""
+        cols = {"country": self.country, "functions": self.functions, "lat": self.lat, "lon": self.lon}
+        for col in self.STRING_COLUMNS:
+            cols[f"{col}.blob"] = getattr(self, col).blob
+            cols[f"{col}.ends"] = getattr(self, col).ends
+        return cols
+
+    @classmethod
+    def from_columns(cls, countries: list[str], cols: dict) -> "_PortTable":
+        table = cls.__new__(cls)
+        table.countries = list(countries)
+        table._country_ids = {c: i for i, c in enumerate(table.countries)}
+        for col in ("country", "functions", "lat", "lon"):
+            setattr(table, col, cols[col])
+        for col in cls.STRING_COLUMNS:
+            setattr(table, col, _StringColumn.from_buffers(cols[f"{col}.blob"], cols[f"{col}.ends"]))
+        return table
+
+    def __len__(self) -> int:
+        return len(self.country)
+
+    def country_id(self, country_code: str) -> int | None:
+        return self._country_ids.get(country_code)
+
+    def country_code(self, row: int) -> str:
+        return self.countries[self.country[row]]
+
+    def locode(self, row: int) -> str:
+        return self.countries[self.country[row]] + self.location_code[row]
+
+    def is_port(self, row: int) -> bool:
+        return bool(self.functions[row] & PORT_FLAG)
+
+    def record(self, row: int) -> dict:
+        """Materialize one row as the location dict returned by the public API."""
+        country = self.countries[self.country[row]]
+        location_code = self.location_code[row]
+        name = self.name[row]
+        mask = self.functions[row]
+        lat, lon = self.lat[row], self.lon[row]
+        return {
+            "country_code": country,
+            "location_code": location_code,
+            "locode": f"{country}{location_code}",
+            "name": name,
+            "name_ascii": self.name_ascii[row] or name,
+            "subdivision": self.subdivision[row],
+            "functions": [label for i, label in FUNCTION_LABELS.items() if mask & (1 << i)],
+            "is_port": bool(mask & PORT_FLAG),
+            "is_airport": bool(mask & AIRPORT_FLAG),
+            "status": self.status[row],
+            "coordinates": self.coordinates[row],
+            "lat": None if lat != lat else lat,
+            "lon": None if lon != lon else lon,
+            "iata": self.iata[row],
+        }
+
+    def nbytes(self) -> int:
+        total = sum(getattr(self, col).nbytes() for col in self.STRING_COLUMNS)
+        total += sum(_array_bytes(a) for a in (self.country, self.functions, self.lat, self.lon))
+        return total + sum(sys.getsizeof(c) for c in self.countries)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  SEARCH INDEX
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance (adjacent swaps cost 1), capped at ``limit + 1``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        ca = a[i - 1]
+        row_min = i
+        for j in range(1, len(b) + 1):
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+def _name_distance(q: str, name: str, limit: int) -> int:
+    """Edit distance to a name or either half of "Bingazi (Benghazi)"-style names."""
+    d = _edit_distance(q, name, limit)
+    if d and "(" in name:
+        head, _, alias = name.partition("(")
+        d = min(d, _edit_distance(q, head.strip(), limit), _edit_distance(q, alias.strip(" )"), limit))
+    return d
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    h = math.sin((p2 - p1) / 2) ** 2 + \
+        math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _grid_cell(lat: float, lon: float) -> tuple[int, int]:
+    i = min(int((lat + 90) / GRID_DEG), GRID_ROWS - 1)
+    j = int((lon + 180) / GRID_DEG) % GRID_COLS
+    return i, j
+
+
+def _ring_bound_km(lat: float, r: int) -> float:
+    """Lower bound on the distance to any point outside the (2r+1)² cells around ``lat``.
+
+    Such a point is at least ``r`` cells away in latitude, or ``r`` cells away
+    in longitude while within ``r + 1`` cells in latitude (until the ring has
+    wrapped all the way round in longitude).
+    """
+    deg = r * GRID_DEG
+    by_lat = deg * KM_PER_DEG
+    if deg >= 180 or 2 * r + 1 >= GRID_COLS:
+        return by_lat
+    cos_max = math.cos(math.radians(min(90.0, abs(lat) + deg + GRID_DEG)))
+    by_lon = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, cos_max * math.sin(math.radians(deg) / 2)))
+    return min(by_lat, by_lon)
+
+
+def _csr(groups: list[list[int]]) -> tuple[array, array]:
+    """Flatten a list of id lists into (starts, ids) arrays."""
+    starts, ids = array("I", [0]), array("I")
+    for group in groups:
+        ids.extend(group)
+        starts.append(len(ids))
+    return starts, ids
+
+
+class _PortIndex:
+    """Prebuilt lookup structures over the port table.
+
+    Names are lowercased once and deduplicated: every distinct name gets a
+    name id, and rows point at their name ids (``name`` and ``name_ascii``
+    collapse into one id when they are equal). Id lists are stored as flat
+    arrays with start offsets rather than Python lists of ints.
+
+      - sorted_ids:  name ids sorted by name, bisected for exact + starts-with
+      - ngrams:      trigram → postings slot (inverted index for contains)
+      - country:     country id → row ids
+      - locode_order / lcode_order: row ids sorted by LOCODE / location code
+      - grid:        GRID_DEG° lat/lon cell → rows with coordinates in it
+    """
+
+    ARRAYS = ("row_name_a", "row_name_b", "name_row_starts", "name_row_ids", "sorted_ids",
+              "gram_starts", "gram_ids", "country_starts", "country_rows",
+              "locode_order", "lcode_order", "grid_starts", "grid_rows")
+
+    def __init__(self, table: _PortTable):
+        self.table = table
+        self.names: list[str] = []
+        exact: dict[str, int] = {}
+        name_rows: list[list[int]] = []
+        self.row_name_a = array("I")
+        self.row_name_b = array("i")
+
+        for row in range(len(table)):
+            name = table.name[row]
+            ids = []
+            for raw in (table.name_ascii[row] or name, name):
+                key = raw.lower()
+                nid = exact.get(key)
+                if nid is None:
+                    nid = exact[key] = len(self.names)
+                    self.names.append(key)
+                    name_rows.append([])
+                if nid not in ids:
+                    ids.append(nid)
+                    name_rows[nid].append(row)
+            self.row_name_a.append(ids[0])
+            self.row_name_b.append(ids[1] if len(ids) > 1 else NO_NAME)
+        self.name_row_starts, self.name_row_ids = _csr(name_rows)
+        self.sorted_ids = array("I", sorted(range(len(self.names)), key=self.names.__getitem__))
+
+        grams: dict[str, list[int]] = {}
+        for nid, name in enumerate(self.names):
+            for gram in {name[i:i + NGRAM] for i in range(len(name) - NGRAM + 1)}:
+                grams.setdefault(gram, []).append(nid)
+        self.ngrams = {gram: slot for slot, gram in enumerate(grams)}
+        self.gram_starts, self.gram_ids = _csr(list(grams.values()))
+
+        by_country: list[list[int]] = [[] for _ in table.countries]
+        for row, cid in enumerate(table.country):
+            by_country[cid].append(row)
+        self.country_starts, self.country_rows = _csr(by_country)
+
+        self.locode_order = array("I", sorted(range(len(table)), key=table.locode))
+        self.lcode_order = array("I", sorted(range(len(table)), key=table.location_code.__getitem__))
+
+        # Rows sorted by cell id, with one start offset per cell (GRID_ROWS × GRID_COLS)
+        cells = sorted((i * GRID_COLS + j, row) for row, (lat, lon) in enumerate(zip(table.lat, table.lon))
+                       if lat == lat and lon == lon
+                       for i, j in (_grid_cell(lat, lon),))
+        self.grid_rows = array("I", (row for _, row in cells))
+        self.grid_starts = array("I", [0]) * (GRID_ROWS * GRID_COLS + 1)
+        for cell, _ in cells:
+            self.grid_starts[cell + 1] += 1
+        for cell in range(GRID_ROWS * GRID_COLS):
+            self.grid_starts[cell + 1] += self.grid_starts[cell]
+
+    def columns(self) -> dict:
+        """Flat buffers for the binary snapshot, keyed by section name."""
+        cols = {name: getattr(self, name) for name in self.ARRAYS}
+        # ngrams preserves slot order, so the key column position is the slot
+        for name, values in (("names", self.names), ("grams", self.ngrams)):
+            col = _StringColumn.from_strings(values)
+            cols[f"{name}.blob"], cols[f"{name}.ends"] = col.blob, col.ends
+        return cols
+
+    @classmethod
+    def from_columns(cls, table: _PortTable, cols: dict) -> "_PortIndex":
+        index = cls.__new__(cls)
+        index.table = table
+        for name in cls.ARRAYS:
+            setattr(index, name, cols[name])
+        names = _StringColumn.from_buffers(cols["names.blob"], cols["names.ends"])
+        grams = _StringColumn.from_buffers(cols["grams.blob"], cols["grams.ends"])
+        index.names = [names[i] for i in range(len(names))]
+        index.ngrams = {grams[i]: i for i in range(len(grams))}
+        return index
+
+    # ── id-list accessors ──
+
+    def rows_of(self, nid: int) -> array:
+        return self.name_row_ids[self.name_row_starts[nid]:self.name_row_starts[nid + 1]]
+
+    def country_partition(self, country_code: str) -> array | None:
+        cid = self.table.country_id(country_code)
+        if cid is None:
+            return None
+        return self.country_rows[self.country_starts[cid]:self.country_starts[cid + 1]]
+
+    def _postings(self, gram: str) -> array:
+        slot = self.ngrams.get(gram)
+        if slot is None:
+            return array("I")
+        return self.gram_ids[self.gram_starts[slot]:self.gram_starts[slot + 1]]
+
+    def rows_by_locode(self, code: str) -> array:
+        """Rows whose LOCODE equals ``code``, in file order."""
+        order, key = self.locode_order, self.table.locode
+        lo = bisect_left(order, code, key=key)
+        return order[lo:bisect_right(order, code, lo, key=key)]
+
+    def rows_by_code(self, code: str) -> list[int]:
+        """Rows matching ``code`` as either a full LOCODE or a bare location code."""
+        order, key = self.lcode_order, self.table.location_code.__getitem__
+        lo = bisect_left(order, code, key=key)
+        rows = set(order[lo:bisect_right(order, code, lo, key=key)])
+        rows.update(self.rows_by_locode(code))
+        return sorted(rows)
+
+    # ── name matching ──
+
+    def _prefix_ids(self, q: str):
+        """Name ids whose name starts with ``q`` (includes the exact match)."""
+        names, order = self.names, self.sorted_ids
+        i = bisect_left(order, q, key=names.__getitem__)
+        while i < len(order) and names[order[i]].startswith(q):
+            yield order[i]
+            i += 1
+
+    def _exact_id(self, q: str) -> int | None:
+        i = bisect_left(self.sorted_ids, q, key=self.names.__getitem__)
+        if i < len(self.sorted_ids) and self.names[self.sorted_ids[i]] == q:
+            return self.sorted_ids[i]
+        return None
+
+    def _contains_ids(self, q: str):
+        """Name ids whose name contains ``q`` — trigram intersection + verify."""
+        if len(q) < NGRAM:
+            return (nid for nid, name in enumerate(self.names) if q in name)
+        grams = {q[i:i + NGRAM] for i in range(len(q) - NGRAM + 1)}
+        postings = sorted((self._postings(g) for g in grams), key=len)
+        if not postings[0]:
+            return iter(())
+        candidates = set(postings[0])
+        for plist in postings[1:]:
+            candidates.intersection_update(plist)
+            if not candidates:
+                break
+        return (nid for nid in candidates if q in self.names[nid])
+
+    def score_rows(self, q: str) -> dict[int, int]:
+        """Score every matching row: 100 exact, 80 starts-with, 60 contains."""
+        scores: dict[int, int] = {}
+        for nid in self._contains_ids(q):
+            for row in self.rows_of(nid):
+                scores[row] = 60
+        for nid in self._prefix_ids(q):
+            for row in self.rows_of(nid):
+                scores[row] = 80
+        nid = self._exact_id(q)
+        if nid is not None:
+            for row in self.rows_of(nid):
+                scores[row] = 100
+        return scores
+
+    def score_partition(self, q: str, rows) -> dict[int, int]:
+        """Same scoring as ``score_rows`` restricted to ``rows`` (linear)."""
+        scores: dict[int, int] = {}
+        for row in rows:
+            best = 0
+            for nid in (self.row_name_a[row], self.row_name_b[row]):
+                if nid == NO_NAME:
+                    continue
+                name = self.names[nid]
+                if name == q:
+                    best = 100
+                    break
+                if name.startswith(q):
+                    best = 80
+                elif best < 60 and q in name:
+                    best = 60
+            if best:
+                scores[row] = best
+        return scores
+
+    def fuzzy_ids(self, q: str, max_distance: int) -> dict[int, int] | None:
+        """Name ids within ``max_distance`` edits of ``q`` → distance.
 
-_ports_cache: list[dict] | None = None
+        Candidates come from the trigram postings: an edit touches at most
+        NGRAM of the query's trigrams, so a name within ``d`` edits shares at
+        least ``len(grams) - NGRAM * d`` of them. Only those are verified with
+        the bounded edit distance. Returns None when the query is too short
+        for that bound to prune anything (the caller scans instead).
+        """
+        grams = {q[i:i + NGRAM] for i in range(len(q) - NGRAM + 1)}
+        need = len(grams) - NGRAM * max_distance
+        if need < 1:
+            return None
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings(gram))
+        found = {}
+        for nid, shared in counts.items():
+            if shared >= need:
+                d = _name_distance(q, self.names[nid], max_distance)
+                if d <= max_distance:
+                    found[nid] = d
+        return found
+
+    def fuzzy_scan(self, q: str, max_distance: int, rows) -> dict[int, int]:
+        """Same as ``fuzzy_ids`` by brute force over the names of ``rows``."""
+        found = {}
+        for row in rows:
+            for nid in (self.row_name_a[row], self.row_name_b[row]):
+                if nid != NO_NAME and nid not in found:
+                    d = _name_distance(q, self.names[nid], max_distance)
+                    if d <= max_distance:
+                        found[nid] = d
+        return found
+
+    # ── spatial ──
+
+    def _ring_rows(self, ci: int, cj: int, r: int):
+        """Rows in the cells exactly ``r`` cells away (Chebyshev) from cell (ci, cj)."""
+        cols = {(cj + dj) % GRID_COLS for dj in range(-r, r + 1)}
+        # Once the ring wraps all the way round, inner rows have no new columns
+        sides = {(cj - r) % GRID_COLS, (cj + r) % GRID_COLS} if 2 * r - 1 < GRID_COLS else set()
+        for i in range(max(0, ci - r), min(GRID_ROWS, ci + r + 1)):
+            for j in (cols if abs(i - ci) == r else sides):
+                cell = i * GRID_COLS + j
+                yield from self.grid_rows[self.grid_starts[cell]:self.grid_starts[cell + 1]]
+
+    def nearest_rows(self, lat: float, lon: float, k: int, ports_only: bool,
+                     max_km: float | None) -> list[tuple[float, int]]:
+        """(distance_km, row) of the ``k`` nearest rows, searching rings of cells outward."""
+        table = self.table
+        ci, cj = _grid_cell(lat, lon)
+        best: list[tuple[float, int]] = []
+        max_ring = max(GRID_ROWS, GRID_COLS // 2)
+        for r in range(max_ring + 1):
+            for row in self._ring_rows(ci, cj, r):
+                if ports_only and not table.functions[row] & PORT_FLAG:
+                    continue
+                km = _haversine_km(lat, lon, table.lat[row], table.lon[row])
+                if max_km is None or km <= max_km:
+                    best.append((km, row))
+            best.sort()
+            del best[k:]
+            # Nothing beyond this ring can be closer than the bound
+            bound = _ring_bound_km(lat, r)
+            if (len(best) >= k and bound >= best[-1][0]) or (max_km is not None and bound > max_km):
+                break
+        return best
+
+    def nbytes(self) -> int:
+        total = sum(_array_bytes(getattr(self, name)) for name in self.ARRAYS)
+        total += sys.getsizeof(self.names) + sum(sys.getsizeof(n) for n in self.names)
+        return total + sys.getsizeof(self.ngrams) + sum(sys.getsizeof(g) for g in self.ngrams)
+
+
+def _get_index() -> _PortIndex:
+    """Return the search index, building it together with the ports cache."""
+    if _index is None:
+        _load_ports()
+    return _index
 
 
 def _find_csv_files() -> list[str]:
@@ -79,19 +628,130 @@ def _find_csv_files() -> list[str]:
     return paths_to_check
 
 
-def _load_ports() -> list[dict]:
-    """Load all ports from UNLOCODE CSV files."""
-    global _ports_cache
-    if _ports_cache is not None:
-        return _ports_cache
+# ══════════════════════════════════════════════════════════════════════════════
+#  BINARY SNAPSHOT
+# ══════════════════════════════════════════════════════════════════════════════
+#
+# Layout: MAGIC | uint32 header length | JSON header | 8-byte aligned sections.
+# The header names each section with its buffer format, offset and size; the
+# sections are the raw bytes of the table/index arrays. Loading maps the file
+# read-only and casts memoryviews over it, so workers share the pages through
+# the OS page cache instead of each parsing the CSVs.
 
-    csv_files = _find_csv_files()
-    if not csv_files:
-        logger.warning("No UNLOCODE CSV files found. Port lookup will use Geoapify only.")
-        _ports_cache = []
-        return _ports_cache
+SNAPSHOT_MAGIC = b"ULOCSNAP"
+SNAPSHOT_VERSION = 2
+
+
+def _source_fingerprint(csv_files: list[str]) -> str:
+    """Hash of the CSV names, sizes and mtimes — changes whenever a file does."""
+    h = hashlib.sha256()
+    for path in csv_files:
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def _snapshot_path(csv_files: list[str]) -> str:
+    """Snapshot location: UNLOCODE_SNAPSHOT_PATH, else next to the first CSV."""
+    configured = get_settings().unlocode_snapshot_path
+    if configured:
+        return configured
+    return os.path.join(os.path.dirname(os.path.abspath(csv_files[0])),
+                        f"unlocode-v{SNAPSHOT_VERSION}.snapshot")
+
+
+def _write_snapshot(path: str, fingerprint: str, table: _PortTable, index: _PortIndex):
+    """Write the snapshot atomically (temp file + rename) so readers never see a partial file."""
+    sections, chunks, offset = {}, [], 0
+    for name, buf in {**table.columns(), **index.columns()}.items():
+        view = memoryview(buf)
+        pad = -offset % 8
+        chunks.append(b"\0" * pad)
+        offset += pad
+        sections[name] = [view.format, offset, view.nbytes]
+        chunks.append(view.cast("B") if view.nbytes else b"")
+        offset += view.nbytes
 
-    ports = []
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION, "byteorder": sys.byteorder, "ngram": NGRAM,
+        "source": fingerprint, "countries": table.countries, "sections": sections,
+    }).encode("utf-8")
+    preamble = SNAPSHOT_MAGIC + struct.pack("<I", len(header)) + header
+    preamble += b"\0" * (-len(preamble) % 8)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(preamble)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+        logger.info(f"Wrote UNLOCODE snapshot: {path} ({len(preamble) + offset} bytes)")
+    except OSError as e:
+        logger.warning(f"Could not write UNLOCODE snapshot {path}: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _read_snapshot(path: str, fingerprint: str) -> tuple[_PortTable, _PortIndex] | None:
+    """Map a snapshot built from the current CSVs; None if missing, stale or corrupt."""
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    views: list[memoryview] = []
+    try:
+        if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("bad magic")
+        (header_len,) = struct.unpack_from("<I", mm, len(SNAPSHOT_MAGIC))
+        start = len(SNAPSHOT_MAGIC) + 4
+        header = json.loads(mm[start:start + header_len])
+        if (header.get("version"), header.get("byteorder"), header.get("ngram"), header.get("source")) != \
+                (SNAPSHOT_VERSION, sys.byteorder, NGRAM, fingerprint):
+            logger.info(f"UNLOCODE snapshot {path} is stale — rebuilding from CSV")
+            _close_snapshot(mm, views)
+            return None
+
+        base = start + header_len
+        base += -base % 8
+        end = max((off + size for _, off, size in header["sections"].values()), default=0)
+        if len(mm) < base + end:
+            raise ValueError("truncated file")
+        view = memoryview(mm)
+        views.append(view)
+        cols = {}
+        for name, (fmt, off, size) in header["sections"].items():
+            cols[name] = view[base + off:base + off + size].cast(fmt)
+            views.append(cols[name])
+        table = _PortTable.from_columns(header["countries"], cols)
+        return table, _PortIndex.from_columns(table, cols)
+    except (ValueError, KeyError, TypeError, struct.error) as e:
+        logger.warning(f"Ignoring unreadable UNLOCODE snapshot {path}: {e}")
+        _close_snapshot(mm, views)
+        return None
+    except BaseException:
+        _close_snapshot(mm, views)
+        raise
+
+
+def _close_snapshot(mm: mmap.mmap, views: list[memoryview]):
+    """Unmap a rejected snapshot, releasing the column views over it first."""
+    try:
+        for view in reversed(views):
+            view.release()
+        mm.close()
+    except BufferError:
+        # A view escaped into a half-built table — the mapping goes with it at GC
+        pass
+
+
+def _parse_csv_files(csv_files: list[str]) -> _PortTable:
+    """Parse UNLOCODE CSV files into a frozen column store."""
+    table = _PortTable()
     for csv_path in csv_files:
         logger.info(f"Loading UNLOCODE data from: {csv_path}")
         try:
@@ -110,41 +770,96 @@ def _load_ports() -> list[dict]:
                     if name.startswith("."):  # Country header row
                         continue
 
-                    # Parse function codes
+                    # Parse function codes into a bitmask (bit i ↔ FUNCTION_LABELS[i])
                     func_str = row[COL_FUNCTION].strip() if len(row) > COL_FUNCTION else ""
-                    functions = []
-                    for i, label in FUNCTION_LABELS.items():
+                    functions = 0
+                    for i in FUNCTION_LABELS:
                         if i < len(func_str) and func_str[i] != "-":
-                            functions.append(label)
-
-                    is_port = "Port" in functions
-                    is_airport = "Airport" in functions
+                            functions |= 1 << i
 
                     # Parse coordinates
                     coords_str = row[COL_COORDINATES].strip() if len(row) > COL_COORDINATES else ""
                     lat, lon = _parse_coordinates(coords_str)
 
-                    ports.append({
-                        "country_code": country,
-                        "location_code": location_code,
-                        "locode": f"{country}{location_code}",
-                        "name": name,
-                        "name_ascii": name_ascii or name,
-                        "subdivision": (row[COL_SUBDIVISION] or "").strip() if len(row) > COL_SUBDIVISION else "",
-                        "functions": functions,
-                        "is_port": is_port,
-                        "is_airport": is_airport,
-                        "status": (row[COL_STATUS] or "").strip() if len(row) > COL_STATUS else "",
-                        "coordinates": coords_str,
-                        "lat": lat,
-                        "lon": lon,
-                        "iata": (row[COL_IATA] or "").strip() if len(row) > COL_IATA else "",
-                    })
+                    table.append(
+                        country=country,
+                        location_code=location_code,
+                        name=name,
+                        name_ascii=name_ascii or name,
+                        subdivision=(row[COL_SUBDIVISION] or "").strip() if len(row) > COL_SUBDIVISION else "",
+                        functions=functions,
+                        status=(row[COL_STATUS] or "").strip() if len(row) > COL_STATUS else "",
+                        coordinates=coords_str,
+                        lat=lat,
+                        lon=lon,
+                        iata=(row[COL_IATA] or "").strip() if len(row) > COL_IATA else "",
+                    )
         except Exception as e:
             logger.error(f"Error loading {csv_path}: {e}")
+    table.freeze()
+    return table
 
-    _ports_cache = ports
-    logger.info(f"Loaded {len(ports)} UNLOCODE locations from {len(csv_files)} files")
+
+def build_snapshot(force: bool = False) -> str | None:
+    """Build step: parse the CSVs and (re)write the snapshot. Returns its path.
+
+    Without ``force`` an up-to-date snapshot is left alone.
+    """
+    csv_files = _find_csv_files()
+    if not csv_files:
+        logger.warning("No UNLOCODE CSV files found — nothing to snapshot.")
+        return None
+    fingerprint = _source_fingerprint(csv_files)
+    path = _snapshot_path(csv_files)
+    if not force and _read_snapshot(path, fingerprint) is not None:
+        return path
+    table = _parse_csv_files(csv_files)
+    _write_snapshot(path, fingerprint, table, _PortIndex(table))
+    return path
+
+
+def _load_ports() -> _PortTable:
+    """Load all ports — from the binary snapshot when current, else the CSV files."""
+    if _ports_cache is not None:
+        return _ports_cache
+    with _load_lock:
+        if _ports_cache is not None:
+            return _ports_cache
+        return _load_ports_locked()
+
+
+def _load_ports_locked() -> _PortTable:
+    """Body of ``_load_ports``; the caller holds ``_load_lock``."""
+    global _ports_cache, _index, _ports_source
+    csv_files = _find_csv_files()
+    if not csv_files:
+        logger.warning("No UNLOCODE CSV files found. Port lookup will use Geoapify only.")
+        table = _PortTable()
+        table.freeze()
+        _index = _PortIndex(table)
+        _ports_cache = table
+        return _ports_cache
+
+    use_snapshot = get_settings().unlocode_snapshot
+    if use_snapshot:
+        fingerprint = _source_fingerprint(csv_files)
+        path = _snapshot_path(csv_files)
+        loaded = _read_snapshot(path, fingerprint)
+        if loaded is not None:
+            table, _index = loaded
+            _ports_cache = table
+            _ports_source = "snapshot"
+            logger.info(f"Loaded {len(_ports_cache)} UNLOCODE locations from snapshot {path}")
+            return _ports_cache
+
+    table = _parse_csv_files(csv_files)
+    _index = _PortIndex(table)
+    _ports_cache = table
+    _ports_source = "csv"
+    logger.info(f"Loaded {len(table)} UNLOCODE locations from {len(csv_files)} files "
+                f"({len(_index.names)} names, {len(_index.ngrams)} trigrams indexed)")
+    if use_snapshot:
+        _write_snapshot(path, fingerprint, table, _index)
     return _ports_cache
 
 
@@ -179,57 +894,169 @@ def _parse_coordinates(coords: str) -> tuple[float | None, float | None]:
 
 def search_port(query: str, country_code: str = "", ports_only: bool = False,
                 max_results: int = 10) -> list[dict]:
-    """Search for ports/locations by name. Case-insensitive partial match."""
-    ports = _load_ports()
-    if not ports:
+    """Search for ports/locations by name. Case-insensitive partial match.
+
+    Exact name or LOCODE matches rank first, then starts-with, then contains;
+    ties prefer seaports. Served from the prebuilt index, so a lookup costs
+    roughly the number of candidate names rather than a full table scan.
+    """
+    table = _load_ports()
+    if not len(table):
         return []
+    index = _get_index()
 
     q = query.lower().strip()
-    results = []
+    cc = country_code.upper()
+    partition = index.country_partition(cc) if cc else None
+
+    if cc and partition is None:
+        scores = {}
+    elif partition is not None and len(partition) <= COUNTRY_SCAN_THRESHOLD:
+        scores = index.score_partition(q, partition)
+    else:
+        scores = index.score_rows(q)
+    for row in index.rows_by_code(q.upper()):
+        scores.setdefault(row, 100)
 
-    for p in ports:
-        if ports_only and not p["is_port"]:
+    hits = []
+    for row, score in scores.items():
+        if ports_only and not table.is_port(row):
             continue
-        if country_code and p["country_code"].upper() != country_code.upper():
+        if cc and table.country_code(row) != cc:
             continue
+        # Exact hits keep the legacy latest-row-first order, the rest file order
+        order = -row if score == 100 else row
+        hits.append(((-score, -int(table.is_port(row)), order), row))
+    hits.sort()
 
-        name_lower = p["name_ascii"].lower()
-        name_orig = p["name"].lower()
+    return [table.record(row) for _, row in hits[:max_results]]
 
-        # Exact match gets highest priority
-        if name_lower == q or name_orig == q:
-            results.insert(0, {**p, "_score": 100})
-        # Starts with query
-        elif name_lower.startswith(q) or name_orig.startswith(q):
-            results.append({**p, "_score": 80})
-        # Contains query
-        elif q in name_lower or q in name_orig:
-            results.append({**p, "_score": 60})
-        # LOCODE match
-        elif q.upper() == p["locode"] or q.upper() == p["location_code"]:
-            results.insert(0, {**p, "_score": 100})
 
-    # Sort by score then by is_port (prefer ports)
-    results.sort(key=lambda x: (-x.get("_score", 0), -int(x["is_port"])))
+def fuzzy_search_port(query: str, country_code: str = "", ports_only: bool = False,
+                      max_results: int = 5, max_distance: int | None = None) -> list[dict]:
+    """Approximate name match for OCR-mangled names ("MISURTA", "BENGHAZl").
 
-    # Clean up score
-    for r in results:
-        r.pop("_score", None)
+    Tries 1 edit first and widens to ``max_distance`` (default: 1, or 2 for
+    names of 9+ characters) only when nothing closer exists. Results rank by
+    distance, then seaports first, and carry a ``match_distance`` key.
+    Without a country, queries too short to prune by trigrams return [].
+    """
+    table = _load_ports()
+    if not len(table):
+        return []
+    index = _get_index()
 
-    return results[:max_results]
+    q = query.lower().strip()
+    if len(q) < FUZZY_MIN_LENGTH:
+        return []
+    cc = country_code.upper()
+    partition = index.country_partition(cc) if cc else None
+    if cc and partition is None:
+        return []
+    if max_distance is None:
+        max_distance = 1 if len(q) < 9 else 2
+
+    for d in range(1, max_distance + 1):
+        found = index.fuzzy_ids(q, d)
+        if found is None:
+            if partition is None:
+                break
+            found = index.fuzzy_scan(q, d, partition)
+
+        hits = []
+        for nid, dist in found.items():
+            for row in index.rows_of(nid):
+                if ports_only and not table.is_port(row):
+                    continue
+                if cc and table.country_code(row) != cc:
+                    continue
+                hits.append(((dist, -int(table.is_port(row)), row), row))
+        if hits:
+            hits.sort()
+            seen, results = set(), []
+            for (dist, _, _), row in hits:
+                if row in seen:
+                    continue
+                seen.add(row)
+                results.append({**table.record(row), "match_distance": dist})
+                if len(results) >= max_results:
+                    break
+            return results
+    return []
+
+
+def nearest_ports(lat: float, lon: float, k: int = 5, ports_only: bool = True,
+                  max_km: float | None = None) -> list[dict]:
+    """The ``k`` locations closest to a coordinate, nearest first.
+
+    Used to snap a geocoded city to its official seaport. Results carry a
+    ``distance_km`` key; ``max_km`` drops anything farther away.
+    """
+    table = _load_ports()
+    if not len(table) or k <= 0 or not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+        return []
+    hits = _get_index().nearest_rows(lat, lon, k, ports_only, max_km)
+    return [{**table.record(row), "distance_km": round(km, 1)} for km, row in hits]
 
 
 def get_port_by_code(country_code: str, location_code: str) -> dict | None:
     """Get a specific port by its country + location code (e.g., LY + TIP)."""
-    ports = _load_ports()
-    cc = country_code.upper()
-    lc = location_code.upper()
-    for p in ports:
-        if p["country_code"] == cc and p["location_code"] == lc:
-            return p
-    return None
+    table = _load_ports()
+    rows = _get_index().rows_by_locode(f"{country_code.upper()}{location_code.upper()}")
+    return table.record(rows[0]) if rows else None
+
+
+def get_ports_by_codes(codes: list[str]) -> dict[str, dict | None]:
+    """Bulk LOCODE lookup. Returns {code: port or None} in input order.
+
+    Accepts "LYTIP", "LY TIP" or "LY-TIP"; unknown or malformed codes map to None.
+    """
+    table = _load_ports()
+    index = _get_index()
+    result = {}
+    for code in codes:
+        rows = index.rows_by_locode((code or "").upper().replace(" ", "").replace("-", ""))
+        result[code] = table.record(rows[0]) if rows else None
+    return result
 
 
 def get_ports_count() -> int:
     """Get total number of loaded locations."""
     return len(_load_ports())
+
+
+def _rss_bytes() -> int | None:
+    """Resident set size of this process (Linux /proc), None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_ports_stats() -> dict:
+    """Get location counts and the memory held by the UN/LOCODE data in this worker."""
+    table = _load_ports()
+    index = _get_index()
+    table_bytes = table.nbytes()
+    index_bytes = index.nbytes()
+    return {
+        "locations": len(table),
+        "ports": sum(1 for m in table.functions if m & PORT_FLAG),
+        "countries": len(table.countries),
+        "names_indexed": len(index.names),
+        "table_bytes": table_bytes,
+        "index_bytes": index_bytes,
+        "total_bytes": table_bytes + index_bytes,
+        "loaded_from": _ports_source,
+        "process_rss_bytes": _rss_bytes(),
+    }
+
+
+if __name__ == "__main__":
+    # Build step: python -m utils.unlocode [--force]
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from dotenv import load_dotenv; load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s: %(message)s")
+    out = build_snapshot(force="--force" in sys.argv)
+    print(f"UNLOCODE snapshot: {out}" if out else "No UNLOCODE CSV files found.")
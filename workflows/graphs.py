@@ -1,8 +1,10 @@
 """
 LangGraph Workflows — StateGraph definitions for L/C processing.
 
-Each workflow is a compiled LangGraph graph. Nodes call FastMCP tools
-via call_tool(). State flows as a TypedDict through the graph.
+Each workflow is a compiled LangGraph graph. Nodes are async and await
+FastMCP tools via acall_tool(), so run graphs with ``await graph.ainvoke(...)``
+(``asyncio.run(graph.ainvoke(...))`` from sync code). State flows as a
+TypedDict through the graph.
 
 Graphs:
   - extraction_graph:   PDF → Extract → END
@@ -17,7 +19,7 @@ import logging
 from typing import TypedDict, Optional
 
 from langgraph.graph import StateGraph, START, END
-from tools.server import call_tool
+from tools.server import acall_tool, acall_tools
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,8 @@ class ExtractionState(TypedDict, total=False):
     llm_provider: str
     model_name: str
     language: str
+    image_profile: str    # OpenAI vision page encoding; "" → settings
+    chunking: str         # auto | always | off; "" → settings
     result: dict          # ExtractionResult
     extracted_data: dict
     error: str
@@ -56,7 +60,8 @@ class VerificationState(TypedDict, total=False):
 
 class BatchVerificationState(TypedDict, total=False):
     fields: list          # [{tool_name, args}, ...]
-    results: list         # [VerificationResult, ...]
+    results: list         # [VerificationResult | None, ...] in field order
+    latency_ms: list      # per field, in field order
     errors: list
 
 
@@ -77,13 +82,16 @@ class PipelineState(TypedDict, total=False):
     llm_provider: str
     model_name: str
     language: str
+    image_profile: str
+    chunking: str
     verify_fields: list    # [{tool_name, args}]
 
     # Accumulated results
     extraction_result: dict
     extracted_data: dict
     validation_result: dict
-    verification_results: list
+    verification_results: list   # [VerificationResult | None, ...] in verify_fields order
+    verification_latency_ms: list
     errors: list
 
 
@@ -91,15 +99,17 @@ class PipelineState(TypedDict, total=False):
 #  NODE FUNCTIONS
 # ═══════════════════════════════════════════════════════════════
 
-def node_extract(state: ExtractionState) -> dict:
+async def node_extract(state: ExtractionState) -> dict:
     """Call extract_lc_document tool."""
     try:
-        result = call_tool("extract_lc_document", {
+        result = await acall_tool("extract_lc_document", {
             "pdf_bytes_b64": state["pdf_bytes_b64"],
             "method": state.get("method", "vision"),
             "llm_provider": state.get("llm_provider", "gemini"),
             "model_name": state.get("model_name", "gemini-2.5-flash"),
             "language": state.get("language", "en"),
+            "image_profile": state.get("image_profile", ""),
+            "chunking": state.get("chunking", ""),
         })
         return {
             "result": result,
@@ -112,10 +122,10 @@ def node_extract(state: ExtractionState) -> dict:
         return {"error": str(e)}
 
 
-def node_validate(state: ValidationState) -> dict:
+async def node_validate(state: ValidationState) -> dict:
     """Call validate_documents tool."""
     try:
-        result = call_tool("validate_documents", {
+        result = await acall_tool("validate_documents", {
             "documents": state["documents"],
             "language": state.get("language", "en"),
         })
@@ -124,32 +134,29 @@ def node_validate(state: ValidationState) -> dict:
         return {"error": str(e)}
 
 
-def node_verify(state: VerificationState) -> dict:
+async def node_verify(state: VerificationState) -> dict:
     """Call any verification tool by name."""
     try:
-        result = call_tool(state["tool_name"], state["args"])
+        result = await acall_tool(state["tool_name"], state["args"])
         return {"result": result}
     except Exception as e:
         return {"error": str(e)}
 
 
-def node_verify_batch(state: BatchVerificationState) -> dict:
-    """Verify multiple fields sequentially (use ThreadPool externally for parallel)."""
-    results = []
-    errors = []
-    for field in (state.get("fields") or []):
-        try:
-            r = call_tool(field["tool_name"], field["args"])
-            results.append(r)
-        except Exception as e:
-            errors.append(f"{field['tool_name']}: {e}")
-    return {"results": results, "errors": errors}
+async def node_verify_batch(state: BatchVerificationState) -> dict:
+    """Verify multiple fields concurrently (see acall_tools); failed fields get a None result."""
+    outcomes = await acall_tools(state.get("fields") or [])
+    return {
+        "results": [o.get("result") for o in outcomes],
+        "latency_ms": [o["latency_ms"] for o in outcomes],
+        "errors": [f"{o['tool_name']}: {o['error']}" for o in outcomes if "error" in o],
+    }
 
 
-def node_chat(state: ChatState) -> dict:
+async def node_chat(state: ChatState) -> dict:
     """Call chat_with_document tool."""
     try:
-        result = call_tool("chat_with_document", {
+        result = await acall_tool("chat_with_document", {
             "message": state["message"],
             "extracted_data": state.get("extracted_data", {}),
             "pdf_text": state.get("pdf_text", ""),
@@ -163,20 +170,22 @@ def node_chat(state: ChatState) -> dict:
 
 # ── Pipeline-specific nodes ──
 
-def pipeline_extract(state: PipelineState) -> dict:
-    result = call_tool("extract_lc_document", {
+async def pipeline_extract(state: PipelineState) -> dict:
+    result = await acall_tool("extract_lc_document", {
         "pdf_bytes_b64": state["pdf_bytes_b64"],
         "method": state.get("method", "vision"),
         "llm_provider": state.get("llm_provider", "gemini"),
         "model_name": state.get("model_name", "gemini-2.5-flash"),
         "language": state.get("language", "en"),
+        "image_profile": state.get("image_profile", ""),
+        "chunking": state.get("chunking", ""),
     })
     return {"extraction_result": result, "extracted_data": result.get("extracted_data", {})}
 
 
-def pipeline_validate(state: PipelineState) -> dict:
+async def pipeline_validate(state: PipelineState) -> dict:
     docs = {"letter_of_credit": state.get("extracted_data", {})}
-    result = call_tool("validate_documents", {"documents": docs, "language": state.get("language", "en")})
+    result = await acall_tool("validate_documents", {"documents": docs, "language": state.get("language", "en")})
     return {"validation_result": result}
 
 
@@ -187,16 +196,14 @@ def pipeline_should_verify(state: PipelineState) -> str:
     return "end"
 
 
-def pipeline_verify(state: PipelineState) -> dict:
-    results = []
-    errors = state.get("errors") or []
-    for field in (state.get("verify_fields") or []):
-        try:
-            r = call_tool(field["tool_name"], field["args"])
-            results.append(r)
-        except Exception as e:
-            errors.append(str(e))
-    return {"verification_results": results, "errors": errors}
+async def pipeline_verify(state: PipelineState) -> dict:
+    outcomes = await acall_tools(state.get("verify_fields") or [])
+    errors = (state.get("errors") or []) + [f"{o['tool_name']}: {o['error']}" for o in outcomes if "error" in o]
+    return {
+        "verification_results": [o.get("result") for o in outcomes],
+        "verification_latency_ms": [o["latency_ms"] for o in outcomes],
+        "errors": errors,
+    }
 
 
 # ═══════════════════════════════════════════════════════════════